@@ -1,3 +1,18 @@
-from .components import App, Interface
+from typing import TYPE_CHECKING
+
+from ._lazy import lazy_import
 
 __version__ = "0.1.0"
+
+# Imported on first access, `import kore` alone doesn't load the Qt widgets.
+_LAZY = {
+    "App": ".components.app",
+    "Interface": ".components.window",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .components import App, Interface
+
+__getattr__, __dir__ = lazy_import(__name__, _LAZY)
@@ -0,0 +1,28 @@
+import importlib
+import sys
+from typing import Callable, Dict, Tuple
+
+
+def lazy_import(package: str, names: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Returns the module level __getattr__ and __dir__ of a package whose public names
+    are imported from their modules on first access, then cached in the package.
+
+    Args:
+        package (str): Name of the package (its __name__).
+        names (Dict[str, str]): Public names mapped to their relative module.
+    """
+
+    def __getattr__(name: str):
+        module = names.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | set(names))
+
+    return __getattr__, __dir__
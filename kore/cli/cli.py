@@ -1,15 +1,16 @@
+import json
 import os
 import shutil
 import subprocess
+import sys
 import time
 import zipfile
 from pathlib import Path
 from xml.etree import ElementTree as Et
 
 import click
-from PySide6.QtCore import QDir
-from PySide6.QtWidgets import QApplication, QFileDialog
 
+APP_CONFIG_PATH = "./src/config/app.json"
 DOTUI_PATH = "./src/gui/views/dotui"
 VIEWS_PATH = "./src/gui/views"
 ASSETS_PATH = "./src/gui/assets"
@@ -109,6 +110,10 @@ def _open_file_dialog(
     file_types: str = "All Files (*)", title: str = "Select Files"
 ) -> tuple:
     """open a file dialog and return the selected files."""
+    # Only the commands picking files need Qt widgets.
+    from PySide6.QtCore import QDir
+    from PySide6.QtWidgets import QApplication, QFileDialog
+
     # Create a Qt application
     app = QApplication([])
 
@@ -384,6 +389,75 @@ def add(kind: str) -> None:
         print(f"[+] '{base_name}' added to '{kind}")
 
 
+@cli.command(context_settings={"ignore_unknown_options": True}, add_help_option=False)
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def stress(args: tuple) -> None:
+    """Stress test the notifications, see 'kore stress --help'."""
+    from ..diagnostics import stress as stress_test
+
+    raise SystemExit(stress_test.main(list(args)))
+
+
+@cli.command()
+@click.argument("message", required=False)
+@click.option("--level", "-l", default="I", help="Notification level.")
+@click.option("--duration", "-d", default="S", help="Notification duration.")
+@click.option("--link", default=None, help="Optional link of the notification.")
+@click.option("--stdin", "from_stdin", is_flag=True, help="Send every stdin line.")
+@click.option("--server", default=None, help="Server name, defaults to app.json.")
+def notify(
+    message: str,
+    level: str,
+    duration: str,
+    link: str,
+    from_stdin: bool,
+    server: str,
+) -> None:
+    """Raise notifications in the running app of this project."""
+    from ..managers.ipc import send, server_name
+
+    if not server:
+        try:
+            with open(APP_CONFIG_PATH, "r", encoding="utf-8") as app_file:
+                server = server_name(json.load(app_file)["name"])
+        except (OSError, KeyError, json.JSONDecodeError):
+            print(f"[-] '{APP_CONFIG_PATH}' not found, use --server")
+            return
+
+    defaults = {"level": level, "duration": duration}
+    if link:
+        defaults["link"] = link
+
+    def records():
+        if message:
+            yield dict(defaults, message=message)
+        if from_stdin:
+            for number, line in enumerate(sys.stdin, 1):
+                line = line.strip()
+                if not line.startswith("{"):
+                    if line:
+                        yield dict(defaults, message=line)
+                    continue
+
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    print(f"[-] Line {number} skipped, invalid JSON: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    print(f"[-] Line {number} skipped, not a JSON object")
+                    continue
+                yield dict(defaults, **record)
+
+    try:
+        sent = send(server, records())
+    except (ConnectionError, TimeoutError) as e:
+        print(f"[-] {e}")
+        return
+
+    print(f"[+] {sent} notification{'s' if sent != 1 else ''} sent to '{server}'")
+
+
 def main():
     cli()
 
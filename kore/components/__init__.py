@@ -1,7 +1,31 @@
-from .app import App
-from .labels import LinkHoverLabel
-from .notification_history import NotificationHistoryWdgt
-from .notification_wdgt import NotificationWdgt
-from .settings import SettingFormWidget
-from .titlebar import CustomTitleBar
-from .window import Interface
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_import
+
+# Public names and their modules, imported on first access.
+_LAZY = {
+    "App": ".app",
+    "LinkHoverLabel": ".labels",
+    "LogViewer": ".log_viewer",
+    "NotificationHistoryWdgt": ".notification_history",
+    "NotificationWdgt": ".notification_wdgt",
+    "PageRouter": ".router",
+    "SettingFormWidget": ".settings",
+    "CustomTitleBar": ".titlebar",
+    "Interface": ".window",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .app import App
+    from .labels import LinkHoverLabel
+    from .log_viewer import LogViewer
+    from .notification_history import NotificationHistoryWdgt
+    from .notification_wdgt import NotificationWdgt
+    from .router import PageRouter
+    from .settings import SettingFormWidget
+    from .titlebar import CustomTitleBar
+    from .window import Interface
+
+__getattr__, __dir__ = lazy_import(__name__, _LAZY)
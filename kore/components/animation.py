@@ -0,0 +1,343 @@
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from PySide6.QtCore import QEasingCurve, QObject, QPoint, QRect, Qt, QTimer
+from PySide6.QtGui import QPainter, QPixmap
+from PySide6.QtWidgets import QApplication, QWidget
+
+
+class FrameStats:
+    """
+    Keeps the last frames of the animation clock, the interval between two ticks
+    (what the user perceives) and the time spent animating inside each tick.
+    """
+
+    def __init__(self, size: int = 600) -> None:
+        self.intervals: deque = deque(maxlen=size)
+        self.work: deque = deque(maxlen=size)
+
+    def add(self, interval_ms: Optional[float], work_ms: float) -> None:
+        if interval_ms is not None:
+            self.intervals.append(interval_ms)
+        self.work.append(work_ms)
+
+    def clear(self) -> None:
+        self.intervals.clear()
+        self.work.clear()
+
+    def summary(self) -> dict:
+        """
+        Returns the amount of frames and the mean, 95th percentile and maximum of
+        the frame intervals and the per tick work, in milliseconds.
+        """
+        summary = {"frames": len(self.work)}
+        for name, values in (("interval", self.intervals), ("work", self.work)):
+            ordered = sorted(values)
+            if not ordered:
+                summary[name] = {"mean": 0.0, "p95": 0.0, "max": 0.0}
+                continue
+
+            summary[name] = {
+                "mean": sum(ordered) / len(ordered),
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max": ordered[-1],
+            }
+
+        return summary
+
+
+class Animation:
+    """
+    Interpolates a value (float or QPoint) from start to end and pushes it to a setter,
+    it's driven by the AnimationClock instead of owning a timer.
+    """
+
+    def __init__(
+        self,
+        start: Any,
+        end: Any,
+        duration: int,
+        setter: Callable[[Any], None],
+        on_finished: Optional[Callable[[], None]] = None,
+        easing: QEasingCurve.Type = QEasingCurve.Type.OutCubic,
+    ) -> None:
+        """
+        Args:
+            start (float | QPoint): The initial value.
+            end (float | QPoint): The final value.
+            duration (int): Duration of the animation in milliseconds.
+            setter (Callable): Called with the interpolated value on every frame.
+            on_finished (Callable, optional): Called once the end value was set.
+            easing (QEasingCurve.Type): Easing applied to the progress.
+        """
+        self.start = start
+        self.end = end
+        self.duration = max(duration, 1) / 1000
+        self.setter = setter
+        self.on_finished = on_finished
+        self.curve = QEasingCurve(easing)
+        self.started_at: Optional[float] = None
+
+    def value_at(self, progress: float) -> Any:
+        eased = self.curve.valueForProgress(progress)
+        if isinstance(self.start, QPoint):
+            delta = self.end - self.start
+            return QPoint(
+                self.start.x() + round(delta.x() * eased),
+                self.start.y() + round(delta.y() * eased),
+            )
+
+        return self.start + (self.end - self.start) * eased
+
+    def step(self, now: float) -> bool:
+        """Sets the value for the given time, returns True once finished."""
+        if self.started_at is None:
+            self.started_at = now
+
+        progress = min((now - self.started_at) / self.duration, 1.0)
+        self.setter(self.value_at(progress))
+        return progress >= 1.0
+
+
+class AnimationClock(QObject):
+    """
+    Single timer shared by every running animation (fades, slides) of the application,
+    it only runs while there is something to animate.
+    """
+
+    FRAME_INTERVAL = 16
+
+    _instance: Optional["AnimationClock"] = None
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+
+        self.animations: list = []
+        self.frame_callbacks: dict = {}
+        self.stats = FrameStats()
+        self._last_tick: Optional[float] = None
+
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)  # type:ignore
+        self.timer.setInterval(self.FRAME_INTERVAL)
+        self.timer.timeout.connect(self._tick)
+
+    @classmethod
+    def instance(cls) -> "AnimationClock":
+        """Returns the clock of the running application, creating it on first use."""
+        if cls._instance is None:
+            cls._instance = cls(QApplication.instance())
+            cls._instance.destroyed.connect(cls._forget_instance)
+
+        return cls._instance
+
+    @classmethod
+    def _forget_instance(cls) -> None:
+        cls._instance = None
+
+    def start(self, animation: Animation) -> Animation:
+        """Registers an animation, its first frame is set right away."""
+        animation.started_at = None
+        self.animations.append(animation)
+        if animation.step(time.perf_counter()):
+            self._finish(animation)
+        else:
+            self._wake()
+
+        return animation
+
+    def stop(self, animation: Optional[Animation]) -> None:
+        """Removes an animation without finishing it."""
+        if animation in self.animations:
+            self.animations.remove(animation)
+
+    def is_running(self, animation: Optional[Animation]) -> bool:
+        return animation in self.animations
+
+    def call_next_frame(self, key: Any, callback: Callable[[], None]) -> None:
+        """
+        Runs the callback on the next frame, callbacks scheduled several times with the
+        same key before that frame run only once.
+        """
+        self.frame_callbacks[key] = callback
+        self._wake()
+
+    def _wake(self) -> None:
+        if not self.timer.isActive():
+            self._last_tick = None
+            self.timer.start()
+
+    def _finish(self, animation: Animation) -> None:
+        if animation in self.animations:
+            self.animations.remove(animation)
+        if animation.on_finished:
+            animation.on_finished()
+
+    def _tick(self) -> None:
+        now = time.perf_counter()
+        interval = None if self._last_tick is None else (now - self._last_tick) * 1000
+        self._last_tick = now
+
+        callbacks = list(self.frame_callbacks.values())
+        self.frame_callbacks.clear()
+        for callback in callbacks:
+            callback()
+
+        for animation in list(self.animations):
+            if animation in self.animations and animation.step(now):
+                self._finish(animation)
+
+        self.stats.add(interval, (time.perf_counter() - now) * 1000)
+
+        if not self.animations and not self.frame_callbacks:
+            self.timer.stop()
+
+
+class _FadeGhost(QWidget):
+    """Plain sibling widget that paints the snapshot of a fading widget."""
+
+    def __init__(self, fader: "Fader", parent: QWidget) -> None:
+        super().__init__(parent)
+        self.fader = fader
+        self.setAttribute(Qt.WA_NoSystemBackground)  # type:ignore
+
+    def paintEvent(self, event) -> None:
+        if self.fader.snapshot is None:
+            return
+
+        painter = QPainter(self)
+        painter.setOpacity(self.fader.opacity)
+        painter.drawPixmap(0, 0, self.fader.snapshot)
+
+    def enterEvent(self, event) -> None:
+        if self.fader.on_enter:
+            self.fader.on_enter()
+
+
+class Fader:
+    """
+    Fades a widget in or out through the AnimationClock without graphics effects.
+
+    Top level widgets use the window opacity. Child widgets are snapshotted once when
+    the fade starts and, while it runs, hidden behind a plain sibling that paints the
+    snapshot with the current opacity, so each frame is a single pixmap blit instead of
+    an offscreen render of the whole subtree.
+    """
+
+    def __init__(
+        self,
+        widget: QWidget,
+        duration: int,
+        on_enter: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Args:
+            widget (QWidget): The widget to fade.
+            duration (int): Duration of the fades in milliseconds.
+            on_enter (Callable, optional): Called when the mouse enters the faded
+                widget while its snapshot is displayed.
+        """
+        self.widget = widget
+        self.duration = duration
+        self.on_enter = on_enter
+
+        self.opacity = 1.0
+        self.direction = 1
+        self.snapshot: Optional[QPixmap] = None
+        self.ghost: Optional[_FadeGhost] = None
+        self.animation: Optional[Animation] = None
+
+        widget.destroyed.connect(self._release)
+
+    @property
+    def running(self) -> bool:
+        return AnimationClock.instance().is_running(self.animation)
+
+    def fade_in(self, on_finished: Optional[Callable[[], None]] = None) -> None:
+        """Shows the widget fading from its current opacity to fully opaque."""
+        start = self.opacity if self.running else 0.0
+        self.direction = 1
+        self._run(start, 1.0, on_finished)
+
+    def fade_out(self, on_finished: Optional[Callable[[], None]] = None) -> None:
+        """Fades the widget to transparent, it's left hidden once finished."""
+        start = self.opacity if self.running else 1.0
+        self.direction = -1
+        self._run(start, 0.0, on_finished)
+
+    def stop(self, opacity: float = 1.0) -> None:
+        """Stops the running fade and leaves the widget visible or hidden."""
+        AnimationClock.instance().stop(self.animation)
+        self.animation = None
+        self._end(opacity)
+
+    def _release(self) -> None:
+        # The widget is gone, drop the running fade and its ghost with it.
+        AnimationClock.instance().stop(self.animation)
+        self.animation = None
+        if self.ghost is not None:
+            self.ghost.deleteLater()
+            self.ghost = None
+            self.snapshot = None
+
+    def set_opacity(self, opacity: float) -> None:
+        self.opacity = opacity
+        if self.widget.isWindow():
+            self.widget.setWindowOpacity(opacity)
+            return
+
+        if self.ghost is not None:
+            geometry: QRect = self.widget.geometry()
+            if self.ghost.geometry() != geometry:
+                self.ghost.setGeometry(geometry)
+            self.ghost.update()
+
+    def _run(
+        self, start: float, end: float, on_finished: Optional[Callable[[], None]]
+    ) -> None:
+        clock = AnimationClock.instance()
+        clock.stop(self.animation)
+
+        if self.widget.isWindow():
+            self.widget.setWindowOpacity(start)
+            self.widget.setVisible(True)
+        else:
+            self._show_ghost()
+
+        def finished() -> None:
+            self.animation = None
+            self._end(end)
+            if on_finished:
+                on_finished()
+
+        self.opacity = start
+        self.animation = clock.start(
+            Animation(start, end, self.duration, self.set_opacity, finished)
+        )
+
+    def _show_ghost(self) -> None:
+        if self.ghost is None:
+            # The widget paints itself (and its children) once for the whole fade.
+            self.snapshot = self.widget.grab()
+            self.ghost = _FadeGhost(self, self.widget.parentWidget())
+
+        self.ghost.setGeometry(self.widget.geometry())
+        self.ghost.show()
+        self.ghost.raise_()
+        self.widget.setVisible(False)
+
+    def _end(self, opacity: float) -> None:
+        self.opacity = opacity
+        if self.widget.isWindow():
+            self.widget.setWindowOpacity(opacity)
+            self.widget.setVisible(opacity > 0)
+            return
+
+        if opacity > 0:
+            self.widget.setVisible(True)
+
+        if self.ghost is not None:
+            self.ghost.deleteLater()
+            self.ghost = None
+            self.snapshot = None
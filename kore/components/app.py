@@ -1,12 +1,26 @@
+import atexit
 import json
 import logging
 import os
+import sys
 import time
-from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 
-from PySide6.QtCore import Signal
+from PySide6.QtCore import QTimer, Signal
 from PySide6.QtWidgets import QApplication
 
+from ..diagnostics.profiler import StartupProfiler
+from ..diagnostics.watchdog import WATCHDOG_ENV, StallWatchdog
+from .log_pipeline import LogPipeline, RingBufferHandler
+from .single_instance import InstanceServer, forward, instance_name
+from .task_pool import TaskHandle, TaskPool
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .async_loop import QtEventLoop
+    from .fonts import FontRegistry
+
 APP_CONFIG_PATH = "./src/config/app.json"
 LOGGING_PATH = "./logs"
 
@@ -20,17 +34,50 @@ class App(QApplication):
     name:str
     version:str
     
+    # Deprecated, listen to Interface.themes.applied. Emitted after each theme change
+    # with the applied sheet (colors written in), emitting it sets the stylesheet
+    # bypassing the Theme manager.
     set_style = Signal(str)
+    # Arguments and working directory of a later launch, with `single_instance`.
+    instance_launched = Signal(list, str)
+    # Emitted on quit before the app services stop, to release what uses them.
+    shutting_down = Signal()
 
     def __init__(self) -> None:
+        app_data = self._read_config()
+        # A second launch hands its arguments over before any of the start-up cost.
+        if app_data["environment"].get("single_instance", False):
+            if forward(instance_name(app_data["name"]), sys.argv[1:]):
+                sys.exit(0)
+
         super().__init__()
         
         self.start_time: float = time.perf_counter()
+        self.profiler = StartupProfiler(self.start_time).activate()
 
+        self._notifying_style = False
+        self._warned_set_style = False
         self.set_style.connect(self._set_stylesheet)
 
-        self._load_config()
-        self._config_logging()
+        with self.profiler.span("App._load_config"):
+            self._load_config(app_data)
+        with self.profiler.span("App._config_logging"):
+            self._config_logging()
+        self._config_single_instance()
+        self._config_watchdog()
+
+        environment = self.app_data["environment"]
+        self.tasks = TaskPool(
+            max_threads=environment.get("task_threads"),
+            max_processes=environment.get("task_processes"),
+            parent=self,
+        )
+        self.loop: Optional["QtEventLoop"] = None
+        # Set by the Interface, components register their fonts through it.
+        self.fonts: Optional["FontRegistry"] = None
+        if environment.get("asyncio", False):
+            self.async_loop()
+        self.aboutToQuit.connect(self._shutdown)
 
 
         self.log.debug(f"{self.app_data["name"]} v{self.app_data["version"]} started in DEBUG mode !")
@@ -46,18 +93,111 @@ class App(QApplication):
         except Exception as exc:
             self._report_crash(exc)
 
+    def finish_startup(self) -> None:
+        """Ends the start-up profile, called once the main window painted its first frame."""
+        trace_path = self.app_data["environment"].get("startup_trace")
+        self.profiler.finish(trace_path)
+
+    def _config_single_instance(self) -> None:
+        """Becomes the instance later launches forward their arguments to, if turned on."""
+        self.instance_server = None
+        if not self.app_data["environment"].get("single_instance", False):
+            return
+
+        name = instance_name(self.name)
+        self.instance_server = InstanceServer(name, self)
+        if not self.instance_server.listen():
+            # Another launch won the race since the config was read.
+            if forward(name, sys.argv[1:]):
+                self.log.debug("Arguments forwarded to the running instance")
+                sys.exit(0)
+            self.log.error(f"Couldn't reach the running instance on '{name}'")
+            return
+
+        self.instance_server.received.connect(self.instance_launched)
+
+    def _config_watchdog(self) -> None:
+        """Starts the event loop stall watchdog with the loop, if turned on."""
+        self.watchdog = None
+        environment = self.app_data["environment"]
+        if not (environment.get("watchdog", False) or os.environ.get(WATCHDOG_ENV)):
+            return
+
+        self.watchdog = StallWatchdog(
+            interval=environment.get("watchdog_interval", 100),
+            threshold=environment.get("watchdog_threshold", 250),
+            parent=self,
+        )
+        QTimer.singleShot(0, self.watchdog.start)
+
+    def async_loop(self) -> "QtEventLoop":
+        """
+        Returns the asyncio event loop driven by the Qt event loop, created on first
+        use (or at start-up with `environment.asyncio`).
+        """
+        if self.loop is None:
+            # asyncio is only imported by the apps that use it.
+            import asyncio
+
+            from .async_loop import QtEventLoop
+
+            self.loop = QtEventLoop()
+            asyncio.set_event_loop(self.loop)
+            self.loop.attach()
+
+        return self.loop
+
+    def create_task(self, coro) -> "asyncio.Task":
+        """Runs a coroutine on the integrated asyncio loop, see QtEventLoop.spawn."""
+        return self.async_loop().spawn(coro)
+
+    def submit(self, fn, *args, **kwargs) -> TaskHandle:
+        """Runs a blocking function in the background, see TaskPool.submit."""
+        return self.tasks.submit(fn, *args, **kwargs)
+
+    def _shutdown(self) -> None:
+        """Stops the app services on quit, the log pipeline last so their logs are kept."""
+        self.shutting_down.emit()
+        if self.instance_server is not None:
+            self.instance_server.close()
+        if self.loop is not None:
+            self.loop.shutdown()
+        self.tasks.shutdown()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.log_pipeline.stop()
+
     def _report_crash(self, exception: Exception):
         print(f"EXCEPTION CATCH: {exception}")
 
-    def _load_config(self) -> None:
-        """load application configuration from the config/app.json file and store it"""
+    @staticmethod
+    def _read_config() -> dict:
         with open(APP_CONFIG_PATH, "r") as config_file:
-            self.app_data = json.load(config_file)
+            return json.load(config_file)
+
+    def _load_config(self, app_data: dict) -> None:
+        """load application configuration from the config/app.json file and store it"""
+        self.app_data = app_data
             
         self.name = self.app_data["name"]
         self.version = self.app_data["version"]
 
+    def _notify_style(self, sheet: str) -> None:
+        """Emits set_style for its receivers, the Theme manager already applied the sheet."""
+        self._notifying_style = True
+        try:
+            self.set_style.emit(sheet)
+        finally:
+            self._notifying_style = False
+
     def _set_stylesheet(self, sheet:str):
+        if self._notifying_style:
+            return
+        if not self._warned_set_style:
+            self._warned_set_style = True
+            self.log.warning(
+                "App.set_style is deprecated, apply themes with Interface.apply_style"
+            )
         self.setStyleSheet(sheet)
 
     def _config_logging(self) -> None:
@@ -89,29 +229,35 @@ class App(QApplication):
             ColorFormatter(fmt=log_fmt, datefmt=date_fmt, style="{")
         )
 
-        """
-        if UNIQUE_LOGS:
-            log_name = "lastet.log"
-        else:
-        """
-
-        log_name = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+        handlers: list = [console_handler]
 
-        # check logging path
-        log_dir = LOGGING_PATH
-        os.makedirs(log_dir, exist_ok=True)
+        environment = self.app_data["environment"]
+        # Last records in memory for the LogViewer component.
+        self.log_buffer = RingBufferHandler(environment.get("log_buffer_size", 10000))
+        handlers.append(self.log_buffer)
 
-        # Create file handler
-        file_handler = logging.FileHandler(os.path.join(log_dir, log_name), mode="w")
-        file_handler.setFormatter(
-            logging.Formatter(fmt=log_fmt, datefmt=date_fmt, style="{")
-        )
+        if environment.get("log_to_file", True):
+            # Rotated on every launch and by size, old logs are gzipped in the background.
+            file_handler = LogPipeline.rotating_file_handler(
+                LOGGING_PATH,
+                max_bytes=environment.get("log_max_bytes", 5 * 2**20),
+                backup_count=environment.get("log_backup_count", 5),
+            )
+            file_handler.setFormatter(
+                logging.Formatter(fmt=log_fmt, datefmt=date_fmt, style="{")
+            )
+            handlers.append(file_handler)
 
-        debug = self.app_data["environment"]["debug_mode"]
+        debug = environment["debug_mode"]
         logging_level = logging.DEBUG if debug else logging.INFO
 
+        # Formatting and writing happen on the listener thread, the root logger only queues.
+        self.log_pipeline = LogPipeline(
+            handlers, queue_size=environment.get("log_queue_size", 10000)
+        )
+        atexit.register(self.log_pipeline.stop)
+
         # Configure root logger
         self.log = logging.getLogger()
         self.log.setLevel(logging_level)  # Set the desired log level
-        self.log.addHandler(console_handler)
-        self.log.addHandler(file_handler)
+        self.log_pipeline.install(self.log)
@@ -0,0 +1,230 @@
+import asyncio
+import functools
+import logging
+import selectors
+import threading
+from typing import Optional, Set
+
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer
+
+
+class _PollingSelector(selectors.BaseSelector):
+    """
+    Selector of a QtEventLoop, it never blocks while Qt drives the loop, the waiting
+    is left to the Qt event loop (a socket notifier on the selector or a timer).
+    """
+
+    def __init__(self, selector: selectors.BaseSelector) -> None:
+        self.selector = selector
+        self.blocking = True
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def select(self, timeout=None):
+        return self.selector.select(timeout if self.blocking else 0)
+
+    def close(self) -> None:
+        self.selector.close()
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def fileno(self) -> Optional[int]:
+        # epoll, kqueue and devpoll are file descriptors themselves, select isn't.
+        fileno = getattr(self.selector, "fileno", None)
+        return fileno() if fileno is not None else None
+
+
+class QtEventLoop(asyncio.SelectorEventLoop):
+    """
+    asyncio event loop driven by the Qt event loop of the thread it was attached on.
+
+    Each iteration runs from a Qt timer or socket notifier without blocking: the
+    ready callbacks are run on the next Qt tick, the scheduled ones when they are due
+    and the I/O ones when the selector reports them. While attached the loop is the
+    running loop of the thread, so tasks can be created from any slot.
+
+    Where the selector can't be watched (select on Windows), the I/O is polled every
+    POLL_INTERVAL milliseconds.
+    """
+
+    POLL_INTERVAL = 10
+
+    def __init__(self) -> None:
+        self.polling = _PollingSelector(selectors.DefaultSelector())
+        super().__init__(self.polling)
+        self.log = logging.getLogger("kore.asyncio")
+
+        self.qt = QObject()
+        self.timer = QTimer(self.qt)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._tick)
+
+        self.notifier: Optional[QSocketNotifier] = None
+        self.poll_timer: Optional[QTimer] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    ## Qt side.
+
+    def attach(self) -> "QtEventLoop":
+        """Hands the loop to the Qt event loop of the current thread."""
+        if self.is_running():
+            return self
+
+        self._check_closed()
+        self.polling.blocking = False
+        self._thread_id = threading.get_ident()
+        asyncio.events._set_running_loop(self)
+
+        fileno = self.polling.fileno()
+        if fileno is not None:
+            self.notifier = QSocketNotifier(fileno, QSocketNotifier.Read, self.qt)  # type:ignore
+            self.notifier.activated.connect(self._tick)
+        else:
+            self.poll_timer = QTimer(self.qt)
+            self.poll_timer.setInterval(self.POLL_INTERVAL)
+            self.poll_timer.timeout.connect(self._tick)
+            self.poll_timer.start()
+
+        self._schedule()
+        return self
+
+    def detach(self) -> None:
+        """Gives the loop back, run_until_complete and run_forever work again."""
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+            self.notifier.deleteLater()
+            self.notifier = None
+        if self.poll_timer is not None:
+            self.poll_timer.stop()
+            self.poll_timer = None
+
+        self.timer.stop()
+        self.polling.blocking = True
+        self._thread_id = None
+        if asyncio.events._get_running_loop() is self:
+            asyncio.events._set_running_loop(None)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """
+        Cancels the pending tasks and waits up to `timeout` seconds for them to
+        finish, then closes the loop like asyncio.run does.
+        """
+        if self.is_closed():
+            return
+
+        self.detach()
+        pending = asyncio.all_tasks(self)
+        for task in pending:
+            task.cancel()
+
+        try:
+            if pending:
+                self.run_until_complete(
+                    asyncio.wait_for(
+                        asyncio.gather(*pending, return_exceptions=True), timeout
+                    )
+                )
+            self.run_until_complete(self.shutdown_asyncgens())
+            self.run_until_complete(self.shutdown_default_executor())
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.log.warning("Tasks still running on shutdown were abandoned")
+        finally:
+            self.close()
+
+    def _tick(self, *args) -> None:
+        if not self.is_running() or self.is_closed():
+            return
+
+        self._run_once()
+        self._schedule()
+
+    def _schedule(self) -> None:
+        # Next tick: right away for ready callbacks, else when the first timer is due.
+        if self._ready:  # type:ignore
+            delay = 0
+        elif self._scheduled:  # type:ignore
+            when = self._scheduled[0]._when  # type:ignore
+            delay = max(0, int((when - self.time()) * 1000) + 1)
+        else:
+            return
+
+        if not self.timer.isActive() or self.timer.remainingTime() > delay:
+            self.timer.start(delay)
+
+    ## asyncio side.
+
+    def call_soon(self, callback, *args, context=None):
+        handle = super().call_soon(callback, *args, context=context)
+        if self.is_running():
+            self._schedule()
+        return handle
+
+    def call_at(self, when, callback, *args, context=None):
+        handle = super().call_at(when, callback, *args, context=context)
+        if self.is_running():
+            self._schedule()
+        return handle
+
+    def spawn(self, coro) -> asyncio.Task:
+        """
+        Creates a task that is kept alive until it's done, its exception (if any) is
+        logged instead of being lost with the task.
+        """
+        task = self.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log.error(f"Task {task.get_name()} failed", exc_info=task.exception())
+
+
+def asyncslot(function):
+    """
+    Makes a coroutine function connectable to signals, every call runs it as a task
+    of the running QtEventLoop:
+
+        button.clicked.connect(asyncslot(self.download))
+    """
+
+    @functools.wraps(function)
+    def slot(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        coro = function(*args, **kwargs)
+        if isinstance(loop, QtEventLoop):
+            return loop.spawn(coro)
+        return loop.create_task(coro)
+
+    return slot
+
+
+async def wait_signal(signal, timeout: Optional[float] = None):
+    """
+    Waits for the next emission of a signal and returns its arguments (a single
+    argument as is, None without arguments).
+
+    Args:
+        signal (SignalInstance): The bound signal to wait for.
+        timeout (float, optional): Seconds before asyncio.TimeoutError is raised.
+    """
+    future = asyncio.get_running_loop().create_future()
+
+    def receive(*args) -> None:
+        if not future.done():
+            future.set_result(args[0] if len(args) == 1 else (args or None))
+
+    signal.connect(receive)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        signal.disconnect(receive)
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import re
+import struct
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional
+
+from PySide6.QtCore import QCoreApplication, QObject, Signal
+from PySide6.QtGui import QFont, QFontDatabase
+
+if TYPE_CHECKING:
+    from .task_pool import TaskPool
+
+FONT_INDEX_PATH = "./.cache/font_index.json"
+FONT_EXTENSIONS = (
+    ".ttf",
+    ".otf",
+    ".ttc",
+    ".pfa",
+    ".pfb",
+)
+# Families of `font-family: a, b` and of `font: [style] [weight] 9pt a, b`.
+STYLESHEET_FAMILY = re.compile(
+    r"(?<![\w-])font(?:-family\s*:\s*|\s*:[^;}]*?\d(?:pt|px)\s+)([^;}]+)",
+    re.IGNORECASE,
+)
+
+# Name table ids of the (typographic) family names.
+FAMILY_NAME_IDS = (16, 1)
+WINDOWS_PLATFORM, MAC_PLATFORM = 3, 1
+
+
+def read_families(path: str) -> List[str]:
+    """
+    Returns the family names of a font file, read from the name table of each font
+    (TrueType, OpenType and collections) or the /FamilyName of Type 1 fonts. Only
+    the headers are read, the file stem is returned if they can't be parsed.
+    """
+    try:
+        with open(path, "rb") as font_file:
+            if path.lower().endswith((".pfa", ".pfb")):
+                families = _type1_families(font_file.read(8192))
+            else:
+                families = _sfnt_families(font_file)
+    except (OSError, struct.error, ValueError):
+        families = []
+
+    return families or [os.path.splitext(os.path.basename(path))[0]]
+
+
+def _sfnt_families(font_file) -> List[str]:
+    header = font_file.read(12)
+    if header[:4] == b"ttcf":
+        (count,) = struct.unpack(">I", header[8:12])
+        offsets = struct.unpack(f">{count}I", font_file.read(4 * count))
+    else:
+        offsets = (0,)
+
+    families: List[str] = []
+    for offset in offsets:
+        font_file.seek(offset + 4)
+        (tables,) = struct.unpack(">H", font_file.read(2))
+        font_file.seek(offset + 12)
+        directory = font_file.read(16 * tables)
+        for index in range(tables):
+            tag, _, table_offset, length = struct.unpack(
+                ">4sIII", directory[index * 16 : index * 16 + 16]
+            )
+            if tag == b"name":
+                font_file.seek(table_offset)
+                for family in _name_table_families(font_file.read(min(length, 2**16))):
+                    if family not in families:
+                        families.append(family)
+                break
+
+    return families
+
+
+def _name_table_families(table: bytes) -> List[str]:
+    _, count, strings = struct.unpack(">HHH", table[:6])
+    names: Dict[int, str] = {}
+    for index in range(count):
+        platform, _, language, name_id, length, offset = struct.unpack(
+            ">6H", table[6 + index * 12 : 18 + index * 12]
+        )
+        if name_id not in FAMILY_NAME_IDS or name_id in names:
+            continue
+
+        raw = table[strings + offset : strings + offset + length]
+        if platform == WINDOWS_PLATFORM and language in (0x409, 0):
+            names[name_id] = raw.decode("utf-16-be", "replace")
+        elif platform == MAC_PLATFORM and language == 0:
+            names.setdefault(name_id, raw.decode("latin-1"))
+
+    return [names[name_id] for name_id in FAMILY_NAME_IDS if name_id in names]
+
+
+def _type1_families(head: bytes) -> List[str]:
+    match = re.search(rb"/FamilyName\s*\((.*?)\)", head)
+    return [match.group(1).decode("latin-1")] if match else []
+
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as font_file:
+        return font_file.read()
+
+
+class FontRegistry(QObject):
+    """
+    Registers the fonts of a directory with Qt only when they are needed.
+
+    scan() indexes the family names of every font file from its headers (the index
+    is kept in FONT_INDEX_PATH and reused while the files don't change). A family is
+    registered with load() when it's needed right away, or preload() reads the files
+    on the task pool and registers them on the GUI thread as they come in. Families
+    used by a stylesheet are loaded by load_stylesheet().
+
+    The Interface keeps its registry in `App.fonts`, components build their fonts
+    with app_font() and register the families of their stylesheets with
+    load_stylesheet_fonts().
+    """
+
+    family_loaded = Signal(str)
+
+    def __init__(
+        self,
+        path: str,
+        tasks: Optional["TaskPool"] = None,
+        index_path: str = FONT_INDEX_PATH,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            path (str): Directory of the font files.
+            tasks (TaskPool, optional): Pool reading the preloaded files, without it
+                preload() loads them right away.
+            index_path (str): Where the family index is cached.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.fonts")
+        self.path = path
+        self.tasks = tasks
+        self.index_path = index_path
+
+        self.files: Dict[str, dict] = {}
+        self.families: Dict[str, List[str]] = {}
+        self.loaded: Dict[str, int] = {}
+        self.reading: Dict[str, Callable] = {}
+
+    def scan(self) -> None:
+        """Indexes the families of the font files, parsing only new or changed files."""
+        cached = self._read_index()
+        self.files.clear()
+        self.families.clear()
+        if not os.path.isdir(self.path):
+            return
+
+        parsed = 0
+        for entry in os.scandir(self.path):
+            if not entry.name.lower().endswith(FONT_EXTENSIONS):
+                continue
+
+            stat = entry.stat()
+            info = cached.get(entry.name)
+            if (
+                not info
+                or info["size"] != stat.st_size
+                or info["mtime"] != stat.st_mtime
+            ):
+                info = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "families": read_families(entry.path),
+                }
+                parsed += 1
+
+            self.files[entry.name] = info
+            for family in info["families"]:
+                self.families.setdefault(family.lower(), []).append(entry.name)
+
+        if parsed or len(cached) != len(self.files):
+            self._write_index()
+        self.log.debug(f"{len(self.files)} fonts indexed, {parsed} parsed")
+
+    def files_of(self, family: str) -> List[str]:
+        """Returns the files (styles) of a family, a file name is accepted as well."""
+        if family in self.files:
+            return [family]
+        return self.families.get(family.strip().strip("'\"").lower(), [])
+
+    def load(self, family: str) -> bool:
+        """Registers the fonts of a family now, returns False for an unknown family."""
+        loaded = False
+        for file_name in self.files_of(family):
+            if file_name in self.loaded:
+                loaded = loaded or self.loaded[file_name] != -1
+                continue
+
+            try:
+                data = _read_bytes(os.path.join(self.path, file_name))
+            except OSError as e:
+                self.log.error(f"Failed to read the font '{file_name}': {e}")
+                continue
+
+            loaded = self._register(file_name, data) or loaded
+
+        return loaded
+
+    def preload(self, families: Iterable[str]) -> None:
+        """Reads the fonts of the families in the background, then registers them."""
+        for family in families:
+            files = self.files_of(family)
+            if not files:
+                self.log.warning(f"No font file for the family '{family}'")
+                continue
+            if self.tasks is None:
+                self.load(family)
+                continue
+
+            for file_name in files:
+                if file_name not in self.loaded and file_name not in self.reading:
+                    self._read(file_name)
+
+    def _read(self, file_name: str) -> None:
+        handle = self.tasks.submit(  # type:ignore
+            _read_bytes,
+            os.path.join(self.path, file_name),
+            on_done=partial(self._preloaded, file_name),
+            on_error=partial(self._preload_failed, file_name),
+            lane="low",
+        )
+        self.reading[file_name] = handle.cancel
+
+    def load_stylesheet(self, sheet: str) -> None:
+        """Loads the families a stylesheet refers to (that are in the directory)."""
+        for match in STYLESHEET_FAMILY.finditer(sheet):
+            for family in match.group(1).split(","):
+                self.load(family)
+
+    def font(self, family: str, *args) -> QFont:
+        """Returns QFont(family, *args), after registering the family if needed."""
+        self.load(family)
+        return QFont(family, *args)
+
+    def _preloaded(self, file_name: str, data: bytes) -> None:
+        self.reading.pop(file_name, None)
+        if file_name not in self.loaded:
+            self._register(file_name, data)
+
+    def _preload_failed(self, file_name: str, error: Exception) -> None:
+        self.reading.pop(file_name, None)
+        self.log.error(f"Failed to read the font '{file_name}': {error}")
+
+    def _register(self, file_name: str, data: bytes) -> bool:
+        # A synchronous load wins over a pending read of the same file.
+        cancel = self.reading.pop(file_name, None)
+        if cancel is not None:
+            cancel()
+
+        font_id = QFontDatabase.addApplicationFontFromData(data)
+        if font_id == -1:
+            self.log.error(f"Failed to load the font '{file_name}'.")
+            self.loaded[file_name] = font_id
+            return False
+
+        self.loaded[file_name] = font_id
+        families = QFontDatabase.applicationFontFamilies(font_id)
+        info = self.files.get(file_name)
+        if info is not None and families and families != info["families"]:
+            # Qt named it differently than the headers, remember Qt's names.
+            info["families"] = list(families)
+            for family in families:
+                files = self.families.setdefault(family.lower(), [])
+                if file_name not in files:
+                    files.append(file_name)
+            self._write_index()
+
+        self.log.debug(f"'{file_name}' loaded !")
+        for family in families:
+            self.family_loaded.emit(family)
+        return True
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+        return index.get(os.path.abspath(self.path), {})
+
+    def _write_index(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = {}
+
+        index[os.path.abspath(self.path)] = self.files
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(self.index_path, "w", encoding="utf-8") as index_file:
+                json.dump(index, index_file)
+        except OSError as e:
+            self.log.warning(f"Couldn't write the font index: {e}")
+
+
+def app_fonts() -> Optional[FontRegistry]:
+    """Returns the FontRegistry of the running app, None outside of a kore app."""
+    return getattr(QCoreApplication.instance(), "fonts", None)
+
+
+def app_font(family: str, *args) -> QFont:
+    """Returns QFont(family, *args), registered by the FontRegistry of the app."""
+    registry = app_fonts()
+    if registry is None:
+        return QFont(family, *args)
+    return registry.font(family, *args)
+
+
+def load_stylesheet_fonts(*sheets: str) -> None:
+    """Registers the families the stylesheets refer to, see load_stylesheet."""
+    registry = app_fonts()
+    if registry is None:
+        return
+    for sheet in sheets:
+        registry.load_stylesheet(sheet)
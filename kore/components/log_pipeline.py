@@ -0,0 +1,308 @@
+import glob
+import gzip
+import itertools
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Mapping, NamedTuple, Optional, Tuple, Union
+
+LOG_FILE_NAME = "kore.log"
+LEGACY_LOG_PATTERN = "????-??-??_??-??-??.txt"
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Puts records on a bounded queue for the listener thread. The records are not
+    formatted here, formatting happens on the listener thread with the rest of the I/O.
+
+    When the queue is full, records below `block_level` are dropped right away (and
+    counted) while the others wait up to `block_timeout` seconds for room, so a burst
+    of debug lines can't stall the GUI thread but warnings and errors are kept.
+    """
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        block_level: int = logging.WARNING,
+        block_timeout: float = 0.5,
+    ) -> None:
+        super().__init__(log_queue)
+        self.block_level = block_level
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same process, the record goes through the queue untouched.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if record.levelno >= self.block_level:
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+
+        self.dropped += 1
+
+
+class _Listener(QueueListener):
+    """QueueListener that reports the records the handler had to drop."""
+
+    def __init__(self, log_queue, handler: BoundedQueueHandler, *handlers) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.queue_handler = handler
+        self.reported = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        dropped = self.queue_handler.dropped
+        if dropped != self.reported:
+            warning = logging.makeLogRecord(
+                {
+                    "name": "kore.logging",
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": "%d log records dropped, the log queue was full",
+                    "args": (dropped - self.reported,),
+                }
+            )
+            self.reported = dropped
+            super().handle(warning)
+
+        super().handle(record)
+
+
+class GzipRotator:
+    """
+    Namer and rotator of a RotatingFileHandler that gzips the rotated files on a
+    background thread, the handler only waits for a rename.
+    """
+
+    def __init__(self) -> None:
+        self.thread: Optional[threading.Thread] = None
+
+    def namer(self, name: str) -> str:
+        # The handler names the files to shift first, the running compression has
+        # to be over before they are looked up.
+        self.join()
+        return name + ".gz"
+
+    def __call__(self, source: str, dest: str) -> None:
+        pending = dest[: -len(".gz")] if dest.endswith(".gz") else dest
+        os.replace(source, pending)
+        self.thread = threading.Thread(
+            target=self._compress, args=(pending, dest), name="kore-log-gzip"
+        )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        if source == dest:
+            return
+
+        try:
+            with open(source, "rb") as raw, gzip.open(dest + ".tmp", "wb") as packed:
+                shutil.copyfileobj(raw, packed)
+            os.replace(dest + ".tmp", dest)
+            os.remove(source)
+        except OSError as e:
+            logging.getLogger("kore.logging").error(
+                f"Couldn't compress '{source}': {e}"
+            )
+
+
+class LogPipeline:
+    """
+    Asynchronous logging, the root logger only gets a BoundedQueueHandler and the
+    real handlers run on a QueueListener thread.
+
+    On stop the listener handles every record still queued before returning, the
+    pending log compression is given the same timeout.
+    """
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        queue_size: int = 10000,
+        block_level: int = logging.WARNING,
+    ) -> None:
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.handler = BoundedQueueHandler(self.queue, block_level=block_level)
+        self.handlers = handlers
+        self.listener = _Listener(self.queue, self.handler, *handlers)
+        self.rotators = [
+            handler.rotator
+            for handler in handlers
+            if isinstance(getattr(handler, "rotator", None), GzipRotator)
+        ]
+        self.running = False
+
+    def install(self, logger: Optional[logging.Logger] = None) -> logging.Logger:
+        """Starts the listener thread and attaches the queue handler to the logger."""
+        logger = logger or logging.getLogger()
+        logger.addHandler(self.handler)
+        self.listener.start()
+        self.running = True
+        return logger
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flushes the queued records, then closes the handlers."""
+        if not self.running:
+            return
+
+        self.running = False
+        logging.getLogger().removeHandler(self.handler)
+        try:
+            self.queue.put(self.listener._sentinel, timeout=timeout)  # type:ignore
+        except queue.Full:
+            pass
+
+        thread = self.listener._thread  # type:ignore
+        if thread is not None:
+            thread.join(timeout)
+            self.listener._thread = None  # type:ignore
+
+        for rotator in self.rotators:
+            rotator.join(timeout)
+        for handler in self.handlers:
+            handler.close()
+
+    @staticmethod
+    def rotating_file_handler(
+        log_dir: str,
+        max_bytes: int = 5 * 2**20,
+        backup_count: int = 5,
+        compress: bool = True,
+    ) -> RotatingFileHandler:
+        """
+        Returns a handler writing to `log_dir/kore.log`, rotated when it gets over
+        `max_bytes` and on every launch, keeping `backup_count` old files (gzipped if
+        `compress`). Older timestamped logs, one per launch, fall under the same count.
+        """
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, LOG_FILE_NAME)
+
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        if compress:
+            rotator = GzipRotator()
+            handler.namer = rotator.namer
+            handler.rotator = rotator
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            handler.doRollover()
+
+        legacy = sorted(glob.glob(os.path.join(log_dir, LEGACY_LOG_PATTERN)))
+        for old_log in legacy[: max(0, len(legacy) - backup_count)]:
+            try:
+                os.remove(old_log)
+            except OSError:
+                pass
+
+        return handler
+
+
+class LogEntry(NamedTuple):
+    """
+    Compact copy of a log record. The logger name is interned, and so is the template
+    of the records with arguments (a template without them is usually an f-string).
+    """
+
+    level: int
+    time: float
+    logger: str
+    template: str
+    # A tuple, or the mapping of the "%(key)s" templates.
+    args: Union[tuple, dict]
+
+    def message(self) -> str:
+        if not self.args:
+            return self.template
+        try:
+            return self.template % self.args
+        except (TypeError, ValueError):
+            return f"{self.template} {self.args}"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last `capacity` records in memory as LogEntry tuples. Arguments that
+    aren't plain values are kept as their repr, so no object outlives its record.
+
+    Every entry gets a sequence number, readers ask for the entries after the last
+    one they saw (from any thread).
+    """
+
+    PLAIN_TYPES = (str, int, float, bool, type(None))
+
+    def __init__(self, capacity: int = 10000, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.entries: deque = deque(maxlen=capacity)
+        self.total = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        args = record.args
+        if isinstance(args, tuple):
+            args = tuple(
+                arg if isinstance(arg, self.PLAIN_TYPES) else repr(arg) for arg in args
+            )
+        elif isinstance(args, Mapping):
+            args = {
+                key: value if isinstance(value, self.PLAIN_TYPES) else repr(value)
+                for key, value in args.items()
+            }
+        elif args:
+            args = (repr(args),)
+
+        template = record.msg if isinstance(record.msg, str) else str(record.msg)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            template = f"{template}\n{record.exc_text}"
+
+        entry = LogEntry(
+            record.levelno,
+            record.created,
+            sys.intern(record.name),
+            # Interned strings are never freed, only the reused templates are.
+            sys.intern(template) if args and len(template) < 256 else template,
+            args or (),
+        )
+        with self.lock:  # type:ignore
+            self.entries.append(entry)
+            self.total += 1
+
+    def since(self, sequence: int) -> Tuple[int, List[LogEntry]]:
+        """
+        Returns the sequence number of the newest entry and the entries after the
+        given one that are still kept.
+        """
+        with self.lock:  # type:ignore
+            new = min(self.total - sequence, len(self.entries))
+            if new <= 0:
+                return self.total, []
+
+            return self.total, list(
+                itertools.islice(self.entries, len(self.entries) - new, None)
+            )
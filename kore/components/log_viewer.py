@@ -0,0 +1,350 @@
+import logging
+import mmap
+import os
+import time
+from array import array
+from typing import List, Optional
+
+from PySide6.QtCore import (
+    QAbstractListModel,
+    QModelIndex,
+    QStringListModel,
+    Qt,
+    QTimer,
+)
+from PySide6.QtGui import QColor, QPalette
+from PySide6.QtWidgets import (
+    QApplication,
+    QComboBox,
+    QHBoxLayout,
+    QLineEdit,
+    QListView,
+    QStyledItemDelegate,
+    QVBoxLayout,
+    QWidget,
+)
+
+from .component import Component
+from .fonts import app_font
+from .log_pipeline import LogEntry, RingBufferHandler
+
+LOGS_PATH = "./logs"
+LOG_FILE_EXTENSIONS = (".log", ".txt")
+LIVE_SOURCE = "Live"
+
+LEVEL_COLORS = {
+    "D": "#4B7BEC",
+    "I": "#20BF6B",
+    "W": "#F7B731",
+    "E": "#EB3B5A",
+    "C": "#EB3B5A",
+}
+
+
+class LiveLogModel(QStringListModel):
+    """
+    The entries of a RingBufferHandler that pass the level, logger and search
+    filters, at most `capacity` rows are kept.
+
+    The rows are formatted once and kept by the C++ model, the list view queries the
+    row count for every row on each layout, a Python rowCount is too slow for that.
+    """
+
+    def __init__(self, capacity: int, parent=None) -> None:
+        super().__init__(parent)
+        self.capacity = capacity
+        self.rows: List[LogEntry] = []
+        self.min_level = logging.NOTSET
+        self.logger_prefix = ""
+        self.search = ""
+
+    @staticmethod
+    def format(entry: LogEntry) -> str:
+        clock = time.strftime("%H:%M:%S", time.localtime(entry.time))
+        millis = int(entry.time * 1000) % 1000
+        level = logging.getLevelName(entry.level)[0]
+        return f"{clock}.{millis:03d} {level} {entry.logger}: {entry.message()}"
+
+    def accepts(self, entry: LogEntry) -> bool:
+        if entry.level < self.min_level:
+            return False
+        if self.logger_prefix and not entry.logger.startswith(self.logger_prefix):
+            return False
+        if self.search and self.search not in entry.message().lower():
+            return False
+
+        return True
+
+    def append(self, entries: List[LogEntry]) -> None:
+        """Adds the accepted entries with one insert (and one removal if full)."""
+        entries = [entry for entry in entries if self.accepts(entry)]
+        entries = entries[-self.capacity :]
+        if not entries:
+            return
+
+        overflow = len(self.rows) + len(entries) - self.capacity
+        if overflow > 0:
+            self.removeRows(0, overflow)
+            del self.rows[:overflow]
+
+        row = len(self.rows)
+        self.insertRows(row, len(entries))
+        for offset, entry in enumerate(entries):
+            self.setData(self.index(row + offset), self.format(entry))
+        self.rows.extend(entries)
+
+    def narrow(self) -> None:
+        """Drops the rows the filters reject, when they only got stricter."""
+        self.reset(self.rows)
+
+    def reset(self, entries: List[LogEntry]) -> None:
+        self.rows = [entry for entry in entries if self.accepts(entry)]
+        self.rows = self.rows[-self.capacity :]
+        self.setStringList([self.format(entry) for entry in self.rows])
+
+
+class LevelDelegate(QStyledItemDelegate):
+    """Colors the rows of a LiveLogModel after the level letter of their text."""
+
+    LEVEL_OFFSET = len("00:00:00.000 ")
+
+    def initStyleOption(self, option, index) -> None:
+        super().initStyleOption(option, index)
+        if not isinstance(index.model(), LiveLogModel):
+            return
+
+        level = option.text[self.LEVEL_OFFSET : self.LEVEL_OFFSET + 1]
+        option.palette.setColor(
+            QPalette.Text, QColor(LEVEL_COLORS.get(level, "#D1D8E0"))  # type:ignore
+        )
+
+
+class LogFileModel(QAbstractListModel):
+    """
+    Lines of a log file read through mmap. The line offsets are indexed in chunks
+    as the view scrolls down (fetchMore), the file is never read as a whole.
+    """
+
+    CHUNK_LINES = 2000
+
+    def __init__(self, path: str, parent=None) -> None:
+        super().__init__(parent)
+        self.path = path
+        self.offsets = array("Q", [0])
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map: Optional[mmap.mmap] = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        )
+        self.size = size
+        self.indexed = 0
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.offsets) - 1
+
+    def data(self, index, role=Qt.DisplayRole):  # type:ignore
+        if not index.isValid() or role != Qt.DisplayRole:  # type:ignore
+            return None
+
+        start, end = self.offsets[index.row()], self.offsets[index.row() + 1]
+        return self.map[start:end].decode("utf-8", "replace").rstrip("\r\n")  # type:ignore
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return (
+            not parent.isValid() and self.map is not None and self.indexed < self.size
+        )
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        offsets = array("Q")
+        position = self.indexed
+        while len(offsets) < self.CHUNK_LINES and position < self.size:
+            newline = self.map.find(b"\n", position)  # type:ignore
+            position = self.size if newline == -1 else newline + 1
+            offsets.append(position)
+
+        if not offsets:
+            return
+
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row + len(offsets) - 1)
+        self.offsets.extend(offsets)
+        self.indexed = position
+        self.endInsertRows()
+
+
+class LogViewer(Component):
+    """
+    Live log viewer, displays the entries of the app RingBufferHandler through a
+    virtualized list with level/logger filters and incremental search. New entries are
+    pulled once per frame and inserted in one batch. The log files of ./logs can be
+    paged through as well.
+    """
+
+    def __init__(
+        self,
+        parent: QWidget | None = None,
+        handler: Optional[RingBufferHandler] = None,
+        capacity: int = 10000,
+    ) -> None:
+        """
+        Args:
+            parent (QWidget): The parent widget.
+            handler (RingBufferHandler, optional): Source of the live entries, defaults
+                to the `log_buffer` of the App.
+            capacity (int): Maximum amount of live rows.
+        """
+        super().__init__(parent)
+        self.FRAME_INTERVAL = 16
+        self.ROW_FONT = app_font("JetBrains Mono", 9)
+
+        self.handler = handler or getattr(QApplication.instance(), "log_buffer", None)
+        self.sequence = 0
+        self.live_model = LiveLogModel(capacity, self)
+        self.file_model: Optional[LogFileModel] = None
+
+        self.setup_ui()
+        self.pull_timer = QTimer(self)
+        self.pull_timer.setInterval(self.FRAME_INTERVAL)
+        self.pull_timer.timeout.connect(self.pull)
+
+        self.reload()
+
+    def setup_ui(self) -> None:
+        self.source_box = QComboBox()
+        self.source_box.currentTextChanged.connect(self.set_source)
+
+        self.level_box = QComboBox()
+        for level in ("DEBUG", "INFO", "WARNING", "ERROR"):
+            self.level_box.addItem(level, logging.getLevelName(level))
+        self.level_box.currentIndexChanged.connect(self._filters_changed)
+
+        self.logger_edit = QLineEdit()
+        self.logger_edit.setPlaceholderText("logger")
+        self.logger_edit.textChanged.connect(self._filters_changed)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("search")
+        self.search_edit.textChanged.connect(self._filters_changed)
+
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setFont(self.ROW_FONT)
+        self.list_view.setItemDelegate(LevelDelegate(self.list_view))
+        self.list_view.setModel(self.live_model)
+
+        filters = QHBoxLayout()
+        for widget in (self.source_box, self.level_box, self.logger_edit):
+            filters.addWidget(widget)
+        filters.addWidget(self.search_edit, 1)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filters)
+        layout.addWidget(self.list_view)
+
+    ## Sources.
+
+    def reload(self) -> None:
+        """Lists the live buffer and the log files of ./logs as sources."""
+        self.source_box.blockSignals(True)
+        current = self.source_box.currentText() or LIVE_SOURCE
+        self.source_box.clear()
+        self.source_box.addItem(LIVE_SOURCE)
+        if os.path.isdir(LOGS_PATH):
+            for name in sorted(os.listdir(LOGS_PATH), reverse=True):
+                if name.endswith(LOG_FILE_EXTENSIONS):
+                    self.source_box.addItem(name)
+        self.source_box.setCurrentText(current)
+        self.source_box.blockSignals(False)
+
+        self.set_source(self.source_box.currentText())
+
+    def set_source(self, name: str) -> None:
+        if self.file_model is not None:
+            self.file_model.close()
+            self.file_model.deleteLater()
+            self.file_model = None
+
+        live = name == LIVE_SOURCE
+        for widget in (self.level_box, self.logger_edit, self.search_edit):
+            widget.setEnabled(live)
+
+        if live:
+            self.list_view.setModel(self.live_model)
+            self._refill()
+            self._update_pulling()
+            return
+
+        self.pull_timer.stop()
+        self.file_model = LogFileModel(os.path.join(LOGS_PATH, name), self)
+        self.list_view.setModel(self.file_model)
+
+    ## Live entries.
+
+    def pull(self) -> None:
+        """Inserts the entries logged since the last frame."""
+        if self.handler is None:
+            return
+
+        sequence, entries = self.handler.since(self.sequence)
+        self.sequence = sequence
+        if not entries:
+            return
+
+        scrollbar = self.list_view.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        self.live_model.append(entries)
+        if follow:
+            self.list_view.scrollToBottom()
+
+    def _refill(self) -> None:
+        if self.handler is None:
+            return
+
+        self.sequence, entries = self.handler.since(0)
+        self.live_model.reset(entries)
+        self.list_view.scrollToBottom()
+
+    def _filters_changed(self) -> None:
+        model = self.live_model
+        level = self.level_box.currentData() or logging.NOTSET
+        logger_prefix = self.logger_edit.text().strip()
+        search = self.search_edit.text().lower()
+
+        # Stricter filters only narrow the current rows, anything else reads the buffer.
+        stricter = (
+            level >= model.min_level
+            and logger_prefix.startswith(model.logger_prefix)
+            and search.startswith(model.search)
+        )
+        model.min_level, model.logger_prefix, model.search = (
+            level,
+            logger_prefix,
+            search,
+        )
+        if stricter:
+            model.narrow()
+        else:
+            self._refill()
+
+    def _update_pulling(self) -> None:
+        live = self.list_view.model() is self.live_model
+        if self.isVisible() and live and self.handler is not None:
+            self.pull_timer.start()
+        else:
+            self.pull_timer.stop()
+
+    ## Events.
+
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        self._update_pulling()
+
+    def hideEvent(self, event) -> None:
+        super().hideEvent(event)
+        self._update_pulling()
@@ -1,29 +1,31 @@
 import re
+import time
 from collections import deque
 from typing import Tuple
 
-from PySide6.QtCore import (
-    QAbstractAnimation,
-    QDateTime,
-    QEvent,
-    QPoint,
-    QPropertyAnimation,
-    Qt,
-    QTimer,
-    Signal,
-)
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import (
     QFrame,
-    QGraphicsOpacityEffect,
     QGridLayout,
     QHBoxLayout,
     QLabel,
+    QListView,
     QSizePolicy,
     QToolButton,
 )
 
-from . import LinkHoverLabel
+from .animation import Fader
+from .fonts import load_stylesheet_fonts
+from .labels import LinkHoverLabel
+from .notification_model import (
+    HistoryRecord,
+    NotificationHistoryModel,
+    NotificationItemDelegate,
+    format_time,
+    make_record,
+)
+from .overlays import OverlayManager
 
 
 class NotificationHistoryWdgt(QFrame):
@@ -31,20 +33,37 @@ class NotificationHistoryWdgt(QFrame):
     started = Signal()
     dnd_changed = Signal(bool)
 
-    def __init__(self, root, dnd_state: bool):
+    def __init__(
+        self,
+        root,
+        dnd_state: bool,
+        list_mode: bool = False,
+        capacity: int | None = None,
+    ):
+        """
+        Args:
+            root (QMainWindow or Ui): The parent window for this panel.
+            dnd_state (bool): The initial 'Do Not Disturb Mode' state.
+            list_mode (bool): Paint the entries through a QListView and a delegate
+                instead of building a frame of widgets per entry.
+            capacity (int, optional): Maximum amount of entries kept, defaults to
+                MAX_NOTIFICATIONS or LIST_CAPACITY in list mode.
+        """
         super().__init__(root)
         self.root = root
+        self.overlays = OverlayManager.of(root)
 
         self.dnd_state = dnd_state
+        self.list_mode = list_mode
         self.LINK_COLOR = "#063970"
         self.FADE_ANI_DURATION = 100
-        self.BOTTOM_MARGIN = -22
+        self.OVERLAY_ORDER = 10
         self.MAX_HEIGHT = 400
         self.WIDTH = 310
         self.SPACING = 5
-        self.RIGHT_MARGIN = 5
         self.MAX_MSG_LENGTH = 23
         self.MAX_NOTIFICATIONS = 10
+        self.LIST_CAPACITY = 2000
         self.FIXED_HEIGHT = 28
         self.STYLE = """
             QFrame{
@@ -101,12 +120,43 @@ class NotificationHistoryWdgt(QFrame):
                 border-radius: 4px;
             }
             QLabel{border:none;}"""
-        self.INITIAL_MARGIN = -22
+        self.LIST_VIEW_STYLE = """
+            QListView{
+                background-color: transparent;
+                border: none;
+                padding: 0px;
+            }
+            QScrollBar:vertical{
+                background: transparent;
+                width: 4px;
+                margin-left: 2px;
+            }
+            QScrollBar::handle:vertical{
+                background-color: #40eeeeed;
+                border-radius: 1px;
+            }
+            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical{
+                height: 0px;
+            }"""
         self.DND_ICON_PATH = "./src/ui/assets/icons/dnd.svg"
+        load_stylesheet_fonts(
+            self.TOP_LABEL_STYLE,
+            self.MESSAGE_STYLE,
+            self.TIME_LABEL_STYLE,
+            self.CLOSE_BUTTON_STYLE,
+        )
+
+        if capacity is not None:
+            self.MAX_NOTIFICATIONS = capacity
+            self.LIST_CAPACITY = capacity
 
     def setup(self):
+        self.displayed = False
         self.current_index = 0
         self.label_map = deque()
+        self.records = deque(
+            maxlen=self.LIST_CAPACITY if self.list_mode else self.MAX_NOTIFICATIONS
+        )
 
         self.timestamp_timer = QTimer(self)
         self.timestamp_timer.setInterval(1000)
@@ -116,6 +166,8 @@ class NotificationHistoryWdgt(QFrame):
         self.setup_frame()
         self.setup_fade_ani()
         self.setup_top_and_layout(self.dnd_state)
+        if self.list_mode:
+            self.setup_list_view()
 
         ## Geometry=
         self.raise_()
@@ -134,16 +186,7 @@ class NotificationHistoryWdgt(QFrame):
         self.close()
 
     def setup_fade_ani(self) -> None:
-        self.opacityEffect = QGraphicsOpacityEffect(opacity=0)  # type:ignore
-        self.setGraphicsEffect(self.opacityEffect)
-
-        self.fade_ani = QPropertyAnimation(self.opacityEffect, b"opacity")
-        self.parent().installEventFilter(self)
-
-        self.fade_ani.setStartValue(0.0)
-        self.fade_ani.setEndValue(1.0)
-        self.fade_ani.setDuration(self.FADE_ANI_DURATION)
-        self.fade_ani.finished.connect(self.hide)
+        self.fader = Fader(self, self.FADE_ANI_DURATION)
 
     def setup_top_and_layout(self, dnd_state: bool) -> None:
         label = QLabel("Recent Notifications")
@@ -168,28 +211,100 @@ class NotificationHistoryWdgt(QFrame):
         self.QLayout.setSpacing(self.SPACING)
         self.QLayout.setContentsMargins(6, 6, 6, 9)
 
+    def setup_list_view(self) -> None:
+        """
+        Sets up the list view, ring buffer model and delegate used in list mode,
+        entries are painted by the delegate so they don't own any widget.
+        """
+        self.model = NotificationHistoryModel(self.LIST_CAPACITY, self)
+        self.delegate = NotificationItemDelegate(
+            self, row_height=self.FIXED_HEIGHT, spacing=self.SPACING
+        )
+
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(self.delegate)
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QListView.NoSelection)  # type:ignore
+        self.list_view.setVerticalScrollMode(QListView.ScrollPerPixel)  # type:ignore
+        self.list_view.setHorizontalScrollBarPolicy(
+            Qt.ScrollBarAlwaysOff  # type:ignore
+        )
+        self.list_view.setFocusPolicy(Qt.NoFocus)  # type:ignore
+        self.list_view.setStyleSheet(self.LIST_VIEW_STYLE)
+        self.list_view.setFixedHeight(0)
+
+        # Row changes are coalesced into a single resize per event loop iteration.
+        self.list_update_timer = QTimer(self)
+        self.list_update_timer.setSingleShot(True)
+        self.list_update_timer.setInterval(0)
+        self.list_update_timer.timeout.connect(self._update_list_height)
+
+        self.model.rowsInserted.connect(self.list_update_timer.start)
+        self.model.rowsRemoved.connect(self.list_update_timer.start)
+        self.model.modelReset.connect(self.list_update_timer.start)
+
+        self.QLayout.addWidget(self.list_view, 1, 0)  # type:ignore
+
     ## ITEMS
 
     def add_item(self, color: str, msg: str) -> None:
         """
-        Adds a new item with the specified color and message to the notification list.
+        Adds a new item with the specified color and message to the notification list,
+        while the panel is hidden only the record is stored and the rows are built
+        when the panel is displayed.
+        """
+        self.records.append(make_record(color, msg))
+        if self.displayed:
+            self.materialize()
+
+    def materialize(self) -> None:
+        """
+        Brings the displayed rows in sync with the stored records, building only the
+        rows that are missing and deleting the ones whose record was dropped.
+        """
+        if self.list_mode:
+            if self.records:
+                self.model.extend(self.records)
+                self.records.clear()
+            return
+
+        alive = {id(record) for record in self.records}
+        for record, _, frame in self.label_map:
+            if id(record) not in alive:
+                frame.deleteLater()
+
+        self.label_map = deque(row for row in self.label_map if id(row[0]) in alive)
+        built = {id(row[0]) for row in self.label_map}
+        new_rows = [record for record in self.records if id(record) not in built]
+        if not new_rows:
+            return
+
+        for record in new_rows:
+            self._build_row(record)
+
+        self._update_layout()
+
+    def _build_row(self, record: HistoryRecord) -> None:
+        """
+        Builds the frame of widgets that displays a record and adds it to the layout.
         """
-        current_time = QDateTime.currentDateTime()
         frame, layout = self._create_frame()
 
-        label = self._create_message_label(msg)
+        label = self._create_message_label(record.message)
         layout.addWidget(label)
 
         time_label = self._create_time_label()
-        closeButton = self._create_close_button(color, frame)
+        time_label.setText(self.format_time(int(time.time() - record.timestamp)))
+        closeButton = self._create_close_button(record.color, frame)
 
         self._assemble_layout(layout, time_label, closeButton)
-        self._configure_frame(frame, color)
+        self._configure_frame(frame, record.color)
 
         # Update mappings and layout.
         self.current_index += 1
-        self.label_map.append((layout, time_label, current_time, frame))
-        self._update_layout(frame)
+        self.label_map.append((record, time_label, frame))
+        self.QLayout.addWidget(frame, self.current_index, 0)  # type:ignore
 
     def _create_frame(self) -> Tuple[QFrame, QHBoxLayout]:
         """
@@ -254,15 +369,29 @@ class NotificationHistoryWdgt(QFrame):
         frame.setStyleSheet(self.FRAME_STYLE.replace("&color", color))
         frame.show()
 
-    def _update_layout(self, frame: QFrame) -> None:
+    def _update_layout(self) -> None:
         """
-        Updates the main layout to include the new frame and refreshes the display.
+        Updates the main layout after new frames were added and refreshes the display.
         """
-        self.QLayout.addWidget(frame, self.current_index, 0)  # type:ignore
         self.QLayout.update()
         self.adjustSize()
+        self.adjust_geo()
         self.repaint()
 
+    def _update_list_height(self) -> None:
+        """
+        Grows the list view with its rows until the panel reaches MAX_HEIGHT,
+        from there on the view scrolls.
+        """
+        header_height = self.sizeHint().height() - self.list_view.height()
+        rows_height = self.model.rowCount() * (self.FIXED_HEIGHT + self.SPACING)
+        self.list_view.setFixedHeight(
+            min(rows_height, self.MAX_HEIGHT - max(header_height, 0))
+        )
+        self.adjustSize()
+        self.adjust_geo()
+        self.list_view.scrollToBottom()
+
     ## BUTTON ACTION
 
     def update_dnd(self) -> None:
@@ -274,9 +403,19 @@ class NotificationHistoryWdgt(QFrame):
 
     def close_frame(self, frame: QFrame) -> None:
         """
-        Closes the specified frame and triggers a refresh of the layout.
+        Closes the specified frame, forgets its record and triggers a refresh of the layout.
         """
+        for row in self.label_map:
+            if row[2] is frame:
+                self.label_map.remove(row)
+                self.records = deque(
+                    (record for record in self.records if record is not row[0]),
+                    maxlen=self.records.maxlen,
+                )
+                break
+
         frame.close()
+        frame.deleteLater()
         self.refresh()
 
     ## HELPERS
@@ -304,117 +443,74 @@ class NotificationHistoryWdgt(QFrame):
         Returns:
             str: A formatted string representing the time duration.
         """
-        hours, remainder = divmod(seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-
-        if hours > 0:
-            return f"{int(hours)}h {int(minutes)}m"
-        elif minutes > 0:
-            return f"{int(minutes)}m {int(seconds)}s"
-        else:
-            return f"{int(seconds)}s"
+        return format_time(seconds)
 
     ## DISPLAY
 
     def display(self, toggle: bool) -> None:
         """
         Controls the display of the panel based on the toggle parameter. If true,
-        it shows and starts the fade-in animation along with the timer. If false, it stops
-        the timer and initiates the fade-out animation.
+        it builds the pending rows and starts the fade-in animation along with the timer.
+        If false, it stops the timer and initiates the fade-out animation, closing the
+        panel once it's finished.
 
         Args:
             toggle (bool): Determines whether to show or hide the panel.
         """
+        self.displayed = toggle
         if toggle:
-            self.show()
-            self.fade_ani.setDirection(QAbstractAnimation.Direction.Forward)
-            self.fade_ani.start()
+            self.materialize()
+            if self.list_mode:
+                self.list_update_timer.stop()
+                self._update_list_height()
             self.refresh()
+            self.overlays.add(self, self.OVERLAY_ORDER)
+            self.fader.fade_in()
 
             self.timestamp_timer.start()
             self.started.emit()
 
         else:
             self.timestamp_timer.stop()
-            self.fade_ani.setDirection(QAbstractAnimation.Direction.Backward)
-            self.fade_ani.start()
-
-    def hide(self) -> None:
-        """
-        Closes the panel when the fade-out animation is complete, ensuring
-        that the panel is only closed if the animation is in the backward direction.
-        """
-        if self.fade_ani.direction() == QAbstractAnimation.Direction.Backward:
-            self.close()
+            self.fader.fade_out(self.close)
 
     def refresh(self) -> None:
         """
-        Updates the notification list by removing excess items and refreshing the time
-        labels of remaining items to reflect the current time.
+        Refreshes the time labels of the displayed items to reflect the current time.
         """
-        current_time = QDateTime.currentDateTime()
+        if self.list_mode:
+            # Relative times are painted by the delegate, a repaint updates them.
+            self.list_view.viewport().update()
+            return
 
-        # Remove excess items to maintain the maximum item display limit.
-        while len(self.label_map) > self.MAX_NOTIFICATIONS:
-            _, _, _, frame = (
-                self.label_map.popleft()
-            )  # Remove the oldest item from the deque.
-            frame.deleteLater()  # Ensure the removed frame is deleted.
+        current_time = time.time()
 
         self.adjustSize()  # Adjust the size of the notification container.
         self.adjust_geo()  # Adjust the geometry to reposition the notification.
 
         # Update the time labels for all remaining notifications.
-        for _, time_label, old_time, _ in self.label_map:
-            time_difference = old_time.secsTo(
-                current_time
+        for record, time_label, _ in self.label_map:
+            time_difference = int(
+                current_time - record.timestamp
             )  # Calculate the time difference.
             time_str = self.format_time(time_difference)  # Format the time difference.
             time_label.setText(time_str)  # Update the time label text.
 
     ## POSITION
 
-    def move_up(self, new_bottom_margin: int) -> None:
+    def adjust_geo(self) -> None:
         """
-        Adjusts the panels's bottom margin to move it upwards and then updates its geometry.
-
-        Args:
-            new_bottom_margin (int): The new bottom margin value to move the panel up..
+        Requests a new position for the panel, the overlay manager of the parent window
+        stacks it above the notifications on the next frame.
         """
-        margin = -(new_bottom_margin + 25)  # adjust for the the notification height
-        self.BOTTOM_MARGIN = margin
-        self.adjust_geo()
-
-    def move_down(self):
-        """
-        Resets the panel's bottom margin to its default value and updates its geometry.
-        """
-        self.BOTTOM_MARGIN = self.INITIAL_MARGIN
-        self.adjust_geo(self)
-
-    def adjust_geo(self, e=None) -> None:
-        """
-        Adjusts the geometry of the panel frame relative to its parent, considering
-        specified right and bottom margins.
-        """
-        parentRect = self.parent().rect()  # type:ignore
-        geo = self.geometry()
-        geo.moveBottomRight(
-            parentRect.bottomRight() + QPoint(-self.RIGHT_MARGIN, self.BOTTOM_MARGIN)
-        )
-        self.setGeometry(geo)
+        self.overlays.request_layout()
 
     ## EVENTS
 
     def closeEvent(self, event):
+        self.overlays.remove(self)
         self.closed.emit()
 
-    def eventFilter(self, watched, event):
-        if watched == self.parent() and event.type() == QEvent.Resize:  # type:ignore
-            self.adjust_geo()
-
-        return super(NotificationHistoryWdgt, self).eventFilter(watched, event)
-
     def resizeEvent(self, event):
         super(NotificationHistoryWdgt, self).resizeEvent(event)
         self.clearMask()
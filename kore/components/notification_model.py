@@ -0,0 +1,234 @@
+import re
+import time
+from collections import deque
+from typing import Iterable, NamedTuple
+
+from PySide6.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QRect,
+    QRectF,
+    QSize,
+    Qt,
+)
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+from PySide6.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem
+
+from .fonts import app_font
+
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\((https?://[^\)]+)\)")
+
+
+class HistoryRecord(NamedTuple):
+    """A single entry of the notification history, kept as plain data."""
+
+    color: str
+    text: str
+    message: str
+    timestamp: float
+
+
+def make_record(color: str, msg: str) -> HistoryRecord:
+    """
+    Builds a history record from a level color and a (markdown) message, the
+    display text has the links replaced by their label.
+    """
+    text = LINK_PATTERN.sub(r"\1", msg)
+    return HistoryRecord(color, text, msg, time.time())
+
+
+def format_time(seconds: int) -> str:
+    """
+    Formats a given time in seconds into a more readable format, displaying hours, minutes, and seconds as necessary.
+
+    Args:
+        seconds (int): The time duration in seconds to be formatted.
+
+    Returns:
+        str: A formatted string representing the time duration.
+    """
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    if hours > 0:
+        return f"{int(hours)}h {int(minutes)}m"
+    elif minutes > 0:
+        return f"{int(minutes)}m {int(seconds)}s"
+    else:
+        return f"{int(seconds)}s"
+
+
+class NotificationHistoryModel(QAbstractListModel):
+    """
+    Ring buffer of history records, once the capacity is reached the oldest
+    record is dropped for every new one.
+    """
+
+    RecordRole = Qt.UserRole + 1  # type:ignore
+
+    def __init__(self, capacity: int, parent=None) -> None:
+        super().__init__(parent)
+        self.capacity = capacity
+        self._records: deque = deque()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self._records)
+
+    def data(self, index, role=Qt.DisplayRole):  # type:ignore
+        if not index.isValid():
+            return None
+
+        record = self._records[index.row()]
+        if role == Qt.DisplayRole:  # type:ignore
+            return record.text
+        if role == Qt.ToolTipRole:  # type:ignore
+            return record.message
+        if role == self.RecordRole:
+            return record
+
+        return None
+
+    def append(self, record: HistoryRecord) -> None:
+        """Appends a record, dropping the oldest one if the buffer is full."""
+        if len(self._records) >= self.capacity:
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self._records.popleft()
+            self.endRemoveRows()
+
+        row = len(self._records)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._records.append(record)
+        self.endInsertRows()
+
+    def extend(self, records: Iterable[HistoryRecord]) -> None:
+        """Appends several records with a single insert notification."""
+        records = list(records)[-self.capacity :]
+        if not records:
+            return
+
+        overflow = len(self._records) + len(records) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._records.popleft()
+            self.endRemoveRows()
+
+        row = len(self._records)
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self._records.extend(records)
+        self.endInsertRows()
+
+    def removeRows(self, row: int, count: int, parent=QModelIndex()) -> bool:
+        if parent.isValid() or row < 0 or row + count > len(self._records):
+            return False
+
+        self.beginRemoveRows(parent, row, row + count - 1)
+        self._records.rotate(-row)
+        for _ in range(count):
+            self._records.popleft()
+        self._records.rotate(row)
+        self.endRemoveRows()
+        return True
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._records.clear()
+        self.endResetModel()
+
+
+class NotificationItemDelegate(QStyledItemDelegate):
+    """
+    Paints a history record (level color, elided text, relative time and a
+    close glyph) without creating any widget for it.
+    """
+
+    def __init__(self, parent=None, row_height: int = 28, spacing: int = 5) -> None:
+        super().__init__(parent)
+        self.ROW_HEIGHT = row_height
+        self.SPACING = spacing
+        self.PADDING = 7
+        self.CLOSE_WIDTH = 18
+        self.RADIUS = 4
+        self.TEXT_COLOR = QColor("#070707")
+        self.MESSAGE_FONT = app_font("Video", 10)
+        self.TIME_FONT = app_font("Video", 9)
+        self.CLOSE_FONT = app_font("Video", 9, QFont.Black)  # type:ignore
+
+        self._message_metrics = QFontMetrics(self.MESSAGE_FONT)
+        self._time_metrics = QFontMetrics(self.TIME_FONT)
+
+    def sizeHint(self, option: QStyleOptionViewItem, index) -> QSize:
+        return QSize(option.rect.width(), self.ROW_HEIGHT + self.SPACING)
+
+    def _item_rect(self, option: QStyleOptionViewItem) -> QRect:
+        return option.rect.adjusted(0, 0, 0, -self.SPACING)
+
+    def _close_rect(self, rect: QRect) -> QRect:
+        return QRect(
+            rect.right() - self.CLOSE_WIDTH, rect.top(), self.CLOSE_WIDTH, rect.height()
+        )
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index) -> None:
+        record: HistoryRecord = index.data(NotificationHistoryModel.RecordRole)
+        if record is None:
+            return
+
+        rect = self._item_rect(option)
+        color = QColor(f"#{record.color}")
+        background = QColor(color)
+        background.setAlpha(0x99)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)  # type:ignore
+        painter.setPen(QPen(color, 1))
+        painter.setBrush(background)
+        painter.drawRoundedRect(
+            QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5), self.RADIUS, self.RADIUS
+        )
+
+        close_rect = self._close_rect(rect)
+        time_text = format_time(max(0, int(time.time() - record.timestamp)))
+        time_width = self._time_metrics.horizontalAdvance(time_text)
+        time_rect = QRect(
+            close_rect.left() - time_width - self.PADDING,
+            rect.top(),
+            time_width + self.PADDING,
+            rect.height(),
+        )
+        text_rect = QRect(
+            rect.left() + self.PADDING,
+            rect.top(),
+            time_rect.left() - rect.left() - self.PADDING,
+            rect.height(),
+        )
+
+        painter.setPen(self.TEXT_COLOR)
+        painter.setFont(self.MESSAGE_FONT)
+        text = self._message_metrics.elidedText(
+            record.text, Qt.ElideRight, text_rect.width()  # type:ignore
+        )
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)  # type:ignore
+
+        painter.setFont(self.TIME_FONT)
+        painter.drawText(time_rect, Qt.AlignVCenter | Qt.AlignLeft, time_text)  # type:ignore
+
+        painter.setFont(self.CLOSE_FONT)
+        painter.drawText(close_rect, Qt.AlignCenter, "x")  # type:ignore
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index) -> bool:
+        # Erase the record when its close glyph is clicked.
+        if (
+            event.type() == QEvent.MouseButtonRelease  # type:ignore
+            and event.button() == Qt.LeftButton  # type:ignore
+            and self._close_rect(self._item_rect(option)).contains(
+                event.position().toPoint()
+            )
+        ):
+            model.removeRows(index.row(), 1)
+            return True
+
+        return super().editorEvent(event, model, option, index)
@@ -1,27 +1,19 @@
 import re
 from typing import Optional
 
-from PySide6.QtCore import (
-    QAbstractAnimation,
-    QDateTime,
-    QEvent,
-    QPoint,
-    QPropertyAnimation,
-    Qt,
-    QTimer,
-    Signal,
-    SignalInstance,
-)
+from PySide6.QtCore import QDateTime, Qt, QTimer, Signal, SignalInstance
 from PySide6.QtWidgets import (
     QFrame,
-    QGraphicsOpacityEffect,
     QGridLayout,
     QLabel,
     QSizePolicy,
     QToolButton,
 )
 
-from . import LinkHoverLabel
+from .animation import Fader
+from .fonts import load_stylesheet_fonts
+from .labels import LinkHoverLabel
+from .overlays import OverlayManager
 
 
 class NotificationWdgt(QFrame):
@@ -30,7 +22,9 @@ class NotificationWdgt(QFrame):
     """
 
     closed = Signal()
-    move_up = Signal(int)
+    displayed = Signal()
+    paused = Signal()
+    faded = Signal()
 
     def __init__(
         self,
@@ -57,10 +51,10 @@ class NotificationWdgt(QFrame):
         """
         super().__init__(root)
         self.root = root
+        self.overlays = OverlayManager.of(root)
 
         self.LINK_COLOR = "#063970"
-        self.RIGHT_MARGIN = 5
-        self.BOTTOM_MARGIN = 22
+        self.OVERLAY_ORDER = 0
         self.SPACING = 5
         self.WIDTH = 310
         self.LABEL_FIXED_WIDTH = 300
@@ -105,9 +99,13 @@ class NotificationWdgt(QFrame):
                 font:  8pt "JetBrains Mono";
             }
         """
+        load_stylesheet_fonts(
+            self.MESSAGE_STYLE, self.CLOSE_BTN_STYLE, self.TIMESTAMP_STYLE
+        )
 
         self.permanent = permanent
         self.message = message
+        self.expiring = False
 
         self.color = color
         self.bg = background
@@ -147,24 +145,14 @@ class NotificationWdgt(QFrame):
     def setup_fade_animation(self) -> None:
         """
         Initializes the fade animation for the frame, including setting up a timer for
-        the animation duration and configuring the opacity effect for the fade-in and fade-out animations.
+        the animation duration and the fader driven by the shared animation clock.
         """
         ## Set up the close timer.
         self.fade_timer = QTimer(singleShot=True, timeout=self.fade)  # type:ignore
         self.fade_timer.setInterval(self.duration)
 
-        ## Set up the opacity effect for show/fade animation.
-        self.opacityEffect = QGraphicsOpacityEffect(opacity=0)  # type:ignore
-        self.setGraphicsEffect(self.opacityEffect)
-
-        self.fade_ani = QPropertyAnimation(self.opacityEffect, b"opacity")
-        self.parent().installEventFilter(self)
-
-        self.fade_ani.setStartValue(0.0)
-        self.fade_ani.setEndValue(1)
-        self.fade_ani.setDuration(self.FADE_DURATION)
-        if not self.permanent:
-            self.fade_ani.finished.connect(self.hide)
+        ## Set up the fader for show/fade animation.
+        self.fader = Fader(self, self.FADE_DURATION, on_enter=self.pause_fade)
 
     def set_attributes(self) -> None:
         """
@@ -176,8 +164,7 @@ class NotificationWdgt(QFrame):
         self.message_label.setWordWrap(True)
         self.message_label.setFixedWidth(self.LABEL_FIXED_WIDTH)
 
-        transformed_message = self.__transform_link(self.message)
-        self.message_label.setText(transformed_message)
+        self.message_label.setText(self.__transform_link(self.message))
         self.message_label.setStyleSheet(self._format_style(self.MESSAGE_STYLE))
 
         ## Set up close button.
@@ -225,15 +212,10 @@ class NotificationWdgt(QFrame):
 
     def adjust_geo(self) -> None:
         """
-        Adjusts the geometry of the notification frame relative to its parent, considering
-        specified right and bottom margins.
+        Requests a new position for the notification, the overlay manager of the parent
+        window stacks it with the rest of the overlays on the next frame.
         """
-        parentRect = self.parent().rect()  # type:ignore
-        geo = self.geometry()
-        geo.moveBottomRight(
-            parentRect.bottomRight() + QPoint(-self.RIGHT_MARGIN, -self.BOTTOM_MARGIN)
-        )
-        self.setGeometry(geo)
+        self.overlays.request_layout()
 
     def _format_style(self, style: str) -> str:
         """
@@ -260,47 +242,65 @@ class NotificationWdgt(QFrame):
 
     def display(self) -> None:
         """
-        Displays the notification with a fade-in animation,
-        starts the move-up animation for the recent notifications panel,
-        and initiates the fade timer and fade animation.
+        Displays the notification with a fade-in animation, placing it in the overlay stack
+        of the window (the overlays above it slide up), and initiates the fade timer.
         """
         self.setup()
-
-        self.show()
+        self.overlays.add(self, self.OVERLAY_ORDER)
 
         self.fade_timer.start()
-        self.fade_ani.start()
-        self.move_up.emit(self.height())
-
-    def hide(self) -> None:
-        """
-        Hides the notification when the fade-out animation is complete, ensuring
-        that the notification is only closed if the animation is in the backward direction.
-        """
-        if self.fade_ani.direction() == QAbstractAnimation.Direction.Backward:
-            self.close()
+        self.fader.fade_in()
+        self.displayed.emit()
 
     def fade(self) -> Optional[SignalInstance]:
         """
-        Triggers the fade-out animation if the notification is not marked as permanent.
+        Triggers the fade-out animation if the notification is not marked as permanent,
+        the notification is closed once it's finished.
         """
         if not self.permanent:
-            self.fade_ani.setDirection(QAbstractAnimation.Direction.Backward)
-            self.fade_ani.start()
-            return self.fade_ani.finished
+            self.fader.fade_out(self._faded)
+            return self.faded
 
         return None
 
+    def expire(self) -> None:
+        """
+        Fades the notification out right away, even if it's permanent or hovered, used
+        to free its place for a more important one.
+        """
+        self.expiring = True
+        self.fade_timer.stop()
+        self.fader.fade_out(self._faded)
+
+    def set_message(self, message: str) -> None:
+        """
+        Replaces the message of a displayed notification and restarts its timer.
+
+        Args:
+            message (str): The new message, links are transformed like in the original one.
+        """
+        self.message = message
+        self.message_label.setText(self.__transform_link(message))
+        self.adjustSize()
+        self.adjust_geo()
+
+        if not self.underMouse():
+            self.fade_timer.start()
+
+    def _faded(self) -> None:
+        self.faded.emit()
+        self.close()
+
     def pause_fade(self) -> None:
         """
         Pauses the fade-out animation and timer, setting the notification's opacity to full.
         """
+        if self.expiring:
+            return
+
         self.fade_timer.stop()
-        self.fade_ani.stop()
-        if self.parent():
-            self.opacityEffect.setOpacity(1.0)
-        else:
-            self.setWindowOpacity(1.0)
+        self.fader.stop(1.0)
+        self.paused.emit()
 
     ## Events.
 
@@ -310,20 +310,15 @@ class NotificationWdgt(QFrame):
 
     def leaveEvent(self, event) -> None:
         # Restore the fade timer when mouse leaves.
-        self.fade_timer.start()
+        if not self.expiring:
+            self.fade_timer.start()
 
     def closeEvent(self, event) -> None:
-        # Close the notification and emit closed signal.
+        # Close the notification, free its place in the overlay stack and emit closed signal.
+        self.overlays.remove(self)
         self.deleteLater()
         self.closed.emit()
 
-    def eventFilter(self, watched, event) -> bool:
-        # Handle resize event for the parent and adjust the notification accordingly.
-        if watched == self.parent() and event.type() == QEvent.Resize:  # type:ignore
-            self.adjust_geo()
-
-        return super(NotificationWdgt, self).eventFilter(watched, event)
-
     def resizeEvent(self, event) -> None:
         # Clear the mask on resize.
         super(NotificationWdgt, self).resizeEvent(event)
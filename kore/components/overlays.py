@@ -0,0 +1,144 @@
+from typing import List, Optional
+
+from PySide6.QtCore import QEvent, QObject, QPoint
+from PySide6.QtWidgets import QWidget
+
+from .animation import Animation, AnimationClock
+
+
+class OverlayManager(QObject):
+    """
+    Owns the floating overlays (toasts, panels) of a window and stacks them up from its
+    bottom right corner. A single event filter on the window replaces one per overlay,
+    and live resizes are coalesced into one layout pass per frame.
+    """
+
+    RIGHT_MARGIN = 5
+    BOTTOM_MARGIN = 22
+    SPACING = 3
+    SLIDE_DURATION = 120
+
+    def __init__(self, window: QWidget) -> None:
+        super().__init__(window)
+        self.window = window
+
+        self.overlays: List[list] = []
+        self.slides: dict = {}
+        self.layout_passes = 0
+        self._count = 0
+        self._animate_next = True
+
+        self.window.installEventFilter(self)
+
+    @classmethod
+    def of(cls, window: QWidget) -> "OverlayManager":
+        """Returns the overlay manager of a window, creating it if it has none."""
+        manager = getattr(window, "overlays", None)
+        if not isinstance(manager, OverlayManager):
+            manager = cls(window)
+            window.overlays = manager  # type:ignore
+
+        return manager
+
+    def add(self, widget: QWidget, order: int = 0) -> None:
+        """
+        Places an overlay in the stack right away, the rest of the overlays slide to
+        make room for it.
+
+        Args:
+            widget (QWidget): A child of the window.
+            order (int): Overlays with a lower order are stacked closer to the bottom,
+                overlays with the same order are stacked by insertion.
+        """
+        if self._entry(widget) is None:
+            self._count += 1
+            key = self._count
+            self.overlays.append([order, key, widget, False])
+            self.overlays.sort(key=lambda entry: (entry[0], entry[1]))
+            widget.destroyed.connect(lambda *_: self._drop(key))
+
+        self.layout(animate=True)
+
+    def remove(self, widget: QWidget) -> None:
+        """Removes an overlay, the overlays above it slide down on the next frame."""
+        entry = self._entry(widget)
+        if entry is None:
+            return
+
+        self._drop(entry[1])
+        self.request_layout(animate=True)
+
+    def request_layout(self, animate: bool = False) -> None:
+        """Lays the overlays out on the next frame, several requests make a single pass."""
+        self._animate_next = self._animate_next and animate
+        AnimationClock.instance().call_next_frame(self, self._scheduled_layout)
+
+    def layout(self, animate: bool = False) -> None:
+        """
+        Stacks every overlay from the bottom right corner of the window.
+
+        Args:
+            animate (bool): Slide the overlays that were already placed to their new
+                position instead of moving them.
+        """
+        self.layout_passes += 1
+        rect = self.window.rect()
+        right = rect.right() - self.RIGHT_MARGIN
+        bottom = rect.bottom() - self.BOTTOM_MARGIN
+
+        for entry in self.overlays:
+            widget: QWidget = entry[2]
+            geo = widget.geometry()
+            geo.moveBottomRight(QPoint(right, bottom))
+            bottom -= geo.height() + self.SPACING
+
+            target = geo.topLeft()
+            if animate and entry[3] and widget.pos() != target:
+                self._slide(entry[1], widget, target)
+            else:
+                self._stop_slide(entry[1])
+                if widget.pos() != target:
+                    widget.move(target)
+
+            entry[3] = True
+
+    def _scheduled_layout(self) -> None:
+        animate = self._animate_next
+        self._animate_next = True
+        self.layout(animate)
+
+    def _slide(self, key: int, widget: QWidget, target: QPoint) -> None:
+        slide: Optional[Animation] = self.slides.get(key)
+        if slide is not None and slide.end == target:
+            return
+
+        self._stop_slide(key)
+        self.slides[key] = AnimationClock.instance().start(
+            Animation(
+                widget.pos(),
+                target,
+                self.SLIDE_DURATION,
+                widget.move,
+                lambda: self.slides.pop(key, None),
+            )
+        )
+
+    def _stop_slide(self, key: int) -> None:
+        AnimationClock.instance().stop(self.slides.pop(key, None))
+
+    def _entry(self, widget: QWidget) -> Optional[list]:
+        for entry in self.overlays:
+            if entry[2] is widget:
+                return entry
+
+        return None
+
+    def _drop(self, key: int) -> None:
+        self._stop_slide(key)
+        self.overlays = [entry for entry in self.overlays if entry[1] != key]
+
+    def eventFilter(self, watched, event) -> bool:
+        if watched == self.window and event.type() == QEvent.Resize:  # type:ignore
+            self.request_layout()
+
+        return super().eventFilter(watched, event)
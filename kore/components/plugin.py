@@ -1,6 +1,44 @@
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
 from PySide6.QtCore import QObject
 
+if TYPE_CHECKING:
+    from ..managers.plugins import PluginManifest
+
 
 class Plugin(QObject):
+    """
+    Base class of the plugins, the class named by the `entry` of a manifest. It's
+    created when one of the activation events of the plugin fires for the first time,
+    activate() is called right after and deactivate() when the app closes.
+    """
+
+    manifest: Optional["PluginManifest"] = None
+
     def __init__(self, parent: QObject | None) -> None:
         super().__init__(parent)
+        self.window = parent
+        self.commands: Dict[str, Callable] = {}
+        self.subscriptions: Dict[str, List[Callable]] = {}
+
+    def activate(self) -> None:
+        """Sets up the plugin, the activation event is dispatched once it returns."""
+
+    def deactivate(self) -> None:
+        """Releases what the plugin holds on to, called when the app closes."""
+
+    def register_command(self, command: str, handler: Callable) -> None:
+        """
+        Args:
+            command (str): Id of the command, as in the "command:<id>" events.
+            handler (Callable): Called with the arguments of PluginManager.run_command.
+        """
+        self.commands[command] = handler
+
+    def subscribe(self, event: str, handler: Callable) -> None:
+        """Calls `handler(data)` for the events published with PluginManager.publish."""
+        self.subscriptions.setdefault(event, []).append(handler)
+
+    def publish(self, event: str, data=None) -> None:
+        for handler in self.subscriptions.get(event, []):
+            handler(data)
@@ -0,0 +1,78 @@
+"""
+Messages between the app and the plugins running in a worker process, one JSON
+object per line with a `type` and the fields of that type. Shared by both ends, so
+it must not import Qt.
+"""
+
+import json
+from typing import Dict, Tuple
+
+# Message types and their fields, in both directions.
+MESSAGES: Dict[str, Tuple[str, ...]] = {
+    # Worker -> app.
+    "ready": ("commands",),
+    "result": ("id", "value"),
+    "error": ("id", "error"),
+    "request": ("id", "method", "args"),
+    "subscribe": ("event",),
+    "notify": ("record",),
+    "emit": ("event", "data"),
+    "stats": ("cpu", "rss_mb", "dropped"),
+    # App -> worker.
+    "call": ("id", "method", "args"),
+    "event": ("event", "data"),
+    "stop": (),
+    # A line of the worker was read, the worker may write one more.
+    "ack": (),
+    # Both ways, messages sent within the same flush.
+    "batch": ("messages",),
+}
+
+
+class ChannelError(ValueError):
+    """A line that isn't a valid message."""
+
+
+def message(type: str, **fields) -> dict:
+    """Builds a message, ChannelError if the fields don't match its type."""
+    expected = MESSAGES.get(type)
+    if expected is None:
+        raise ChannelError(f"Unknown message type '{type}'")
+    if set(fields) != set(expected):
+        raise ChannelError(f"'{type}' takes {expected}, got {tuple(fields)}")
+
+    return {"type": type, **fields}
+
+
+def encode(msg: dict) -> bytes:
+    return (json.dumps(msg, separators=(",", ":"), default=repr) + "\n").encode("utf-8")
+
+
+def decode(line: bytes) -> dict:
+    """Parses and checks a line, ChannelError if it isn't a valid message."""
+    try:
+        msg = json.loads(line)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ChannelError(f"Not a JSON message: {e}") from e
+
+    return _check(msg)
+
+
+def unpack(msg: dict) -> list:
+    """Returns the messages of a batch, or the message itself in a list."""
+    if msg["type"] != "batch":
+        return [msg]
+    if not isinstance(msg["messages"], list):
+        raise ChannelError("'batch' messages must be a list")
+
+    return [_check(item) for item in msg["messages"]]
+
+
+def _check(msg) -> dict:
+    if not isinstance(msg, dict) or msg.get("type") not in MESSAGES:
+        raise ChannelError(f"Unknown message: {str(msg)[:80]}")
+
+    missing = [field for field in MESSAGES[msg["type"]] if field not in msg]
+    if missing:
+        raise ChannelError(f"'{msg['type']}' message without {missing}")
+    return msg
@@ -0,0 +1,452 @@
+import logging
+import os
+import sys
+import time
+from collections import deque
+from functools import partial
+from itertools import count
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from PySide6.QtCore import QObject, QProcess, QProcessEnvironment, QTimer, Signal
+
+from ..managers.ipc import RECORD_KEYS
+from . import plugin_channel as channel
+from .plugin_worker import ACTIVATION_FAILED
+
+if TYPE_CHECKING:
+    from ..managers.config import Config
+    from ..managers.plugins import PluginManifest
+
+# Directory kore is imported from, handed to the workers.
+KORE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class PluginCrashed(RuntimeError):
+    """Given to on_error for the calls a worker process didn't answer before dying."""
+
+
+class _Call:
+    def __init__(self, on_done, on_error, deadline: float) -> None:
+        self.on_done = on_done
+        self.on_error = on_error
+        self.deadline = deadline
+
+
+class PluginProcess(QObject):
+    """
+    A plugin running in a worker process (see plugin_worker), a plugin that crashes,
+    hangs or keeps the CPU busy can't stall the GUI. It stands in for the Plugin in
+    the PluginManager: run_command and publish send messages to the worker and the
+    answers come back through callbacks, on the GUI thread.
+
+    The worker is restarted when it crashes, at most MAX_RESTARTS times within
+    RESTART_WINDOW milliseconds, or when it stops reporting for HEARTBEAT_TIMEOUT or
+    goes over its memory limit. Its CPU and memory use are in `usage`.
+
+    The lines of the worker are decoded and their messages handled at most
+    FLUSH_BUDGET milliseconds per event loop tick, each line read is acknowledged so
+    the worker writes at most MAX_IN_FLIGHT lines ahead of the app (it drops its
+    oldest events beyond that, counted in `usage["dropped"]`). The messages sent to
+    the worker within a tick are written as one batch.
+    """
+
+    CALL_TIMEOUT = 10000
+    STOP_TIMEOUT = 1000
+    HEARTBEAT_TIMEOUT = 10000
+    WATCH_INTERVAL = 250
+    MAX_RESTARTS = 3
+    RESTART_WINDOW = 60000
+    RESTART_DELAY = 250
+    FLUSH_BUDGET = 8
+    FLUSH_INTERVAL = 16
+
+    ready = Signal()
+    # Why the worker stopped, emitted whether it's restarted or not.
+    crashed = Signal(str)
+    # Events emitted by the plugin, with their data.
+    event = Signal(str, object)
+    # Notification records, the arguments of NotificationManager.new.
+    notification = Signal(dict)
+
+    def __init__(
+        self,
+        manifest: "PluginManifest",
+        config: Optional["Config"] = None,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            manifest (PluginManifest): Manifest of the plugin, `max_memory_mb` is
+                its memory limit.
+            config (Config, optional): Config the plugin reads and changes.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger(f"kore.plugins.{manifest.name}")
+        self.manifest = manifest
+        self.name = manifest.name
+        self.config = config
+
+        self.state = "stopped"
+        self.process: Optional[QProcess] = None
+        self.commands: Dict[str, Callable] = {}
+        for activation in manifest.activation:
+            if activation.startswith("command:"):
+                self._add_command(activation[len("command:") :])
+        self.subscriptions: set = set()
+
+        self.calls: Dict[int, _Call] = {}
+        self.outgoing: list = []
+        # Acks and answers to requests, the worker may wait for them to get ready.
+        self.replies: list = []
+        # Lines read and not decoded yet, at most plugin_worker.MAX_IN_FLIGHT.
+        self.lines: deque = deque()
+        self.incoming: deque = deque()
+        self.crashes: deque = deque()
+        self.usage = {
+            "pid": None,
+            "restarts": 0,
+            "start_ms": None,
+            "cpu_s": 0.0,
+            "cpu_percent": 0.0,
+            "rss_mb": None,
+            "dropped": 0,
+            "messages": 0,
+            "batches": 0,
+        }
+        self._ids = count()
+        self._partial = b""
+        self._started = 0.0
+        self._last_seen = 0.0
+        self._last_stats: Optional[tuple] = None
+        self._kill_reason: Optional[str] = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self._flush)
+
+        self.write_timer = QTimer(self)
+        self.write_timer.setSingleShot(True)
+        self.write_timer.setInterval(0)
+        self.write_timer.timeout.connect(self._write)
+
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(self.WATCH_INTERVAL)
+        self.watch_timer.timeout.connect(self._watch)
+
+    def start(self) -> None:
+        """Starts the worker, the plugin is imported and activated there."""
+        process = QProcess(self)
+        environment = QProcessEnvironment.systemEnvironment()
+        python_path = environment.value("PYTHONPATH")
+        environment.insert(
+            "PYTHONPATH", os.pathsep.join(filter(None, (KORE_ROOT, python_path)))
+        )
+        process.setProcessEnvironment(environment)
+
+        process.readyReadStandardOutput.connect(lambda: self._read(process))
+        process.readyReadStandardError.connect(lambda: self._read_log(process))
+        process.finished.connect(
+            lambda code, status: self._finished(process, code, status)
+        )
+        process.errorOccurred.connect(lambda error: self._error(process, error))
+
+        self.process = process
+        self.state = "starting"
+        self._partial = b""
+        self._started = self._last_seen = time.perf_counter()
+        self._last_stats = None
+        self._kill_reason = None
+        process.start(
+            sys.executable,
+            [
+                "-m",
+                "kore.components.plugin_worker",
+                self.manifest.path,
+                self.manifest.entry,
+                self.name,
+            ],
+        )
+        self.watch_timer.start()
+
+    def call(
+        self,
+        method: str,
+        *args,
+        on_done: Optional[Callable] = None,
+        on_error: Optional[Callable] = None,
+        timeout: Optional[int] = None,
+    ) -> Optional[int]:
+        """
+        Calls the worker, sent once it's ready. Returns the id of the call, None if
+        the plugin failed for good (on_error is called right away then).
+
+        Args:
+            on_done (Callable, optional): Called with the result.
+            on_error (Callable, optional): Called with the error, a TimeoutError
+                after `timeout` or PluginCrashed. Errors are logged without it.
+            timeout (int, optional): Milliseconds, CALL_TIMEOUT by default.
+        """
+        if self.state in ("failed", "stopped", "stopping"):
+            self._callback(on_error, PluginCrashed(f"'{self.name}' isn't running"))
+            return None
+
+        call_id = next(self._ids)
+        timeout = self.CALL_TIMEOUT if timeout is None else timeout
+        deadline = time.perf_counter() + timeout / 1000
+        self.calls[call_id] = _Call(on_done, on_error, deadline)
+        self._send(channel.message("call", id=call_id, method=method, args=list(args)))
+        return call_id
+
+    def run_command(self, command: str, *args, **kwargs) -> Optional[int]:
+        """Runs a command of the plugin, takes the keyword arguments of call."""
+        return self.call("command", command, *args, **kwargs)
+
+    def publish(self, event: str, data=None) -> None:
+        """Sends an event to the plugin, if it subscribed to it."""
+        if event in self.subscriptions:
+            self._send(channel.message("event", event=event, data=data))
+
+    def deactivate(self) -> None:
+        """Asks the worker to stop, it's killed after STOP_TIMEOUT. Blocks until then."""
+        process, self.state = self.process, "stopping"
+        self.watch_timer.stop()
+        self.flush_timer.stop()
+        if process is None or process.state() == QProcess.NotRunning:  # type:ignore
+            self.state = "stopped"
+            return
+
+        self.outgoing.append(channel.message("stop"))
+        self._write(force=True)
+        process.closeWriteChannel()
+        if not process.waitForFinished(self.STOP_TIMEOUT):
+            self.log.warning(f"Plugin '{self.name}' didn't stop, killed")
+            process.kill()
+            process.waitForFinished(self.STOP_TIMEOUT)
+        self.state = "stopped"
+
+    ## Outgoing.
+
+    def _add_command(self, command: str) -> None:
+        self.commands.setdefault(command, partial(self.run_command, command))
+
+    def _send(self, msg: dict, reply: bool = False) -> None:
+        # Replies are written while the worker starts too, the rest once it's ready.
+        (self.replies if reply else self.outgoing).append(msg)
+        if (reply or self.state == "running") and not self.write_timer.isActive():
+            self.write_timer.start()
+
+    def _write(self, force: bool = False) -> None:
+        if not (self.state in ("starting", "running") or force):
+            return
+
+        messages, self.replies = self.replies, []
+        if self.state == "running" or force:
+            messages, self.outgoing = messages + self.outgoing, []
+        if not messages:
+            return
+
+        msg = messages[0] if len(messages) == 1 else None
+        msg = msg or channel.message("batch", messages=messages)
+        self.process.write(channel.encode(msg))  # type:ignore
+
+    ## Incoming.
+
+    def _read(self, process: QProcess) -> None:
+        if process is not self.process:
+            return
+
+        self._last_seen = time.perf_counter()
+        data = self._partial + bytes(process.readAllStandardOutput())  # type:ignore
+        *lines, self._partial = data.split(b"\n")
+        self.lines.extend(line for line in lines if line.strip())
+
+        if self.lines and not self.flush_timer.isActive():
+            self.flush_timer.start()
+            self._flush()
+
+    def _decode(self, line: bytes) -> None:
+        # The worker may write the next line once this one is read.
+        self._send(channel.message("ack"), reply=True)
+        try:
+            msg = channel.decode(line)
+            self.incoming.extend(channel.unpack(msg))
+        except channel.ChannelError as e:
+            self.log.warning(f"Invalid message from '{self.name}': {e}")
+            return
+
+        if msg["type"] == "batch":
+            self.usage["batches"] += 1
+
+    def _read_log(self, process: QProcess) -> None:
+        output = bytes(process.readAllStandardError()).decode(  # type:ignore
+            "utf-8", "replace"
+        )
+        for line in output.splitlines():
+            if line.strip():
+                self.log.info(f"[{self.name}] {line}")
+
+    def _flush(self) -> None:
+        deadline = time.perf_counter() + self.FLUSH_BUDGET / 1000
+        while time.perf_counter() < deadline:
+            if not self.incoming:
+                if not self.lines:
+                    break
+                self._decode(self.lines.popleft())
+                continue
+
+            msg = self.incoming.popleft()
+            self.usage["messages"] += 1
+            try:
+                self._handle(msg)
+            except Exception:
+                self.log.exception(f"Failed to handle a '{msg['type']}' message")
+
+        if not self.incoming and not self.lines:
+            self.flush_timer.stop()
+
+    def _handle(self, msg: dict) -> None:
+        kind = msg["type"]
+        if kind == "ready":
+            self.state = "running"
+            self.usage["pid"] = self.process.processId()  # type:ignore
+            self.usage["start_ms"] = round((time.perf_counter() - self._started) * 1000)
+            for command in msg["commands"]:
+                self._add_command(command)
+            self.log.debug(f"Plugin '{self.name}' ready ({self.usage['start_ms']}ms)")
+            self._write()
+            self.ready.emit()
+        elif kind in ("result", "error"):
+            call = self.calls.pop(msg["id"], None)
+            if call is None:
+                return
+            if kind == "result":
+                self._callback(call.on_done, msg["value"])
+            else:
+                self._callback(call.on_error, RuntimeError(msg["error"]))
+        elif kind == "request":
+            self._answer(msg)
+        elif kind == "subscribe":
+            self.subscriptions.add(msg["event"])
+        elif kind == "notify" and isinstance(msg["record"], dict):
+            record = msg["record"]
+            record = {key: record[key] for key in RECORD_KEYS if key in record}
+            self.notification.emit(record)
+        elif kind == "emit":
+            self.event.emit(msg["event"], msg["data"])
+        elif kind == "stats":
+            self._stats(msg)
+
+    def _answer(self, request: dict) -> None:
+        method, args = request["method"], request["args"]
+        try:
+            if self.config is None:
+                raise RuntimeError("No config to access")
+            if method == "config.get":
+                value = self.config.get(*args)
+            elif method == "config.put":
+                value = self.config.put(*args)
+            else:
+                raise ValueError(f"Unknown method '{method}'")
+            answer = channel.message("result", id=request["id"], value=value)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            answer = channel.message("error", id=request["id"], error=error)
+        self._send(answer, reply=True)
+
+    def _stats(self, msg: dict) -> None:
+        now = time.perf_counter()
+        if self._last_stats is not None:
+            last_time, last_cpu = self._last_stats
+            percent = (msg["cpu"] - last_cpu) / max(now - last_time, 1e-6) * 100
+            self.usage["cpu_percent"] = round(percent, 1)
+        self._last_stats = (now, msg["cpu"])
+        self.usage.update(cpu_s=round(msg["cpu"], 3), rss_mb=msg["rss_mb"])
+        self.usage["dropped"] = msg["dropped"]
+
+        limit = self.manifest.max_memory_mb
+        if limit is not None and msg["rss_mb"] is not None and msg["rss_mb"] > limit:
+            self._kill(f"over its memory limit ({msg['rss_mb']:.0f}/{limit}MB)")
+
+    ## Supervision.
+
+    def _watch(self) -> None:
+        now = time.perf_counter()
+        expired = [id for id, call in self.calls.items() if call.deadline <= now]
+        for call_id in expired:
+            call = self.calls.pop(call_id)
+            self._callback(call.on_error, TimeoutError(f"'{self.name}' didn't answer"))
+
+        silent = (now - self._last_seen) * 1000
+        if self.state in ("starting", "running") and silent > self.HEARTBEAT_TIMEOUT:
+            self._kill(f"not responding for {silent / 1000:.0f}s")
+
+    def _kill(self, reason: str) -> None:
+        if self.process is not None and self._kill_reason is None:
+            self._kill_reason = reason
+            self.process.kill()
+
+    def _error(self, process: QProcess, error) -> None:
+        if process is self.process and error == QProcess.FailedToStart:  # type:ignore
+            self.log.error(f"Couldn't start the plugin '{self.name}'")
+            self._stopped("failed to start", restart=False)
+
+    def _finished(self, process: QProcess, code: int, status) -> None:
+        if process is not self.process:
+            return
+
+        self.process = None
+        process.deleteLater()
+        if self.state in ("stopping", "stopped"):
+            return
+
+        if code == ACTIVATION_FAILED and self._kill_reason is None:
+            self._stopped("failed to activate", restart=False)
+        elif self._kill_reason is not None:
+            self._stopped(self._kill_reason)
+        elif status == QProcess.CrashExit:  # type:ignore
+            self._stopped("crashed")
+        else:
+            self._stopped(f"exited with code {code}")
+
+    def _stopped(self, reason: str, restart: bool = True) -> None:
+        self.watch_timer.stop()
+        self.outgoing.clear()
+        self.replies.clear()
+        self.lines.clear()
+        self.incoming.clear()
+        self.subscriptions.clear()
+        calls, self.calls = self.calls, {}
+        for call in calls.values():
+            self._callback(call.on_error, PluginCrashed(f"'{self.name}' {reason}"))
+
+        now = time.perf_counter()
+        self.crashes.append(now)
+        while self.crashes and (now - self.crashes[0]) * 1000 > self.RESTART_WINDOW:
+            self.crashes.popleft()
+
+        if not restart or len(self.crashes) > self.MAX_RESTARTS:
+            self.state = "failed"
+            self.log.error(f"Plugin '{self.name}' {reason}, not restarted")
+        else:
+            self.state = "restarting"
+            self.usage["restarts"] += 1
+            delay = self.RESTART_DELAY * 2 ** (len(self.crashes) - 1)
+            self.log.error(f"Plugin '{self.name}' {reason}, restarting in {delay}ms")
+            QTimer.singleShot(delay, self._restart)
+
+        self.crashed.emit(reason)
+
+    def _restart(self) -> None:
+        if self.state == "restarting":
+            self.start()
+
+    def _callback(self, callback: Optional[Callable], value) -> None:
+        if callback is None:
+            if isinstance(value, Exception):
+                self.log.error(f"Call to the plugin '{self.name}' failed: {value}")
+            return
+
+        try:
+            callback(value)
+        except Exception:
+            self.log.exception(f"Plugin callback {callback!r} failed")
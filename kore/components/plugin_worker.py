@@ -0,0 +1,354 @@
+"""
+Runs a plugin in a process of its own, started by PluginProcess as
+`python -m kore.components.plugin_worker <plugin directory> <module:Class> <name>`.
+
+The plugin talks to the app through a PluginContext: the messages go over stdout
+(stdin for the answers) and the notifications and events it emits are batched every
+BATCH_INTERVAL milliseconds. At most MAX_IN_FLIGHT lines are written before the app
+acknowledges reading them, a plugin emitting faster than the app reads fills its
+buffer and loses the oldest events instead of the app. Nothing here imports Qt.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+import types
+from collections import deque
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+from ..diagnostics.memory import rss_mb
+from . import plugin_channel as channel
+
+# Package the plugin modules are imported under, one subpackage per plugin.
+PLUGINS_PACKAGE = "kore_plugins"
+# Exit code of a plugin that couldn't be imported or activated, it isn't restarted.
+ACTIVATION_FAILED = 3
+
+BATCH_INTERVAL = 16
+STATS_INTERVAL = 1000
+MAX_BUFFERED = 10000
+# Messages per line, and lines written before the app acknowledges them.
+MAX_BATCH = 500
+MAX_IN_FLIGHT = 4
+REQUEST_TIMEOUT = 5.0
+# Messages dropped first when the buffer is full, the others are always delivered.
+DROPPABLE = ("emit", "notify")
+
+
+def import_entry(name: str, path: str, entry: str) -> type:
+    """
+    Imports the `module:Class` entry of a plugin, its modules are imported under
+    `kore_plugins.<name>` so the plugins don't clash and can use relative imports.
+
+    Args:
+        name (str): Name of the plugin.
+        path (str): Directory of the plugin.
+        entry (str): The module (relative to the directory) and the class.
+    """
+    module_name, _, class_name = entry.partition(":")
+    package = _package(name, path)
+    module = importlib.import_module(f"{package}.{module_name}")
+    return getattr(module, class_name)
+
+
+def _package(name: str, path: str) -> str:
+    if PLUGINS_PACKAGE not in sys.modules:
+        root = types.ModuleType(PLUGINS_PACKAGE)
+        root.__path__ = []
+        sys.modules[PLUGINS_PACKAGE] = root
+
+    slug = re.sub(r"\W+", "_", name).strip("_").lower() or "plugin"
+    package_name = f"{PLUGINS_PACKAGE}.{slug}"
+    if package_name in sys.modules:
+        return package_name
+
+    init_path = os.path.join(path, "__init__.py")
+    if os.path.isfile(init_path):
+        spec = importlib.util.spec_from_file_location(
+            package_name, init_path, submodule_search_locations=[path]
+        )
+        package = importlib.util.module_from_spec(spec)  # type:ignore
+        sys.modules[package_name] = package
+        try:
+            spec.loader.exec_module(package)  # type:ignore
+        except BaseException:
+            del sys.modules[package_name]
+            raise
+    else:
+        package = types.ModuleType(package_name)
+        package.__path__ = [path]
+        sys.modules[package_name] = package
+
+    return package_name
+
+
+class _Outbox:
+    """
+    Writes the messages to the app, right away or in the next batch, as long as the
+    app keeps up with the lines written so far.
+    """
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.buffer: deque = deque()
+        self.dropped = 0
+        self.credit = MAX_IN_FLIGHT
+        self._lock = threading.Lock()
+
+    def send(self, msg: dict) -> None:
+        # Goes out right away, after what was posted before it to keep the order.
+        with self._lock:
+            self.buffer.append(msg)
+            self._write_buffer()
+
+    def post(self, msg: dict) -> None:
+        # A plugin emitting faster than the app reads loses the oldest messages.
+        with self._lock:
+            if len(self.buffer) >= MAX_BUFFERED:
+                self._drop_oldest()
+            self.buffer.append(msg)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_buffer()
+
+    def ack(self) -> None:
+        """The app read a line, one more may be written."""
+        with self._lock:
+            self.credit = min(self.credit + 1, MAX_IN_FLIGHT)
+            self._write_buffer()
+
+    def _drop_oldest(self) -> None:
+        for index, msg in enumerate(self.buffer):
+            if msg["type"] in DROPPABLE:
+                del self.buffer[index]
+                self.dropped += 1
+                return
+
+    def _write_buffer(self) -> None:
+        while self.buffer and self.credit > 0:
+            self.credit -= 1
+            if len(self.buffer) == 1:
+                self._write(self.buffer.popleft())
+                continue
+
+            size = min(len(self.buffer), MAX_BATCH)
+            messages = [self.buffer.popleft() for _ in range(size)]
+            self._write(channel.message("batch", messages=messages))
+
+    def _write(self, msg: dict) -> None:
+        try:
+            self.stream.write(channel.encode(msg))
+            self.stream.flush()
+        except (BrokenPipeError, ValueError):
+            # The app is gone, nobody is left to talk to.
+            os._exit(0)
+
+
+class PluginContext:
+    """What a plugin running in a worker process can reach of the app."""
+
+    def __init__(self, name: str, outbox: _Outbox) -> None:
+        self.name = name
+        self.log = logging.getLogger(f"kore.plugin.{name}")
+        self.commands: Dict[str, Callable] = {}
+        self.subscriptions: Dict[str, List[Callable]] = {}
+
+        self._outbox = outbox
+        self._requests: Dict[int, list] = {}
+        self._ids = count()
+
+    def register_command(self, command: str, handler: Callable) -> None:
+        """
+        Args:
+            command (str): Id of the command, as in the "command:<id>" events.
+            handler (Callable): Called with the arguments of the command, its return
+                value (JSON) is sent back to the app.
+        """
+        self.commands[command] = handler
+
+    def subscribe(self, event: str, handler: Callable) -> None:
+        """Calls `handler(data)` for the events the app publishes with that name."""
+        if event not in self.subscriptions:
+            self._outbox.send(channel.message("subscribe", event=event))
+        self.subscriptions.setdefault(event, []).append(handler)
+
+    def emit(self, event: str, data=None) -> None:
+        """Sends an event to the app, emitted by PluginProcess.event."""
+        self._outbox.post(channel.message("emit", event=event, data=data))
+
+    def notify(self, message: str, level: str = "I", **record) -> None:
+        """Posts a notification, `record` takes the other NotificationManager.new args."""
+        record.update(message=message, level=level)
+        self._outbox.post(channel.message("notify", record=record))
+
+    def config(self, keys: str, file_name: str = "settings", default=None):
+        """Reads a value of the app config, see Config.get."""
+        return self.request("config.get", keys, file_name, default)
+
+    def put_config(self, keys: str, value, file_name: str = "settings") -> None:
+        """Changes a value of the app config, see Config.put."""
+        self.request("config.put", keys, value, file_name)
+
+    def request(self, method: str, *args, timeout: float = REQUEST_TIMEOUT):
+        """Calls the app and waits for the answer, TimeoutError after `timeout` s."""
+        request_id = next(self._ids)
+        pending = self._requests[request_id] = [threading.Event(), None, None]
+        self._outbox.send(
+            channel.message("request", id=request_id, method=method, args=list(args))
+        )
+
+        answered = pending[0].wait(timeout)
+        self._requests.pop(request_id, None)
+        if not answered:
+            raise TimeoutError(f"The app didn't answer '{method}' in {timeout}s")
+        if pending[2] is not None:
+            raise RuntimeError(pending[2])
+        return pending[1]
+
+    def _resolve(self, msg: dict) -> None:
+        pending = self._requests.get(msg["id"])
+        if pending is None:
+            return
+
+        if msg["type"] == "error":
+            pending[2] = msg["error"]
+        else:
+            pending[1] = msg["value"]
+        pending[0].set()
+
+
+class ProcessPlugin:
+    """
+    Base class of the plugins with `"process": true` in their manifest. They're
+    created in the worker process with its PluginContext instead of the window.
+    """
+
+    def __init__(self, context: PluginContext) -> None:
+        self.context = context
+
+    def activate(self) -> None:
+        """Sets up the plugin, the app is told the plugin is ready once it returns."""
+
+    def deactivate(self) -> None:
+        """Releases what the plugin holds on to, called before the process exits."""
+
+    def register_command(self, command: str, handler: Callable) -> None:
+        self.context.register_command(command, handler)
+
+
+def _read(stream, context: PluginContext, outbox: _Outbox, inbox: queue.Queue) -> None:
+    # Answers to the requests of the plugin are resolved here, the main thread may be
+    # the one waiting for them.
+    for line in stream:
+        try:
+            messages = channel.unpack(channel.decode(line))
+        except channel.ChannelError as e:
+            context.log.warning(f"Invalid message from the app: {e}")
+            continue
+
+        for msg in messages:
+            if msg["type"] in ("result", "error"):
+                context._resolve(msg)
+            elif msg["type"] == "ack":
+                outbox.ack()
+            else:
+                inbox.put(msg)
+
+    inbox.put(channel.message("stop"))
+
+
+def _flush(outbox: _Outbox) -> None:
+    next_stats = 0.0
+    while True:
+        time.sleep(BATCH_INTERVAL / 1000)
+        now = time.monotonic()
+        if now >= next_stats:
+            next_stats = now + STATS_INTERVAL / 1000
+            times = os.times()
+            stats = channel.message(
+                "stats",
+                cpu=times.user + times.system,
+                rss_mb=rss_mb(),
+                dropped=outbox.dropped,
+            )
+            outbox.post(stats)
+        outbox.flush()
+
+
+def _call(context: PluginContext, msg: dict) -> dict:
+    method, args = msg["method"], msg["args"]
+    try:
+        if method != "command":
+            raise ValueError(f"Unknown method '{method}'")
+
+        handler = context.commands.get(args[0])
+        if handler is None:
+            raise KeyError(f"Unknown command '{args[0]}'")
+        return channel.message("result", id=msg["id"], value=handler(*args[1:]))
+    except Exception as e:
+        context.log.exception(f"'{method}' failed")
+        return channel.message("error", id=msg["id"], error=f"{type(e).__name__}: {e}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    path, entry, name = (argv if argv is not None else sys.argv[1:])[:3]
+
+    # The channel keeps the real stdout, what the plugin prints goes to stderr. stdin
+    # gets its own file too, the reader thread blocked on sys.stdin would hang the
+    # interpreter shutdown.
+    stream = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    answers = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    logging.basicConfig(
+        stream=sys.stderr, level=logging.DEBUG, format="%(levelname)s %(message)s"
+    )
+
+    outbox = _Outbox(stream)
+    context = PluginContext(name, outbox)
+    inbox: queue.Queue = queue.Queue()
+    threading.Thread(
+        target=_read, args=(answers, context, outbox, inbox), daemon=True
+    ).start()
+    threading.Thread(target=_flush, args=(outbox,), daemon=True).start()
+
+    try:
+        plugin = import_entry(name, path, entry)(context)
+        plugin.activate()
+    except Exception:
+        traceback.print_exc()
+        return ACTIVATION_FAILED
+
+    outbox.send(channel.message("ready", commands=list(context.commands)))
+    while True:
+        msg = inbox.get()
+        if msg["type"] == "stop":
+            break
+        elif msg["type"] == "call":
+            outbox.send(_call(context, msg))
+        elif msg["type"] == "event":
+            for handler in context.subscriptions.get(msg["event"], []):
+                try:
+                    handler(msg["data"])
+                except Exception:
+                    context.log.exception(f"Handler of '{msg['event']}' failed")
+
+    try:
+        plugin.deactivate()
+    except Exception:
+        context.log.exception("Deactivation failed")
+    outbox.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
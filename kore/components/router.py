@@ -0,0 +1,309 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from PySide6.QtCore import QTimer, Signal
+from PySide6.QtWidgets import QStackedWidget, QWidget
+
+from ..diagnostics.memory import rss_mb
+
+
+class _Page:
+    """Registration and state of a page."""
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], QWidget],
+        pinned: bool,
+        cost_mb: Optional[float],
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.pinned = pinned
+        self.declared_cost = cost_mb
+
+        self.widget: Optional[QWidget] = None
+        self.cost_mb = 0.0
+        self.build_ms = 0.0
+        self.builds = 0
+        self.hidden_at: Optional[float] = None
+        self.paused_timers: List[QTimer] = []
+        self.paused = False
+
+
+class PageRouter(QStackedWidget):
+    """
+    Stack of pages built on demand. Pages are registered as factories and built the
+    first time they're navigated to (or ahead of time with build, e.g. in idle time),
+    so the memory and start-up time of a window depend on the pages actually visited.
+
+    Built pages are kept in least recently shown order, the oldest are unloaded when
+    there are more than `max_pages` or their cost goes over `memory_budget_mb` (the
+    current and the pinned pages stay). The cost of a page is the one given to
+    register, else the resident memory growth measured while it was built.
+
+    A page hidden for `pause_after` milliseconds gets its running timers stopped and
+    its updates disabled until it's shown again. Pages may define `page_shown`,
+    `page_hidden`, `page_paused`, `page_resumed` and `page_unloaded` methods, they are
+    called on those transitions.
+    """
+
+    PAUSE_CHECK_INTERVAL = 1000
+    HISTORY_SIZE = 50
+
+    # Previous and current page, the previous one is "" for the first navigation.
+    navigated = Signal(str, str)
+    page_built = Signal(str)
+    page_unloaded = Signal(str)
+
+    def __init__(
+        self,
+        memory_budget_mb: Optional[float] = None,
+        max_pages: Optional[int] = None,
+        pause_after: Optional[int] = 30000,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            memory_budget_mb (float, optional): Cost the built pages may add up to.
+            max_pages (int, optional): Amount of pages kept built.
+            pause_after (int, optional): Milliseconds a page stays hidden before it's
+                paused, None to never pause.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.router")
+        self.memory_budget_mb = memory_budget_mb
+        self.max_pages = max_pages
+        self.pause_after = pause_after
+
+        self.pages: Dict[str, _Page] = {}
+        # Built pages, the least recently shown first.
+        self.built: "OrderedDict[str, None]" = OrderedDict()
+        self.current: Optional[str] = None
+        self.history: deque = deque(maxlen=self.HISTORY_SIZE)
+
+        # Shown until the first navigation, a page built ahead of time into an empty
+        # stack would become the visible one without being navigated to.
+        self.placeholder = QWidget()
+        self.addWidget(self.placeholder)
+
+        self.pause_timer = QTimer(self)
+        self.pause_timer.setInterval(self.PAUSE_CHECK_INTERVAL)
+        self.pause_timer.timeout.connect(self._pause_hidden)
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], QWidget],
+        pinned: bool = False,
+        cost_mb: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            name (str): Name the page is navigated to with.
+            factory (Callable): Returns the widget of the page, called without
+                arguments each time the page is (re)built.
+            pinned (bool): The page is never unloaded once built.
+            cost_mb (float, optional): Memory cost of the page for the budget, the
+                one measured while building it by default.
+        """
+        if name in self.pages:
+            raise ValueError(f"The page '{name}' is already registered")
+        self.pages[name] = _Page(name, factory, pinned, cost_mb)
+
+    def navigate(self, name: str) -> QWidget:
+        """Shows a page, building it first if needed, and returns its widget."""
+        page = self._page(name)
+        if name == self.current and page.widget is not None:
+            return page.widget
+
+        widget = self.build(name)
+        previous = self.current
+        if previous is not None:
+            self._hide(self.pages[previous])
+
+        self.current = name
+        self.built.move_to_end(name)
+        self._resume(page)
+        page.hidden_at = None
+        self.setCurrentWidget(widget)
+        _call(widget, "page_shown")
+
+        self.history.append(name)
+        self._enforce_budget()
+        self.navigated.emit(previous or "", name)
+        return widget
+
+    def back(self) -> Optional[QWidget]:
+        """Navigates to the previously shown page, if any."""
+        if len(self.history) < 2:
+            return None
+
+        self.history.pop()
+        return self.navigate(self.history.pop())
+
+    def build(self, name: str) -> QWidget:
+        """
+        Builds a page without showing it, if it isn't already. A page built ahead of
+        time is the first to be unloaded until it's shown.
+        """
+        page = self._page(name)
+        if page.widget is not None:
+            return page.widget
+
+        memory_before = rss_mb()
+        start = time.perf_counter()
+        widget = page.factory()
+        self.addWidget(widget)
+        page.build_ms = (time.perf_counter() - start) * 1000
+        memory_after = rss_mb()
+
+        if page.declared_cost is not None:
+            page.cost_mb = page.declared_cost
+        elif memory_before is not None and memory_after is not None:
+            page.cost_mb = max(memory_after - memory_before, 0.0)
+
+        page.widget = widget
+        page.builds += 1
+        page.hidden_at = time.perf_counter()
+        self.built[name] = None
+        self.built.move_to_end(name, last=False)
+        self.log.debug(
+            f"Page '{name}' built in {page.build_ms:.1f}ms ({page.cost_mb:.1f}MB)"
+        )
+        self.page_built.emit(name)
+
+        if name != self.current:
+            self._enforce_budget(keep=name)
+            self._start_pause_timer()
+        return widget
+
+    def unload(self, name: str) -> bool:
+        """Destroys the widget of a page, it's rebuilt on the next navigation."""
+        page = self._page(name)
+        if page.widget is None or name == self.current:
+            return False
+
+        widget, page.widget = page.widget, None
+        _call(widget, "page_unloaded")
+        self.removeWidget(widget)
+        widget.deleteLater()
+
+        self.built.pop(name, None)
+        page.paused_timers.clear()
+        page.paused = False
+        page.hidden_at = None
+        self.log.debug(f"Page '{name}' unloaded")
+        self.page_unloaded.emit(name)
+        return True
+
+    def page(self, name: str) -> Optional[QWidget]:
+        """Returns the widget of a page, None if it isn't built."""
+        return self._page(name).widget
+
+    def metrics(self) -> dict:
+        """Returns the registered and built pages, their cost and build times."""
+        return {
+            "registered": len(self.pages),
+            "built": list(self.built),
+            "paused": [name for name, page in self.pages.items() if page.paused],
+            "cost_mb": round(self._cost(), 2),
+            "pages": {
+                name: {
+                    "builds": page.builds,
+                    "build_ms": round(page.build_ms, 2),
+                    "cost_mb": round(page.cost_mb, 2),
+                }
+                for name, page in self.pages.items()
+                if page.builds
+            },
+        }
+
+    def _page(self, name: str) -> _Page:
+        page = self.pages.get(name)
+        if page is None:
+            raise KeyError(f"Unknown page '{name}'")
+        return page
+
+    ## Budget.
+
+    def _cost(self) -> float:
+        return sum(self.pages[name].cost_mb for name in self.built)
+
+    def _over_budget(self) -> bool:
+        if self.max_pages is not None and len(self.built) > self.max_pages:
+            return True
+        budget = self.memory_budget_mb
+        return budget is not None and self._cost() > budget
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> None:
+        for name in list(self.built):
+            if not self._over_budget():
+                break
+            if name in (self.current, keep) or self.pages[name].pinned:
+                continue
+            self.unload(name)
+
+    ## Pausing.
+
+    def _hide(self, page: _Page) -> None:
+        page.hidden_at = time.perf_counter()
+        if page.widget is not None:
+            _call(page.widget, "page_hidden")
+        self._start_pause_timer()
+
+    def _start_pause_timer(self) -> None:
+        if self.pause_after is not None and not self.pause_timer.isActive():
+            self.pause_timer.start()
+
+    def _pause_hidden(self) -> None:
+        now = time.perf_counter()
+        waiting = False
+        for name in self.built:
+            page = self.pages[name]
+            if page.paused or page.hidden_at is None or name == self.current:
+                continue
+            if (now - page.hidden_at) * 1000 >= self.pause_after:  # type:ignore
+                self._pause(page)
+            else:
+                waiting = True
+
+        if not waiting:
+            self.pause_timer.stop()
+
+    def _pause(self, page: _Page) -> None:
+        widget: QWidget = page.widget  # type:ignore
+        page.paused = True
+        page.paused_timers = [
+            timer for timer in widget.findChildren(QTimer) if timer.isActive()
+        ]
+        for timer in page.paused_timers:
+            timer.stop()
+        widget.setUpdatesEnabled(False)
+        _call(widget, "page_paused")
+        self.log.debug(
+            f"Page '{page.name}' paused ({len(page.paused_timers)} timers stopped)"
+        )
+
+    def _resume(self, page: _Page) -> None:
+        if not page.paused:
+            return
+
+        widget: QWidget = page.widget  # type:ignore
+        page.paused = False
+        widget.setUpdatesEnabled(True)
+        for timer in page.paused_timers:
+            try:
+                timer.start()
+            except RuntimeError:
+                pass  # Deleted while the page was paused.
+        page.paused_timers.clear()
+        _call(widget, "page_resumed")
+
+
+def _call(widget: QWidget, hook: str) -> None:
+    method = getattr(widget, hook, None)
+    if callable(method):
+        method()
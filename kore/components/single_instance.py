@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+from typing import Dict, List
+
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+from ..managers.ipc import server_name
+
+
+def instance_name(app_name: str) -> str:
+    """Returns the local server name of the running instance of an app."""
+    return f"{server_name(app_name)}.instance"
+
+
+def forward(name: str, argv: List[str], timeout: int = 500) -> bool:
+    """
+    Hands the arguments of this launch to the running instance, if there is one.
+    Returns False when no instance answered, the caller starts as usual then.
+
+    Args:
+        name (str): Name of the instance server, see instance_name.
+        argv (List[str]): The command line arguments to forward.
+        timeout (int): Milliseconds to wait for the connection and the write.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout):
+        return False
+
+    request = {"argv": argv, "cwd": os.getcwd()}
+    socket.write((json.dumps(request) + "\n").encode("utf-8"))
+    written = socket.waitForBytesWritten(timeout) or not socket.bytesToWrite()
+    socket.disconnectFromServer()
+    return written
+
+
+class InstanceServer(QObject):
+    """
+    Server of the primary instance, receives the arguments of the later launches
+    (one JSON line per launch) and emits them with the working directory they were
+    launched from.
+    """
+
+    received = Signal(list, str)
+
+    MAX_REQUEST_SIZE = 64 * 1024
+
+    def __init__(self, name: str, parent=None) -> None:
+        """
+        Args:
+            name (str): Name of the local server, see instance_name.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.instance")
+        self.name = name
+        self.buffers: Dict[QLocalSocket, bytearray] = {}
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)  # type:ignore
+        self.server.newConnection.connect(self._accept)
+
+    def listen(self) -> bool:
+        """
+        Becomes the primary instance, a server left behind by a crashed process is
+        removed first. Returns False if another running instance owns the name, or
+        if the name can't be listened on.
+        """
+        if self.server.listen(self.name):
+            return True
+
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        if probe.waitForConnected(100):
+            probe.disconnectFromServer()
+            return False
+
+        QLocalServer.removeServer(self.name)
+        if not self.server.listen(self.name):
+            self.log.error(
+                f"Can't listen on '{self.name}': {self.server.errorString()}"
+            )
+            return False
+        return True
+
+    def close(self) -> None:
+        self.server.close()
+
+    def _accept(self) -> None:
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = bytearray()
+
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._drop(socket))
+
+    def _drop(self, socket: QLocalSocket) -> None:
+        self._read(socket)
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _read(self, socket: QLocalSocket) -> None:
+        buffer = self.buffers.get(socket)
+        if buffer is None:
+            return
+
+        buffer += bytes(socket.readAll())  # type:ignore
+        while b"\n" in buffer:
+            line, _, rest = bytes(buffer).partition(b"\n")
+            buffer[:] = rest
+            self._handle(line)
+
+        if len(buffer) > self.MAX_REQUEST_SIZE:
+            self.log.warning("Instance request too large, dropped")
+            buffer.clear()
+            socket.abort()
+
+    def _handle(self, line: bytes) -> None:
+        try:
+            request = json.loads(line)
+            argv, cwd = list(request["argv"]), str(request.get("cwd", ""))
+        except (ValueError, KeyError, TypeError) as e:
+            self.log.warning(f"Invalid instance request: {e}")
+            return
+
+        self.log.debug(f"Arguments forwarded by a new launch: {argv}")
+        self.received.emit(argv, cwd)
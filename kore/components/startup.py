@@ -0,0 +1,90 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class IdleScheduler(QObject):
+    """
+    Runs the deferred start-up work once the window is on screen. Tasks run by
+    priority (lowest first), in submission order within a priority, and each event
+    loop tick only runs tasks for FRAME_BUDGET milliseconds so the window keeps
+    painting and answering input in between.
+
+    Every task belongs to a stage, `stage_ready` fires when the last task of a stage
+    is done and `finished` when nothing is left.
+    """
+
+    FRAME_BUDGET = 8
+
+    stage_ready = Signal(str)
+    finished = Signal()
+
+    def __init__(self, parent=None) -> None:
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.startup")
+        self.tasks: List[Tuple[int, int, str, str, Callable]] = []
+        self.remaining: Counter = Counter()
+        self.stage_started: Dict[str, float] = {}
+        self.ready_stages: set = set()
+        self.running = False
+        self._order = itertools.count()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self._tick)
+
+    def add(
+        self, name: str, task: Callable, priority: int = 0, stage: str = "ready"
+    ) -> None:
+        """
+        Args:
+            name (str): Name of the task, for the logs.
+            task (Callable): Called without arguments on the GUI thread.
+            priority (int): Lower runs first.
+            stage (str): Stage the task is part of.
+        """
+        heapq.heappush(self.tasks, (priority, next(self._order), stage, name, task))
+        self.remaining[stage] += 1
+        self.ready_stages.discard(stage)
+        if self.running and not self.timer.isActive():
+            self.timer.start()
+
+    def start(self) -> None:
+        """Starts running the tasks, from the next event loop tick."""
+        self.running = True
+        self.timer.start()
+
+    def is_ready(self, stage: str) -> bool:
+        return stage in self.ready_stages
+
+    def _tick(self) -> None:
+        deadline = time.perf_counter() + self.FRAME_BUDGET / 1000
+        while self.tasks:
+            _, _, stage, name, task = heapq.heappop(self.tasks)
+            self.stage_started.setdefault(stage, time.perf_counter())
+            try:
+                task()
+            except Exception:
+                self.log.exception(f"Start-up task '{name}' failed")
+
+            self.remaining[stage] -= 1
+            if not self.remaining[stage]:
+                self._stage_done(stage)
+            if time.perf_counter() >= deadline:
+                break
+
+        if not self.tasks:
+            self.timer.stop()
+            self.finished.emit()
+
+    def _stage_done(self, stage: str) -> None:
+        del self.remaining[stage]
+        self.ready_stages.add(stage)
+        duration = (time.perf_counter() - self.stage_started.pop(stage)) * 1000
+        self.log.debug(f"Start-up stage '{stage}' ready ({duration:.1f}ms)")
+        self.stage_ready.emit(stage)
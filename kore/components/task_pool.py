@@ -0,0 +1,353 @@
+import inspect
+import itertools
+import logging
+import threading
+import time
+from collections import Counter, deque
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Optional
+
+from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, Signal
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+LANES = {"high": 10, "normal": 0, "low": -10}
+
+
+class TaskCancelled(Exception):
+    """Raised by CancelToken.raise_if_cancelled, ends a task as cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag shared with a running task, checked by the task itself."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class TaskHandle:
+    """State of a submitted task, returned by TaskPool.submit."""
+
+    def __init__(self, pool: "TaskPool", task_id: int, key, lane: str) -> None:
+        self.pool = pool
+        self.id = task_id
+        self.key = key
+        self.lane = lane
+        self.token = CancelToken()
+        self.state = "queued"
+
+        self.on_done: Optional[Callable] = None
+        self.on_error: Optional[Callable] = None
+        self.on_progress: Optional[Callable] = None
+
+        self.runnable: Optional[QRunnable] = None
+        self.future: Optional["Future"] = None
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+        self._progress = None
+        self._progress_pending = False
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        self.pool.cancel(self)
+
+    def report(self, value) -> None:
+        """
+        Sends a progress value to on_progress, from the worker thread. Values sent
+        faster than the GUI thread takes them are coalesced, only the last is shown.
+        """
+        with self._lock:
+            self._progress = value
+            if self._progress_pending:
+                return
+            self._progress_pending = True
+
+        self.pool._deliver.emit(partial(self.pool._progress, self))
+
+
+class _Runnable(QRunnable):
+    def __init__(self, pool: "TaskPool", handle: TaskHandle, call: Callable) -> None:
+        super().__init__()
+        self.setAutoDelete(False)
+        self.pool = pool
+        self.handle = handle
+        self.call = call
+
+    def run(self) -> None:
+        self.pool._run(self.handle, self.call)
+
+
+class TaskPool(QObject):
+    """
+    Runs blocking functions off the GUI thread and hands their outcome back to it.
+
+    Functions run on a QThreadPool by default, or on a ProcessPoolExecutor (created on
+    first use) with `process=True` for CPU bound work. The on_done, on_error and
+    on_progress callbacks are always called on the GUI thread.
+
+    A function running on a thread is given the CancelToken of its task as `token`
+    and a progress reporter as `progress` if it has parameters with those names.
+    Tasks submitted with the same `key` supersede each other: the previous one is
+    cancelled and its result is never delivered. Lanes ("high", "normal", "low")
+    order the queued thread tasks, the process pool runs them in submission order.
+    """
+
+    LATENCY_SAMPLES = 1000
+
+    _deliver = Signal(object)
+
+    def __init__(
+        self,
+        max_threads: Optional[int] = None,
+        max_processes: Optional[int] = None,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            max_threads (int, optional): Threads of the pool, defaults to the CPU count.
+            max_processes (int, optional): Workers of the process pool, defaults to
+                the CPU count.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.tasks")
+
+        self.threads = QThreadPool(self)
+        if max_threads:
+            self.threads.setMaxThreadCount(max_threads)
+        self.max_processes = max_processes
+        self.processes: Optional["ProcessPoolExecutor"] = None
+
+        self.active: Dict[int, TaskHandle] = {}
+        self.latest: Dict[Hashable, TaskHandle] = {}
+        self.counters: Counter = Counter()
+        self.waits: deque = deque(maxlen=self.LATENCY_SAMPLES)
+        self.runs: deque = deque(maxlen=self.LATENCY_SAMPLES)
+        self._ids = itertools.count()
+
+        self._deliver.connect(self._call, Qt.QueuedConnection)  # type:ignore
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        on_done: Optional[Callable] = None,
+        on_error: Optional[Callable] = None,
+        on_progress: Optional[Callable] = None,
+        key: Optional[Hashable] = None,
+        lane: str = "normal",
+        process: bool = False,
+        **kwargs,
+    ) -> TaskHandle:
+        """
+        Runs `fn(*args, **kwargs)` in the background.
+
+        Args:
+            on_done (Callable, optional): Called with the result.
+            on_error (Callable, optional): Called with the exception, errors are
+                logged without it.
+            on_progress (Callable, optional): Called with the values the function
+                reports through its `progress` parameter.
+            key (Hashable, optional): Supersedes the unfinished task of the same key.
+            lane (str): "high", "normal" or "low".
+            process (bool): Runs on the process pool, `fn` and its arguments have to
+                be picklable and it gets no token nor progress reporter.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}', expected one of {list(LANES)}")
+
+        if key is not None:
+            previous = self.latest.get(key)
+            if previous is not None and not previous.done:
+                self.counters["coalesced"] += 1
+                self.cancel(previous)
+
+        handle = TaskHandle(self, next(self._ids), key, lane)
+        handle.on_done, handle.on_error = on_done, on_error
+        handle.on_progress = on_progress
+        self.active[handle.id] = handle
+        if key is not None:
+            self.latest[key] = handle
+        self.counters["submitted"] += 1
+
+        if process:
+            handle.future = self._process_pool().submit(fn, *args, **kwargs)
+            handle.future.add_done_callback(
+                lambda future: self._deliver.emit(partial(self._process_done, handle))
+            )
+            return handle
+
+        parameters = _parameters(fn)
+        if "token" in parameters:
+            kwargs["token"] = handle.token
+        if "progress" in parameters:
+            kwargs["progress"] = handle.report
+
+        handle.runnable = _Runnable(self, handle, partial(fn, *args, **kwargs))
+        self.threads.start(handle.runnable, LANES[lane])
+        return handle
+
+    def cancel(self, handle: TaskHandle) -> None:
+        """
+        Cancels a task, a queued one never runs and a running one gets its token
+        set, either way its callbacks aren't called anymore.
+        """
+        if handle.done:
+            return
+
+        handle.token.cancel()
+        if handle.state != "queued":
+            return
+
+        if handle.runnable is not None and self.threads.tryTake(handle.runnable):
+            self._finish(handle, "cancelled", None)
+        elif handle.future is not None:
+            handle.future.cancel()
+
+    def metrics(self) -> dict:
+        """Returns the queue depth, the task counters and the latencies in ms."""
+        states = Counter(handle.state for handle in self.active.values())
+        return {
+            "queued": states["queued"],
+            "running": states["running"],
+            "threads": self.threads.activeThreadCount(),
+            **{
+                name: self.counters[name]
+                for name in ("submitted", "done", "failed", "cancelled", "coalesced")
+            },
+            "wait_p50": _percentile(self.waits, 50),
+            "wait_p95": _percentile(self.waits, 95),
+            "run_p50": _percentile(self.runs, 50),
+            "run_p95": _percentile(self.runs, 95),
+        }
+
+    def shutdown(self, timeout: float = 3.0) -> None:
+        """Cancels every task and waits up to `timeout` seconds for the running ones."""
+        for handle in list(self.active.values()):
+            self.cancel(handle)
+
+        if not self.threads.waitForDone(int(timeout * 1000)):
+            self.log.warning("Tasks still running on shutdown were abandoned")
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
+            self.processes = None
+
+    def _process_pool(self) -> "ProcessPoolExecutor":
+        if self.processes is None:
+            # multiprocessing is only imported by the apps that use it.
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.processes = ProcessPoolExecutor(self.max_processes)
+        return self.processes
+
+    ## Worker threads.
+
+    def _run(self, handle: TaskHandle, call: Callable) -> None:
+        if handle.token.cancelled:
+            self._deliver.emit(partial(self._finish, handle, "cancelled", None))
+            return
+
+        handle.started = time.perf_counter()
+        handle.state = "running"
+        try:
+            outcome, value = "done", call()
+        except TaskCancelled:
+            outcome, value = "cancelled", None
+        except Exception as e:
+            outcome, value = "failed", e
+
+        handle.finished = time.perf_counter()
+        self._deliver.emit(partial(self._finish, handle, outcome, value))
+
+    ## GUI thread.
+
+    def _call(self, callback: Callable) -> None:
+        callback()
+
+    def _process_done(self, handle: TaskHandle) -> None:
+        future: "Future" = handle.future  # type:ignore
+        if future.cancelled():
+            self._finish(handle, "cancelled", None)
+            return
+
+        # The process pool doesn't say when the task started, the wait is unknown.
+        handle.started = handle.submitted
+        handle.finished = time.perf_counter()
+        error = future.exception()
+        if error is not None:
+            self._finish(handle, "failed", error)
+        else:
+            self._finish(handle, "done", future.result())
+
+    def _finish(self, handle: TaskHandle, outcome: str, value) -> None:
+        if handle.done:
+            return
+
+        self.active.pop(handle.id, None)
+        if handle.key is not None and self.latest.get(handle.key) is handle:
+            del self.latest[handle.key]
+
+        if handle.started is not None and handle.finished is not None:
+            self.waits.append((handle.started - handle.submitted) * 1000)
+            self.runs.append((handle.finished - handle.started) * 1000)
+
+        # A cancelled task keeps quiet, whatever it ended with.
+        if handle.token.cancelled:
+            outcome = "cancelled"
+        handle.state = outcome
+        self.counters[outcome] += 1
+
+        if outcome == "done" and handle.on_done is not None:
+            self._callback(handle.on_done, value)
+        elif outcome == "failed":
+            if handle.on_error is not None:
+                self._callback(handle.on_error, value)
+            else:
+                self.log.error(f"Task {handle.id} failed", exc_info=value)
+
+    def _progress(self, handle: TaskHandle) -> None:
+        with handle._lock:
+            value = handle._progress
+            handle._progress_pending = False
+
+        if handle.on_progress is not None and not handle.token.cancelled:
+            self._callback(handle.on_progress, value)
+
+    def _callback(self, callback: Callable, value) -> None:
+        try:
+            callback(value)
+        except Exception:
+            self.log.exception(f"Task callback {callback!r} failed")
+
+
+def _parameters(fn: Callable) -> tuple:
+    try:
+        return tuple(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):
+        return ()
+
+
+def _percentile(values, percent: float) -> Optional[float]:
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return round(ordered[index], 2)
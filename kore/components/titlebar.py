@@ -1,10 +1,11 @@
 import logging
-import re
 
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QIcon
-from PySide6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QWidget
-from qframelesswindow import FramelessMainWindow, StandardTitleBar, TitleBar
+from PySide6.QtGui import QIcon
+from PySide6.QtWidgets import QLabel, QPushButton
+from qframelesswindow import FramelessMainWindow, TitleBar
+
+from ..managers.qss import RuleIndex
 
 
 class CustomTitleBar(TitleBar):
@@ -61,63 +62,25 @@ class CustomTitleBar(TitleBar):
         self.iconLabel.setPixmap(QIcon(icon).pixmap(self.icon_size, self.icon_size))
 
     def _setSheet(self, sheet: str):
+        self._setRules(RuleIndex.parse(sheet))
+
+    def _setRules(self, rules: RuleIndex):
+        """set the colors of the buttons from the rules of a theme, matching
+        every selector whose subject is the button, like `#tb_titlebar #tb_closebtn`"""
         for btn in self.btns:
-            btn_name = btn.objectName()
-            btn_style = self.extract_qss_properties(sheet, btn_name)
-
-            if not btn_style:
-                self.log.warning(f"no style for the button '{btn_name}'")
-                return
-
-            for state in ["normal", "hover", "pressed"]:
-                # sprint(btn_style)
-                color = btn_style[state].get("color", "white")
-                bg_color = btn_style[state].get("background-color", "blue")
-
-                # Directly setting values using method references
-                (
-                    btn.setNormalColor(color)
-                    if state == "normal"
-                    else (
-                        btn.setHoverColor(color)
-                        if state == "hover"
-                        else btn.setPressedColor(color)
-                    )
-                )
-                (
-                    btn.setNormalBackgroundColor(bg_color)
-                    if state == "normal"
-                    else (
-                        btn.setHoverBackgroundColor(bg_color)
-                        if state == "hover"
-                        else btn.setPressedBackgroundColor(bg_color)
-                    )
-                )
-
-    def extract_qss_properties(self, qss, object_name):
-        properties = {"normal": {}, "hover": {}, "pressed": {}}
-
-        # Patterns for different states
-        patterns = {
-            "normal": rf"(^|[^a-zA-Z0-9-])#{object_name}(?!:)(?:[^{{]*,\s*[^{{]+)*\s*{{([^}}]*)}}",
-            "hover": rf"(^|[^a-zA-Z0-9-])#{object_name}:hover[^{{]*{{([^}}]*)}}",
-            "pressed": rf"(^|[^a-zA-Z0-9-])#{object_name}:pressed[^{{]*{{([^}}]*)}}",
-        }
-
-        for state, pattern in patterns.items():
-            matches = re.findall(pattern, qss, re.MULTILINE)
-            for match in matches:
-                content = match[-1]  # The last group contains the CSS properties
-                # Extract background-color and color
-                bg_color = re.search(r"background-color:\s*([^;]+)", content)
-                color = re.search(r"(?<!-)\bcolor:\s*([^;]+)", content)
-
-                if bg_color:
-                    properties[state]["background-color"] = bg_color.group(1).strip()
-                if color:
-                    properties[state]["color"] = color.group(1).strip()
-
-        return properties
+            selector = f"#{btn.objectName()}"
+            if selector not in rules.subject_names:
+                self.log.warning(f"no style for the button '{btn.objectName()}'")
+                continue
+
+            for state, set_color, set_bg_color in (
+                ("", btn.setNormalColor, btn.setNormalBackgroundColor),
+                ("hover", btn.setHoverColor, btn.setHoverBackgroundColor),
+                ("pressed", btn.setPressedColor, btn.setPressedBackgroundColor),
+            ):
+                style = rules.subject_style(selector, state)
+                set_color(style.get("color", "white"))
+                set_bg_color(style.get("background-color", "blue"))
 
     def add_button(self, text: str):
         self.questionButton = QPushButton(text)
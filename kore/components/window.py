@@ -1,32 +1,49 @@
 import logging
 import os
+from functools import partial
+from typing import Callable, Optional
 
-from PySide6.QtCore import QPropertyAnimation, Qt, Signal, SignalInstance
-from PySide6.QtGui import QFontDatabase, QIcon
+from PySide6.QtCore import (
+    QEvent,
+    QPropertyAnimation,
+    Qt,
+    QTimer,
+    Signal,
+    SignalInstance,
+)
+from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QGraphicsOpacityEffect, QWidget
 from qframelesswindow import FramelessMainWindow
 
-from ..managers import Config, Theme
+from ..managers.config import Config
+from ..managers.plugins import PluginManager
+from ..managers.theme import Theme
 from .app import App
+from .fonts import FontRegistry
+from .overlays import OverlayManager
+from .router import PageRouter
+from .startup import IdleScheduler
+from .task_pool import TaskHandle
 from .titlebar import CustomTitleBar
 
 FONTS_PATH = "./src/gui/assets/fonts"
 PLUGINS_PATH = "./plugins"
-FONT_EXTENSIONS = (
-    ".ttf",
-    ".otf",
-    ".pfa",
-    ".pfb",
-)
 
 
 class Interface(FramelessMainWindow):
     restart = Signal()
+    # Start-up stages of the deferred work, see defer.
+    stage_ready = Signal(str)
+    ready = Signal()
 
     name: str
     version: str
     config: Config
-    theme: Theme
+    themes: Theme
+    fonts: FontRegistry
+    plugins: PluginManager
+    overlays: OverlayManager
+    pages: PageRouter
 
     def __init__(self, app: App) -> None:
         super().__init__()
@@ -36,47 +53,100 @@ class Interface(FramelessMainWindow):
 
         self.name = self.app.name
         self.version = self.app.version
+        self.overlays = OverlayManager(self)
+        self.app.instance_launched.connect(self._bring_to_front)
+
+        # Staged start-up: the window shows up first, the rest runs in idle time.
+        self.staged = self.app.app_data["environment"].get("staged_startup", False)
+        self.startup = IdleScheduler(self)
+        self.startup.stage_ready.connect(self.stage_ready)
+        self.startup.finished.connect(self.ready)
+        self._painted = False
+
+        # Pages are built on first navigation, the app places the router in its layout.
+        environment = self.app.app_data["environment"]
+        self.pages = PageRouter(
+            memory_budget_mb=environment.get("page_memory_budget"),
+            max_pages=environment.get("max_pages"),
+            pause_after=environment.get("page_pause_after", 30000),
+        )
 
         self.log.debug("Loading mangers...")
-        self._load_config_manager()
-        self._load_theme_manager()
-        self._load_fonts()
+        with self.app.profiler.span("Interface.__init__"):
+            self._load_config_manager()
+            self._load_theme_manager()
+            self._load_fonts()
+            self._load_plugins()
 
     def _load_config_manager(self):
-        self.config = Config()
+        with self.app.profiler.span("Config()"):
+            self.config = Config()
         self.log.debug("Confing manager loaded !")
 
     def _load_theme_manager(self):
+        # Themes are compiled when applied, the compiled ones are cached on disk. With
+        # "watch_themes" the applied one is reloaded when its files are saved.
+        self.themes = Theme(parent=self)
+        self.themes.applied.connect(
+            lambda theme: self.app._notify_style(theme.resolved())
+        )
+        if self.app.app_data["environment"].get("watch_themes", False):
+            self.themes.watch(self.app.tasks)
         self.log.debug("Theme manager loaded !")
 
     def _load_fonts(self):
-        fonts = os.listdir(FONTS_PATH)
+        with self.app.profiler.span("Interface._load_fonts"):
+            self._add_fonts()
 
-        self.log.debug("Loading fonts...")
-        for font in fonts:
-            if font.lower().endswith(FONT_EXTENSIONS):
-                font_path = os.path.join(FONTS_PATH, font)
-                font_id = QFontDatabase.addApplicationFont(font_path)
+    def _add_fonts(self):
+        # Fonts are registered when a family is needed (load, font, stylesheets), only
+        # the primary one is loaded right away and the hot list in the background,
+        # every family without a hot list.
+        self.fonts = FontRegistry(FONTS_PATH, self.app.tasks, parent=self)
+        self.fonts.scan()
+        self.app.fonts = self.fonts
 
-                if font_id == -1:
-                    self.log.error(f"Failed to load the font '{font}'.")
+        environment = self.app.app_data["environment"]
+        primary = environment.get("primary_font")
+        if primary:
+            self.fonts.load(primary)
 
-                else:
-                    self.log.debug(f"'{font}' loaded !")
+        if environment.get("lazy_fonts", True):
+            self.fonts.preload(
+                environment.get("hot_fonts") or list(self.fonts.families)
+            )
+        else:
+            self.fonts.preload(self.fonts.families)
 
     def _load_plugins(self):
-        plugins = os.listdir(PLUGINS_PATH)
+        # Only the manifests are read here, each plugin is imported when one of its
+        # activation events fires ("startup" ones once the window is up).
+        with self.app.profiler.span("Interface._load_plugins"):
+            isolated = self.app.app_data["environment"].get("isolated_plugins", [])
+            self.plugins = PluginManager(PLUGINS_PATH, self, isolated)
+            self.plugins.discover()
+        self.app.shutting_down.connect(self.plugins.deactivate_all)
+        self.defer("plugins", partial(self.plugins.fire, "startup"), 20, "plugins")
 
     def _setup_titlebar(self):
         std_titlebar = CustomTitleBar(self)
-        self.app.set_style.connect(std_titlebar._setSheet)
+        self.themes.applied.connect(
+            lambda theme: std_titlebar._setRules(self.themes.rules)
+        )
+        if self.themes.current is not None:
+            std_titlebar._setRules(self.themes.rules)
         self.setTitleBar(std_titlebar)
         self.titleBar.raise_()
 
     def _load_window_properties(self) -> None:
 
         self.setWindowTitle(self.name)
+        if self.staged:
+            self.defer("window icon", self._load_window_icon, -10, "window")
+        else:
+            self._load_window_icon()
 
+    def _load_window_icon(self) -> None:
         icon_path = self.app.app_data["icon_path"]
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(self.app.app_data["icon_path"]))
@@ -84,8 +154,75 @@ class Interface(FramelessMainWindow):
         else:
             self.log.warning(f"No app icon was foun at '{icon_path}'")
 
-    def apply_style(self, name):
-        self.app.set_style.emit(name)
+    def apply_style(self, name: str) -> dict:
+        """
+        Applies a theme, see Theme.apply. A stylesheet without variables, imports or
+        palette is set as written. Listen to `themes.applied` for the theme changes,
+        App.set_style is still emitted with the applied sheet, for compatibility.
+
+        Args:
+            name (str): Name of a theme of the themes directory, or the text of one.
+        """
+        if self.themes.has(name):
+            theme = self.themes.load(name)
+        else:
+            theme = self.themes.compile_sheet(name)
+
+        self.fonts.load_stylesheet(theme.sheet)
+        return self.themes.apply(theme)
+
+    def defer(
+        self, name: str, task: Callable, priority: int = 0, stage: str = "ready"
+    ) -> None:
+        """
+        Runs non-critical start-up work once the window painted its first frame, in
+        idle time and by priority (lower first). `stage_ready` is emitted with the
+        stage name when its last task is done, `ready` when every task is.
+
+        Args:
+            name (str): Name of the task, for the logs.
+            task (Callable): Called without arguments.
+            priority (int): Lower runs first.
+            stage (str): Stage the task is part of (e.g. "plugins", "settings").
+        """
+        self.startup.add(name, task, priority, stage)
+
+    def add_page(
+        self,
+        name: str,
+        factory: Callable[[], QWidget],
+        prebuild: bool = False,
+        pinned: bool = False,
+        cost_mb: Optional[float] = None,
+    ) -> None:
+        """
+        Registers a page of the router, it's built the first time it's navigated to.
+
+        Args:
+            name (str): Name the page is navigated to with.
+            factory (Callable): Returns the widget of the page.
+            prebuild (bool): Builds it in idle time after the start-up instead.
+            pinned (bool): The page is never unloaded to stay within the budget.
+            cost_mb (float, optional): Memory cost of the page, see PageRouter.
+        """
+        self.pages.register(name, factory, pinned, cost_mb)
+        if prebuild:
+            self.defer(f"page '{name}'", partial(self.pages.build, name), 30, "pages")
+
+    def navigate(self, name: str) -> QWidget:
+        """Shows a page of the router, building it if needed."""
+        return self.pages.navigate(name)
+
+    def submit(self, fn, *args, **kwargs) -> TaskHandle:
+        """Runs a blocking function in the background, see TaskPool.submit."""
+        return self.app.submit(fn, *args, **kwargs)
+
+    def _bring_to_front(self, argv: list, cwd: str) -> None:
+        # Another launch of the app, the user expects this window instead.
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
 
     def mousePressEvent(self, event):
         # Clear focus when clicking anywhere outside of a widget
@@ -94,6 +231,32 @@ class Interface(FramelessMainWindow):
         super().mousePressEvent(event)
 
     def show(self):
-        self._setup_titlebar()
+        with self.app.profiler.span("Interface._setup_titlebar"):
+            self._setup_titlebar()
         self._load_window_properties()
+
+        if not self._painted:
+            profiler = self.app.profiler
+            self._first_paint = (
+                profiler.begin("first paint", profiler.root)
+                if not profiler.finished
+                else None
+            )
+            self.installEventFilter(self)
         super().show()
+
+    def eventFilter(self, watched, event) -> bool:
+        # The start-up ends once the first frame of the window was painted.
+        paint = event.type() == QEvent.Paint  # type:ignore
+        if watched is self and paint and not self._painted:
+            self.removeEventFilter(self)
+            self._painted = True
+            QTimer.singleShot(0, self._end_first_paint)
+
+        return super().eventFilter(watched, event)
+
+    def _end_first_paint(self) -> None:
+        if self._first_paint is not None:
+            self.app.profiler.end(self._first_paint)
+            self.app.finish_startup()
+        self.startup.start()
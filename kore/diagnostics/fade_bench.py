@@ -0,0 +1,149 @@
+"""
+Benchmark of the frame time of several panels fading at once.
+
+Compares a QGraphicsOpacityEffect per panel (offscreen render of every subtree on
+each frame) with the Fader driven by the shared AnimationClock, then runs a real
+fade through the clock and prints its frame statistics:
+
+    python -m kore.diagnostics.fade_bench --panels 8 --frames 60
+"""
+
+import argparse
+import os
+import time
+
+
+def _build_window(panels: int, rows: int):
+    from PySide6.QtWidgets import QFrame, QLabel, QMainWindow, QVBoxLayout, QWidget
+
+    root = QMainWindow()
+    root.setCentralWidget(QWidget())
+    root.resize(1280, 800)
+
+    widgets = []
+    for index in range(panels):
+        panel = QFrame(root)
+        panel.setStyleSheet(
+            "QFrame{background-color:#0c0c0c;border-radius:4px;}"
+            "QLabel{background-color:#9920BF6B;border:1px solid #20BF6B;"
+            "border-radius:4px;color:#070707;padding:3px;}"
+        )
+        layout = QVBoxLayout(panel)
+        for row in range(rows):
+            layout.addWidget(QLabel(f"panel {index} notification {row}"))
+
+        panel.setFixedWidth(310)
+        panel.adjustSize()
+        panel.move(10 + (index % 4) * 315, 10 + (index // 4) * (panel.height() + 5))
+        panel.show()
+        widgets.append(panel)
+
+    root.show()
+    return root, widgets
+
+
+def _frame_cost(app, mode: str, panels: int, rows: int, frames: int) -> float:
+    """Returns the mean milliseconds needed to render one frame of the fade."""
+    from PySide6.QtWidgets import QGraphicsOpacityEffect
+
+    from ..components.animation import Fader
+
+    root, widgets = _build_window(panels, rows)
+    app.processEvents()
+
+    if mode == "effect":
+        effects = []
+        for widget in widgets:
+            effect = QGraphicsOpacityEffect(widget)
+            widget.setGraphicsEffect(effect)
+            effects.append(effect)
+        setters = [effect.setOpacity for effect in effects]
+    else:
+        faders = [Fader(widget, frames * 16) for widget in widgets]
+        for fader in faders:
+            fader.fade_in()
+        setters = [fader.set_opacity for fader in faders]
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        opacity = frame / max(frames - 1, 1)
+        for setter in setters:
+            setter(opacity)
+        root.repaint()
+    elapsed = time.perf_counter() - start
+
+    if mode != "effect":
+        for fader in faders:
+            fader.stop()
+
+    root.close()
+    root.deleteLater()
+    app.processEvents()
+    return elapsed / frames * 1000
+
+
+def _clock_run(app, panels: int, rows: int, duration: int) -> dict:
+    """Fades every panel in through the clock and returns its frame statistics."""
+    from PySide6.QtCore import QEventLoop
+
+    from ..components.animation import AnimationClock, Fader
+
+    root, widgets = _build_window(panels, rows)
+    app.processEvents()
+
+    clock = AnimationClock.instance()
+    clock.stats.clear()
+    loop = QEventLoop()
+    pending = [len(widgets)]
+
+    def finished() -> None:
+        pending[0] -= 1
+        if not pending[0]:
+            loop.quit()
+
+    faders = [Fader(widget, duration) for widget in widgets]
+    for fader in faders:
+        fader.fade_in(finished)
+    loop.exec()
+
+    root.close()
+    root.deleteLater()
+    app.processEvents()
+    return clock.stats.summary()
+
+
+def run(panels: int = 8, rows: int = 10, frames: int = 60) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    return {
+        "effect": _frame_cost(app, "effect", panels, rows, frames),
+        "fader": _frame_cost(app, "fader", panels, rows, frames),
+        "clock": _clock_run(app, panels, rows, frames * 16),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--panels", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    results = run(args.panels, args.rows, args.frames)
+    print(f"QGraphicsOpacityEffect: {results['effect']:.2f} ms/frame")
+    print(f"Fader (snapshot):       {results['fader']:.2f} ms/frame")
+
+    clock = results["clock"]
+    print(f"\nAnimationClock, {clock['frames']} frames:")
+    for name in ("interval", "work"):
+        values = clock[name]
+        print(
+            f"  {name:<9} mean {values['mean']:.2f} ms  "
+            f"p95 {values['p95']:.2f} ms  max {values['max']:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the per-notification cost of the recent notifications panel.
+
+Runs NotificationManager.new with DND enabled (so only the history is touched)
+with the panel closed and opened, in widget and list mode:
+
+    python -m kore.diagnostics.history_bench --count 2000
+"""
+
+import argparse
+import os
+import time
+
+LEVELS = {"I": {"bg": "20BF6B", "text": "000000", "priority": 1}}
+DURATIONS = {"S": 1000}
+
+
+def _measure(app, list_mode: bool, panel_open: bool, count: int) -> float:
+    """Returns the mean cost in microseconds of one notification."""
+    from PySide6.QtWidgets import QMainWindow, QWidget
+
+    from ..components import NotificationHistoryWdgt, NotificationWdgt
+    from ..managers import NotificationManager
+
+    root = QMainWindow()
+    root.setCentralWidget(QWidget())
+    root.resize(800, 600)
+    root.config = None
+    root.show()
+
+    manager = NotificationManager(
+        root,
+        True,
+        DURATIONS,
+        LEVELS,
+        NotificationWdgt,
+        NotificationHistoryWdgt,
+        history_list_mode=list_mode,
+        history_capacity=count,
+    )
+    if panel_open:
+        manager.toggle_recent_notification_panel()
+    app.processEvents()
+
+    start = time.perf_counter()
+    for index in range(count):
+        manager.new(f"benchmark notification #{index}")
+    elapsed = time.perf_counter() - start
+
+    root.close()
+    root.deleteLater()
+    app.processEvents()
+    return elapsed / count * 1e6
+
+
+def run(count: int = 1000) -> dict:
+    """
+    Measures every panel mode and state, returning the mean microseconds per
+    notification keyed by (mode, state).
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+
+    results = {}
+    for list_mode in (False, True):
+        for panel_open in (True, False):
+            mode = "list" if list_mode else "widgets"
+            state = "open" if panel_open else "closed"
+            results[(mode, state)] = _measure(app, list_mode, panel_open, count)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = run(args.count)
+    print(f"{'mode':<10}{'panel':<10}{'us/notification':>16}")
+    for (mode, state), cost in results.items():
+        print(f"{mode:<10}{state:<10}{cost:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+from typing import Optional
+
+
+def rss_mb() -> Optional[float]:
+    """Returns the resident memory of the process in megabytes, None if unknown."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+
+        # Peak instead of current, the best available outside of linux.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
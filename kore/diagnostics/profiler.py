@@ -0,0 +1,174 @@
+"""
+Start-up profiler of the App and Interface.
+
+The App records named spans from its creation until the first paint of the
+window, then writes them as a tree to the debug log and, if a path is given in
+the KORE_STARTUP_TRACE environment variable or in `environment.startup_trace`
+of app.json, as a Chrome trace (chrome://tracing, https://ui.perfetto.dev).
+
+Spans of your own go through the app profiler or the module function, which is a
+no-op once the start-up is over:
+
+    with span("load database"):
+        ...
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import List, Optional
+
+TRACE_ENV = "KORE_STARTUP_TRACE"
+
+_active: Optional["StartupProfiler"] = None
+
+
+class Span:
+    """A named, timed section of the start-up, spans opened inside it are its children."""
+
+    def __init__(self, name: str, start: float, parent: Optional["Span"] = None):
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.parent = parent
+        self.children: List[Span] = []
+
+    @property
+    def duration(self) -> float:
+        """Duration in milliseconds, up to now for an open span."""
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+
+class StartupProfiler:
+    """Records the spans of the start-up as a tree rooted at the profiler creation."""
+
+    def __init__(self, start: Optional[float] = None, name: str = "Startup") -> None:
+        self.log = logging.getLogger("kore.profiler")
+        self.root = Span(name, start if start is not None else time.perf_counter())
+        self.current = self.root
+        self.finished = False
+        self.thread = threading.get_ident()
+
+    def activate(self) -> "StartupProfiler":
+        """Makes this profiler the one used by the module level span function."""
+        global _active
+        _active = self
+        return self
+
+    @contextmanager
+    def span(self, name: str):
+        """Times the block as a child of the innermost open span."""
+        if self.finished or threading.get_ident() != self.thread:
+            yield None
+            return
+
+        span = self.begin(name)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    def begin(self, name: str, parent: Optional[Span] = None) -> Span:
+        """
+        Opens a span that ends with end(), for sections that don't fit a with block.
+        With a parent the span is attached to it and doesn't enclose the next spans.
+        """
+        nested = parent is None
+        parent = parent or self.current
+
+        span = Span(name, time.perf_counter(), parent)
+        parent.children.append(span)
+        if nested:
+            self.current = span
+        return span
+
+    def end(self, span: Span) -> None:
+        span.end = time.perf_counter()
+        if self.current is span:
+            self.current = span.parent or self.root
+
+    def finish(self, trace_path: Optional[str] = None) -> None:
+        """
+        Closes the open spans, logs the tree and writes the Chrome trace if a path is
+        given (or set in the environment).
+        """
+        if self.finished:
+            return
+
+        now = time.perf_counter()
+        span = self.current
+        while span is not None:
+            if span.end is None:
+                span.end = now
+            span = span.parent
+
+        self.finished = True
+        self.current = self.root
+        for line in self.tree():
+            self.log.debug(line)
+
+        trace_path = os.environ.get(TRACE_ENV) or trace_path
+        if trace_path:
+            self.write_chrome_trace(trace_path)
+            self.log.debug(f"Startup trace written to '{trace_path}'")
+
+    def tree(self) -> List[str]:
+        """Returns the spans as indented lines with their duration and share of the total."""
+        total = self.root.duration or 1.0
+        lines = []
+
+        def walk(span: Span, prefix: str, child_prefix: str) -> None:
+            share = span.duration / total * 100
+            lines.append(f"{prefix}{span.name} {span.duration:.1f}ms ({share:.0f}%)")
+            for index, child in enumerate(span.children):
+                last = index == len(span.children) - 1
+                walk(
+                    child,
+                    child_prefix + ("└─ " if last else "├─ "),
+                    child_prefix + ("   " if last else "│  "),
+                )
+
+        walk(self.root, "", "")
+        return lines
+
+    def chrome_trace(self) -> dict:
+        """Returns the spans as complete events of the Chrome trace event format."""
+        events = []
+        pid = os.getpid()
+
+        def walk(span: Span) -> None:
+            events.append(
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": (span.start - self.root.start) * 1e6,
+                    "dur": span.duration * 1000,
+                    "pid": pid,
+                    "tid": self.thread,
+                }
+            )
+            for child in span.children:
+                walk(child)
+
+        walk(self.root)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+def span(name: str):
+    """Times the block in the active start-up profiler, does nothing without one."""
+    if _active is None or _active.finished:
+        return nullcontext()
+
+    return _active.span(name)
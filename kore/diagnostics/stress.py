@@ -0,0 +1,401 @@
+"""
+Headless stress test of the NotificationManager.
+
+Drives NotificationManager.new at a fixed rate under the offscreen platform and
+records the enqueue to visible latency, event loop stalls, live objects and RSS
+over time. The run fails (exit code 1) when a result goes over its budget:
+
+    python -m kore.diagnostics.stress --rate 50 --seconds 10 --max-visible 3
+    kore stress --config ./src/config/notifications.json --budget latency_p95_ms=500
+
+The config file is optional JSON with "levels", "durations" and "budgets" keys,
+in the same format NotificationManager and this module use.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .memory import rss_mb
+from .tracing import TraceEvent, TraceSink
+
+DEFAULT_LEVELS = {
+    "I": {"bg": "20BF6B", "text": "000000", "priority": 1},
+    "W": {"bg": "F7B731", "text": "000000", "priority": 2},
+    "E": {"bg": "EB3B5A", "text": "000000", "priority": 3},
+}
+DEFAULT_DURATIONS = {"S": 1500, "M": 3000}
+DEFAULT_BUDGETS = {
+    "latency_p95_ms": 2000.0,
+    "stall_max_ms": 250.0,
+    "leaked_widgets": 0,
+    "object_growth": 0,
+    "rss_growth_mb": 64.0,
+}
+
+TICK_INTERVAL = 10
+SAMPLE_INTERVAL = 500
+STALL_THRESHOLD = 50
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class _Census:
+    """Counts the probe notifications that were built and destroyed."""
+
+    def __init__(self) -> None:
+        self.created = 0
+        self.destroyed = 0
+
+    @property
+    def alive(self) -> int:
+        return self.created - self.destroyed
+
+    def release(self, *args) -> None:
+        self.destroyed += 1
+
+
+class _WaitingSink(TraceSink):
+    """
+    Removes from the waiting notifications the ones the manager won't display, those
+    dropped by DND, coalesced or expired.
+    """
+
+    DISCARDED = ("dropped_dnd", "coalesced", "expired")
+
+    def __init__(self, enqueued: Dict[str, float]) -> None:
+        self.enqueued = enqueued
+        self.sending: Optional[str] = None
+        self.messages: Dict[int, Optional[str]] = {}
+
+    def record(self, event: TraceEvent) -> None:
+        if event.event == "created":
+            # Created within manager.new, for the message being sent.
+            self.messages[event.id] = self.sending
+        elif event.event in self.DISCARDED:
+            message = self.messages.pop(event.id, None)
+            if message is not None:
+                self.enqueued.pop(message, None)
+        elif event.event == "displayed":
+            self.messages.pop(event.id, None)
+
+
+def _probe_class(census: _Census, enqueued: Dict[str, float], latencies: list):
+    """Builds a NotificationWdgt that reports when it's built, displayed and destroyed."""
+    from ..components import NotificationWdgt
+
+    class ProbeNotification(NotificationWdgt):
+        def __init__(self, *args, **kwargs) -> None:
+            super().__init__(*args, **kwargs)
+            census.created += 1
+            self.destroyed.connect(census.release)
+
+        def display(self) -> None:
+            super().display()
+            sent = enqueued.pop(self.message, None)
+            if sent is not None:
+                latencies.append((time.perf_counter() - sent) * 1000)
+
+    return ProbeNotification
+
+
+def run(
+    rate: float = 20,
+    seconds: float = 10,
+    levels: Optional[dict] = None,
+    durations: Optional[dict] = None,
+    dnd: bool = False,
+    override_dnd: float = 0.0,
+    max_visible: Optional[int] = None,
+    overflow: str = "queue",
+    stale_after: Optional[int] = None,
+    list_mode: bool = False,
+    drain_timeout: float = 30,
+    budgets: Optional[dict] = None,
+    seed: int = 0,
+) -> dict:
+    """
+    Runs the stress test and returns its report, the `failures` entry lists the
+    results that went over their budget.
+
+    Args:
+        rate: Notifications sent per second.
+        seconds: Duration of the sending phase.
+        levels: The levels of the NotificationManager, picked at random.
+        durations: The durations of the NotificationManager, picked at random.
+        dnd: Initial do not disturb state.
+        override_dnd: Fraction of the notifications sent with override_dnd.
+        max_visible, overflow, stale_after: Stacked mode of the NotificationManager.
+        list_mode: Use the list mode of the recent notifications panel.
+        drain_timeout: Seconds given to the queue to empty once the sending stops.
+        budgets: Limits overriding DEFAULT_BUDGETS, None disables a limit.
+        seed: Seed of the level, duration and override picks.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QEvent, QEventLoop, QObject, Qt, QTimer
+    from PySide6.QtWidgets import QApplication, QMainWindow, QWidget
+    from shiboken6 import isValid
+
+    from ..components import NotificationHistoryWdgt
+    from ..managers import NotificationManager
+
+    app = QApplication.instance() or QApplication([])
+    levels = levels or DEFAULT_LEVELS
+    durations = durations or DEFAULT_DURATIONS
+    budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+    picker = random.Random(seed)
+
+    census = _Census()
+    enqueued: Dict[str, float] = {}
+    latencies: List[float] = []
+    stalls: List[float] = []
+    samples: List[dict] = []
+
+    root = QMainWindow()
+    root.setCentralWidget(QWidget())
+    root.resize(1280, 800)
+    root.config = None  # type:ignore
+    root.show()
+
+    manager = NotificationManager(
+        root,
+        dnd,
+        durations,
+        levels,
+        _probe_class(census, enqueued, latencies),
+        NotificationHistoryWdgt,
+        history_list_mode=list_mode,
+        max_visible=max_visible,
+        overflow=overflow,
+        stale_after=stale_after,
+    )
+    waiting = _WaitingSink(enqueued)
+    manager.tracer.add_sink(waiting)
+
+    def flush() -> None:
+        app.processEvents()
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)  # type:ignore
+
+    def live_objects() -> int:
+        return len(root.findChildren(QObject))
+
+    flush()
+    base_rss = rss_mb()
+    base_objects = live_objects()
+    started = time.perf_counter()
+
+    def sample() -> None:
+        samples.append(
+            {
+                "time": round(time.perf_counter() - started, 3),
+                "rss_mb": rss_mb(),
+                "objects": live_objects(),
+                "notifications": census.alive,
+                "waiting": len(enqueued),
+            }
+        )
+
+    ## Stall monitor, a precise timer that should fire every tick.
+    last_beat = [time.perf_counter()]
+
+    def beat() -> None:
+        now = time.perf_counter()
+        stalls.append(max(0.0, (now - last_beat[0]) * 1000 - TICK_INTERVAL))
+        last_beat[0] = now
+
+    heartbeat = QTimer(interval=TICK_INTERVAL, timeout=beat)  # type:ignore
+    heartbeat.setTimerType(Qt.PreciseTimer)  # type:ignore
+    sampler = QTimer(interval=SAMPLE_INTERVAL, timeout=sample)  # type:ignore
+
+    ## Sender, spreads the rate over the ticks.
+    sent = [0]
+    owed = [0.0]
+    last_send = [time.perf_counter()]
+    level_names = list(levels)
+    duration_names = list(durations)
+
+    def send() -> None:
+        now = time.perf_counter()
+        owed[0] += rate * (now - last_send[0])
+        last_send[0] = now
+        while owed[0] >= 1:
+            owed[0] -= 1
+            message = f"stress notification #{sent[0]}"
+            sent[0] += 1
+            enqueued[message] = time.perf_counter()
+            waiting.sending = message
+            manager.new(
+                message,
+                level=picker.choice(level_names),
+                duration=picker.choice(duration_names),
+                override_dnd=picker.random() < override_dnd,
+            )
+
+    sender = QTimer(interval=TICK_INTERVAL, timeout=send)  # type:ignore
+    sender.setTimerType(Qt.PreciseTimer)  # type:ignore
+
+    loop = QEventLoop()
+    deadline = [0.0]
+
+    def drained() -> None:
+        if not census.alive or time.perf_counter() > deadline[0]:
+            loop.quit()
+
+    def stop_sending() -> None:
+        sender.stop()
+        deadline[0] = time.perf_counter() + drain_timeout
+        drain_check.start()
+
+    drain_check = QTimer(interval=100, timeout=drained)  # type:ignore
+
+    heartbeat.start()
+    sampler.start()
+    sender.start()
+    QTimer.singleShot(int(seconds * 1000), stop_sending)
+    loop.exec()
+
+    for timer in (heartbeat, sampler, drain_check):
+        timer.stop()
+
+    # Whatever is left once the drain timed out is closed, what outlives it leaked.
+    drained = not census.alive
+    leftovers = [notification for notification, _ in manager.queue + manager.visible]
+    if manager.summary is not None:
+        leftovers.append(manager.summary)
+    manager.queue, manager.pending = [], []
+    for notification in leftovers:
+        if isValid(notification):
+            notification.close()
+
+    flush()
+    sample()
+
+    end_rss = samples[-1]["rss_mb"]
+    report = {
+        "sent": sent[0],
+        "displayed": len(latencies),
+        "not_displayed": sent[0] - len(latencies),
+        "drained": drained,
+        "latency_p50_ms": _percentile(latencies, 50),
+        "latency_p95_ms": _percentile(latencies, 95),
+        "latency_p99_ms": _percentile(latencies, 99),
+        "latency_max_ms": max(latencies, default=0.0),
+        "stall_max_ms": max(stalls, default=0.0),
+        "stalls": sum(1 for stall in stalls if stall > STALL_THRESHOLD),
+        "leaked_widgets": census.alive,
+        "object_growth": samples[-1]["objects"] - base_objects,
+        "rss_growth_mb": (
+            end_rss - base_rss if end_rss is not None and base_rss is not None else 0.0
+        ),
+        "samples": samples,
+    }
+    report["failures"] = [
+        f"{name} {report[name]:.1f} > {limit}"
+        for name, limit in budgets.items()
+        if limit is not None and name in report and report[name] > limit
+    ]
+
+    root.close()
+    root.deleteLater()
+    flush()
+    return report
+
+
+def load_config(path: str) -> dict:
+    """Reads the levels, durations and budgets of a stress config file."""
+    with open(path, "r", encoding="utf-8") as config_file:
+        config = json.load(config_file)
+
+    return {
+        key: config[key] for key in ("levels", "durations", "budgets") if key in config
+    }
+
+
+def parse_budgets(values: List[str]) -> dict:
+    """Parses NAME=VALUE budget overrides, a VALUE of 'none' disables the budget."""
+    budgets = {}
+    for value in values:
+        name, _, limit = value.partition("=")
+        budgets[name.strip()] = None if limit.lower() == "none" else float(limit)
+
+    return budgets
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"sent {report['sent']}, displayed {report['displayed']}, "
+        f"not displayed {report['not_displayed']}"
+        + ("" if report["drained"] else " (the queue didn't drain)")
+    )
+    print(
+        f"latency   p50 {report['latency_p50_ms']:.1f} ms  "
+        f"p95 {report['latency_p95_ms']:.1f} ms  "
+        f"p99 {report['latency_p99_ms']:.1f} ms  max {report['latency_max_ms']:.1f} ms"
+    )
+    print(f"stalls    {report['stalls']} over {STALL_THRESHOLD} ms, ", end="")
+    print(f"max {report['stall_max_ms']:.1f} ms")
+    print(
+        f"leaks     {report['leaked_widgets']} notifications alive, "
+        f"{report['object_growth']:+d} objects, "
+        f"{report['rss_growth_mb']:+.1f} MB rss"
+    )
+
+    print(f"\n{'time':>8}{'rss (MB)':>10}{'objects':>9}{'alive':>7}{'waiting':>9}")
+    for sample in report["samples"]:
+        rss = sample["rss_mb"]
+        print(
+            f"{sample['time']:>8.1f}{rss if rss is not None else 0:>10.1f}"
+            f"{sample['objects']:>9}{sample['notifications']:>7}{sample['waiting']:>9}"
+        )
+
+    for failure in report["failures"]:
+        print(f"[-] over budget: {failure}")
+    if not report["failures"]:
+        print("[+] every budget met")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--config", help="JSON file with levels/durations/budgets")
+    parser.add_argument("--dnd", action="store_true")
+    parser.add_argument("--override-dnd", type=float, default=0.0)
+    parser.add_argument("--max-visible", type=int)
+    parser.add_argument("--overflow", default="queue")
+    parser.add_argument("--stale-after", type=int)
+    parser.add_argument("--list-mode", action="store_true")
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--budget", action="append", default=[], metavar="NAME=VALUE")
+    args = parser.parse_args(argv)
+
+    options = load_config(args.config) if args.config else {}
+    options["budgets"] = dict(options.get("budgets", {}), **parse_budgets(args.budget))
+
+    report = run(
+        rate=args.rate,
+        seconds=args.seconds,
+        dnd=args.dnd,
+        override_dnd=args.override_dnd,
+        max_visible=args.max_visible,
+        overflow=args.overflow,
+        stale_after=args.stale_after,
+        list_mode=args.list_mode,
+        drain_timeout=args.drain_timeout,
+        **options,
+    )
+    print_report(report)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
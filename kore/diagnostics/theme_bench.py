@@ -0,0 +1,213 @@
+"""
+Benchmark of a theme switch on a window with a couple thousand widgets.
+
+Compares setting the whole stylesheet of the other theme (what apply_style did
+before the Theme manager compiled the themes) with the compiled themes of the Theme
+manager, where two themes sharing a template only differ in their palette, and
+times their compilation with and without the cache:
+
+    python -m kore.diagnostics.theme_bench --widgets 2000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+BASE_THEME = """
+/* Shared by the dark and light themes, only the variables differ. */
+QMainWindow, QWidget { background-color: @bg; border: none; }
+QFrame#card { border: 1px solid @border; border-radius: 4px; }
+QPushButton {
+    font: 8pt "JetBrains Mono";
+    color: @bg;
+    background-color: @accent;
+    border: 1px solid @border;
+    border-radius: 5px;
+    padding: 0px 10px;
+}
+QPushButton:hover { background-color: @hover; }
+QLabel { color: @text; }
+QLabel#title { font: 500 12pt "JetBrains Mono"; }
+#tb_closebtn:hover { background-color: #eb4d4b; color: #e6e6e6; }
+"""
+
+THEME = """
+@import "base.qss";
+@bg: {bg};
+@text: {text};
+@accent: {accent};
+@border: {border};
+@hover: {hover};
+
+@palette {{
+    window: @bg;
+    window-text: @text;
+    button: @accent;
+    mid: @border;
+    light: @hover;
+}}
+"""
+
+THEMES = {
+    "dark": {
+        "bg": "#09090C",
+        "text": "#EFEFF1",
+        "accent": "#AEAFD0",
+        "border": "#575868",
+        "hover": "#C5C6E0",
+    },
+    "light": {
+        "bg": "#FAFAFA",
+        "text": "#121211",
+        "accent": "#575868",
+        "border": "#AEAFD0",
+        "hover": "#6B6C80",
+    },
+}
+
+
+def _write_themes(path: str) -> None:
+    with open(os.path.join(path, "base.qss"), "w", encoding="utf-8") as f:
+        f.write(BASE_THEME)
+    for name, colors in THEMES.items():
+        with open(os.path.join(path, f"{name}.qss"), "w", encoding="utf-8") as f:
+            f.write(THEME.format(**colors))
+
+
+def _build_window(widgets: int):
+    from PySide6.QtWidgets import (
+        QFrame,
+        QGridLayout,
+        QLabel,
+        QMainWindow,
+        QPushButton,
+        QVBoxLayout,
+        QWidget,
+    )
+
+    root = QMainWindow()
+    central = QWidget()
+    grid = QGridLayout(central)
+    root.setCentralWidget(central)
+    root.resize(1600, 1000)
+
+    # A card is a frame, a title, two labels and a button.
+    for index in range(max(widgets // 5, 1)):
+        card = QFrame()
+        card.setObjectName("card")
+        layout = QVBoxLayout(card)
+        title = QLabel(f"card {index}")
+        title.setObjectName("title")
+        layout.addWidget(title)
+        layout.addWidget(QLabel("status"))
+        layout.addWidget(QLabel(f"{index} items"))
+        layout.addWidget(QPushButton("open"))
+        grid.addWidget(card, index // 20, index % 20)
+
+    root.show()
+    return root
+
+
+def _timed(app, root, action) -> tuple:
+    start = time.perf_counter()
+    result = action()
+    root.repaint()
+    app.processEvents()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def run(widgets: int = 2000, switches: int = 5) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    from ..managers.theme import Theme
+
+    app = QApplication.instance() or QApplication([])
+    directory = tempfile.mkdtemp()
+    themes_path = os.path.join(directory, "themes")
+    cache_path = os.path.join(directory, "cache")
+    os.makedirs(themes_path)
+    _write_themes(themes_path)
+
+    try:
+        theme = Theme(themes_path, cache_path)
+        start = time.perf_counter()
+        compiled = {name: theme.load(name) for name in THEMES}
+        cold = (time.perf_counter() - start) * 1000 / len(THEMES)
+
+        start = time.perf_counter()
+        for name in THEMES:
+            Theme(themes_path, cache_path).load(name)
+        cached = (time.perf_counter() - start) * 1000 / len(THEMES)
+
+        root = _build_window(widgets)
+        app.processEvents()
+        count = len(QApplication.allWidgets())
+
+        # Whole sheets with the colors written in, set one after the other.
+        sheets = [compiled[name].resolved() for name in THEMES]
+        app.setStyleSheet(sheets[0])
+        app.processEvents()
+        sheet_times = []
+        for index in range(switches):
+            sheet = sheets[(index + 1) % len(sheets)]
+            sheet_times.append(_timed(app, root, lambda: app.setStyleSheet(sheet))[0])
+
+        app.setStyleSheet("")
+        theme.apply("dark")
+        app.processEvents()
+        engine_times, reports = [], []
+        for index in range(switches):
+            name = list(THEMES)[(index + 1) % len(THEMES)]
+            elapsed, report = _timed(app, root, lambda: theme.apply(name))
+            engine_times.append(elapsed)
+            reports.append(report)
+        unchanged = _timed(app, root, lambda: theme.apply(name))[0]
+
+        root.close()
+        root.deleteLater()
+        app.processEvents()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "widgets": count,
+        "compile_ms": cold,
+        "cached_ms": cached,
+        "sheet_ms": sheet_times,
+        "engine_ms": engine_times,
+        "unchanged_ms": unchanged,
+        "report": reports[-1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--widgets", type=int, default=2000)
+    parser.add_argument("--switches", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.widgets, args.switches)
+    print(f"{results['widgets']} widgets")
+    print(f"Compile:       {results['compile_ms']:.2f} ms/theme")
+    print(f"Cached load:   {results['cached_ms']:.2f} ms/theme")
+    for name in ("sheet", "engine"):
+        values = sorted(results[f"{name}_ms"])
+        label = "Whole sheet:" if name == "sheet" else "Theme.apply:"
+        print(
+            f"{label:<14} median {values[len(values) // 2]:.1f} ms  "
+            f"max {values[-1]:.1f} ms"
+        )
+    print(f"Same theme:    {results['unchanged_ms']:.2f} ms")
+
+    report = results["report"]
+    print(
+        f"\nLast switch: {report['mode']}, {len(report['changed_roles'])} roles, "
+        f"{report['repolished']} widgets re-polished"
+    )
+
+
+if __name__ == "__main__":
+    main()
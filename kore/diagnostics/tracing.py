@@ -0,0 +1,145 @@
+"""
+Lifecycle tracing of the notifications.
+
+The NotificationManager reports when each notification is created, queued,
+displayed, paused by a hover, faded and closed, together with the ones dropped by
+DND, coalesced, evicted or expired. Events go to the sinks attached to its tracer:
+
+    sink = RingBufferSink()
+    manager.tracer.add_sink(sink)
+    manager.tracer.add_sink(JsonLinesSink("./logs/notifications.jsonl"))
+    ...
+    sink.lifecycles()[0]  # {"level": "I", "created": ..., "displayed": ...}
+
+Without sinks nothing is recorded but the per level counters.
+"""
+
+import itertools
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional
+
+LIFECYCLE_EVENTS = ("created", "queued", "displayed", "paused", "faded", "closed")
+COUNTED_EVENTS = ("dropped_dnd", "coalesced", "evicted", "expired")
+
+
+class TraceEvent(NamedTuple):
+    """A single step of the lifecycle of a notification."""
+
+    time: float
+    id: int
+    level: str
+    event: str
+
+
+class TraceSink(ABC):
+    """Receives the trace events, subclasses decide where they are kept."""
+
+    @abstractmethod
+    def record(self, event: TraceEvent) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+
+class RingBufferSink(TraceSink):
+    """Keeps the last events in memory."""
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.events: deque = deque(maxlen=capacity)
+
+    def record(self, event: TraceEvent) -> None:
+        self.events.append(event)
+
+    def lifecycles(self) -> Dict[int, dict]:
+        """
+        Groups the kept events by notification, each lifecycle maps its events to
+        their (first) timestamp.
+        """
+        lifecycles: Dict[int, dict] = {}
+        for event in self.events:
+            lifecycle = lifecycles.setdefault(event.id, {"level": event.level})
+            lifecycle.setdefault(event.event, event.time)
+
+        return lifecycles
+
+    def waits(self, start: str = "queued", end: str = "displayed") -> List[float]:
+        """Returns the seconds between two events of every notification that has both."""
+        return [
+            lifecycle[end] - lifecycle[start]
+            for lifecycle in self.lifecycles().values()
+            if start in lifecycle and end in lifecycle
+        ]
+
+
+class JsonLinesSink(TraceSink):
+    """Appends every event to a file as a JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def record(self, event: TraceEvent) -> None:
+        self.file.write(json.dumps(event._asdict()) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class NotificationTracer:
+    """
+    Hands out the ids of the traced notifications and forwards their events to the
+    sinks, it also keeps the per level counters of the counted events.
+    """
+
+    def __init__(self) -> None:
+        self.sinks: List[TraceSink] = []
+        self.counters: Dict[str, Counter] = defaultdict(Counter)
+        self._ids = itertools.count()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def add_sink(self, sink: TraceSink) -> TraceSink:
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink: TraceSink) -> None:
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+            sink.close()
+
+    def created(self, level: str) -> Optional[int]:
+        """Returns the id of a new notification, None when nothing is traced."""
+        if not self.sinks:
+            return None
+
+        trace_id = next(self._ids)
+        self.emit(trace_id, level, "created")
+        return trace_id
+
+    def emit(self, trace_id: Optional[int], level: str, event: str, *args) -> None:
+        """Records an event, extra arguments (from signals) are ignored."""
+        if event in COUNTED_EVENTS:
+            self.counters[level][event] += 1
+
+        if trace_id is None or not self.sinks:
+            return
+
+        record = TraceEvent(time.time(), trace_id, level, event)
+        for sink in self.sinks:
+            sink.record(record)
+
+    def attach(self, notification, trace_id: Optional[int], level: str) -> None:
+        """Traces the displayed, paused, faded and closed events of a notification widget."""
+        if trace_id is None:
+            return
+
+        for event in ("displayed", "paused", "faded", "closed"):
+            getattr(notification, event).connect(
+                partial(self.emit, trace_id, level, event)
+            )
@@ -0,0 +1,133 @@
+"""
+Event loop stall watchdog.
+
+A background thread pings the Qt event loop every `interval` milliseconds. When a
+ping isn't serviced within `threshold` milliseconds, the current Python stack of
+the main thread is logged, then the whole length of the stall once the loop
+answers again. The stall lengths are kept in a histogram (by lower bound, the first
+one being the threshold) that is logged on exit.
+
+Off by default, turned on by `environment.watchdog` of app.json (with the optional
+`watchdog_interval` and `watchdog_threshold`) or the KORE_WATCHDOG environment
+variable.
+"""
+
+import logging
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_right
+from typing import Dict, Optional
+
+from PySide6.QtCore import QObject, Qt, Signal
+
+WATCHDOG_ENV = "KORE_WATCHDOG"
+# Lower bounds of the histogram buckets above the threshold.
+HISTOGRAM_BOUNDS = (100, 250, 500, 1000, 2500, 5000)
+
+
+class StallWatchdog(QObject):
+    """
+    Pings the event loop of the thread it was created on from a daemon thread, the
+    pings are queued signals so a running loop answers them for the cost of a slot.
+    """
+
+    ping = Signal()
+
+    def __init__(self, interval: int = 100, threshold: int = 250, parent=None) -> None:
+        """
+        Args:
+            interval (int): Milliseconds between the pings.
+            threshold (int): Milliseconds after which an unanswered ping is a stall.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.watchdog")
+        self.interval = interval
+        self.threshold = threshold
+
+        self.main_thread = threading.get_ident()
+        self.bounds = [threshold] + [b for b in HISTOGRAM_BOUNDS if b > threshold]
+        self.stalls: Dict[int, int] = {bound: 0 for bound in self.bounds}
+        self.longest = 0.0
+        self.thread: Optional[threading.Thread] = None
+        self.serviced = threading.Event()
+        self.stopped = threading.Event()
+
+        self.ping.connect(self._pong, Qt.QueuedConnection)  # type:ignore
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._watch, name="kore-watchdog")
+        self.thread.daemon = True
+        self.thread.start()
+        self.log.debug(f"Watching the event loop, {self.threshold}ms stall threshold")
+
+    def stop(self) -> None:
+        """Stops the thread and logs the histogram of the stalls."""
+        if self.thread is None:
+            return
+
+        self.stopped.set()
+        self.serviced.set()
+        self.thread.join(self.interval / 1000 * 2)
+        self.thread = None
+
+        if any(self.stalls.values()):
+            for line in self.summary():
+                self.log.info(line)
+
+    def summary(self) -> list:
+        """Returns the histogram of the stall lengths as lines."""
+        total = sum(self.stalls.values())
+        lines = [f"{total} event loop stalls, longest {self.longest:.0f}ms"]
+        for index, bound in enumerate(self.bounds):
+            if not self.stalls[bound]:
+                continue
+
+            if index + 1 < len(self.bounds):
+                label = f"{bound}-{self.bounds[index + 1]}ms"
+            else:
+                label = f"{bound}ms+"
+            lines.append(f"  {label}: {self.stalls[bound]}")
+
+        return lines
+
+    def record(self, duration: float) -> None:
+        """Adds a stall of `duration` milliseconds to the histogram."""
+        self.longest = max(self.longest, duration)
+        index = max(bisect_right(self.bounds, duration) - 1, 0)
+        self.stalls[self.bounds[index]] += 1
+
+    def main_stack(self) -> str:
+        frame = sys._current_frames().get(self.main_thread)
+        if frame is None:
+            return "  <main thread not found>\n"
+
+        return "".join(traceback.format_stack(frame))
+
+    def _pong(self) -> None:
+        self.serviced.set()
+
+    def _watch(self) -> None:
+        while not self.stopped.wait(self.interval / 1000):
+            self.serviced.clear()
+            sent = time.perf_counter()
+            self.ping.emit()
+            if self.serviced.wait(self.threshold / 1000):
+                continue
+
+            # Stack of the moment the threshold is crossed, the loop is still blocked.
+            stack = self.main_stack()
+            self.serviced.wait()
+            if self.stopped.is_set():
+                return
+
+            duration = (time.perf_counter() - sent) * 1000
+            self.record(duration)
+            self.log.warning(
+                f"Event loop stalled for {duration:.0f}ms, main thread was at:\n{stack}"
+            )
@@ -1,4 +1,25 @@
-from .config import Config
-from .dynamic_config import DynamicConfigManager
-from .notifications import NotificationManager
-from .theme import Theme
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_import
+
+# Public names and their modules, imported on first access.
+_LAZY = {
+    "Config": ".config",
+    "DynamicConfigManager": ".dynamic_config",
+    "NotificationServer": ".ipc",
+    "NotificationManager": ".notifications",
+    "PluginManager": ".plugins",
+    "Theme": ".theme",
+}
+
+__all__ = list(_LAZY)
+
+if TYPE_CHECKING:
+    from .config import Config
+    from .dynamic_config import DynamicConfigManager
+    from .ipc import NotificationServer
+    from .notifications import NotificationManager
+    from .plugins import PluginManager
+    from .theme import Theme
+
+__getattr__, __dir__ = lazy_import(__name__, _LAZY)
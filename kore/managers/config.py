@@ -43,6 +43,17 @@ class Config:
 
         return data
 
+    def has(self, keys: str, file_name: str = "config") -> bool:
+        """Checks if the hierarchical keys exist, without logging the missing ones."""
+        data = self.loaded_data.get(file_name)
+        for key in keys.split("."):
+            if not isinstance(data, dict) or key not in data:
+                return False
+
+            data = data[key]
+
+        return True
+
     def put(self, keys: str, new_value: Any, file_name: str = "config") -> None:
         """Modifies nested configuration data using a hierarchical key structure.
 
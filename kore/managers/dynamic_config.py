@@ -1,11 +1,16 @@
 import json
 import logging
 import os
+from typing import TYPE_CHECKING, Optional
 
 from PySide6.QtWidgets import QLabel, QVBoxLayout
 
-from ..components import SettingFormWidget
-from ..managers import Config
+from ..components.settings import SettingFormWidget
+from ..diagnostics.profiler import span
+from .config import Config
+
+if TYPE_CHECKING:
+    from .plugins import PluginManager
 
 
 class DynamicConfigManager:
@@ -16,23 +21,32 @@ class DynamicConfigManager:
         destination_layout: type[QVBoxLayout],
         settings_widget: type[SettingFormWidget] = SettingFormWidget,
         config_path: str = "./src/config",
+        plugins: Optional["PluginManager"] = None,
     ) -> None:
         self.log = logging.getLogger("kore.dynamic_config")
         self.config_path = config_path
+        self.plugins = plugins
 
-        self.config_instance = config_instance
-        self.config_instance.runtime_load(path="./settings.json")
+        with span("DynamicConfigManager"):
+            self.config_instance = config_instance
+            self.config_instance.runtime_load(path="./settings.json")
 
-        self.settings_widget_class = settings_widget
-        self.destination_layout = destination_layout
+            self.settings_widget_class = settings_widget
+            self.destination_layout = destination_layout
 
-        with open(os.path.join(self.config_path, "conf_metadata.json"), "r") as f:
-            self.metadata = json.loads(f.read())
+            metadata_path = os.path.join(self.config_path, "conf_metadata.json")
+            with open(metadata_path, "r") as f:
+                self.metadata = json.loads(f.read())
+            self._add_plugin_settings()
 
-        self._check_structure()
-        self._sync_settings()
+            self._check_structure()
+            self._sync_settings()
 
     def generate(self):
+        if self.plugins is not None:
+            # The settings page is open, its plugins are activated.
+            self.plugins.fire("settings")
+
         for category, setting in self.metadata.items():
             category_name = category.replace("_", " ").lower().capitalize()
             label = QLabel(category_name)
@@ -44,6 +58,16 @@ class DynamicConfigManager:
                 )
                 self.destination_layout.addWidget(widget)
 
+    def _add_plugin_settings(self):
+        """add the settings contributed by the plugin manifests, the app ones win"""
+        if self.plugins is None:
+            return
+
+        for category, settings in self.plugins.settings_metadata().items():
+            category_metadata = self.metadata.setdefault(category, {})
+            for key, data in settings.items():
+                category_metadata.setdefault(key, data)
+
     def _merge_settings(
         self, current_settings: dict, settings_from_metadata: dict
     ) -> dict:
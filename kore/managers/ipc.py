@@ -0,0 +1,255 @@
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Optional
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtNetwork import QLocalServer, QLocalSocket
+
+if TYPE_CHECKING:
+    from .notifications import NotificationManager
+
+RECORD_KEYS = (
+    "message",
+    "level",
+    "duration",
+    "timestamp",
+    "timestamp_message",
+    "link",
+    "override_dnd",
+    "require_close",
+    "channel",
+)
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def server_name(app_name: str) -> str:
+    """Returns the local server name used by the app with the given name."""
+    return "kore-" + re.sub(r"[^A-Za-z0-9_.-]+", "-", app_name).strip("-").lower()
+
+
+class _Client:
+    """Reading state of a connected socket."""
+
+    def __init__(self, socket: QLocalSocket) -> None:
+        self.socket = socket
+        self.pending: deque = deque()
+        self.received = 0
+
+
+class NotificationServer(QObject):
+    """
+    Local (unix socket / named pipe) endpoint that lets other processes of the machine
+    raise notifications. Clients write one JSON record per line, with the arguments of
+    NotificationManager.new, a line that isn't JSON is taken as the message.
+
+    Records are fed to the manager in batches, at most FLUSH_BUDGET milliseconds per
+    event loop tick. A client with MAX_PENDING records waiting isn't read anymore, its
+    socket buffer fills up and its writes block until the batches catch up.
+    """
+
+    FLUSH_BUDGET = 8
+    FLUSH_INTERVAL = 16
+    MAX_PENDING = 256
+    READ_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, manager: "NotificationManager", name: str, parent=None) -> None:
+        """
+        Args:
+            manager (NotificationManager): Receives the notifications.
+            name (str): Name of the local server, see server_name.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.ipc")
+        self.manager = manager
+        self.name = name
+
+        self.clients: Dict[QLocalSocket, _Client] = {}
+        self.received = 0
+        self.rejected = 0
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.UserAccessOption)  # type:ignore
+        self.server.newConnection.connect(self._accept)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(self.FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self._flush)
+
+    def listen(self) -> bool:
+        """
+        Starts listening, a server left behind by a crashed process is removed first.
+        Returns False if another running process already owns the name.
+        """
+        if self.server.listen(self.name):
+            self.log.debug(f"Listening for notifications on '{self.name}'")
+            return True
+
+        probe = QLocalSocket()
+        probe.connectToServer(self.name)
+        if probe.waitForConnected(100):
+            probe.disconnectFromServer()
+            self.log.error(f"'{self.name}' is already used by another process")
+            return False
+
+        QLocalServer.removeServer(self.name)
+        if not self.server.listen(self.name):
+            self.log.error(
+                f"Can't listen on '{self.name}': {self.server.errorString()}"
+            )
+            return False
+
+        self.log.debug(f"Listening for notifications on '{self.name}'")
+        return True
+
+    def close(self) -> None:
+        self.flush_timer.stop()
+        self.server.close()
+        for socket in list(self.clients):
+            socket.disconnectFromServer()
+
+    ## Clients.
+
+    def _accept(self) -> None:
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.setReadBufferSize(self.READ_BUFFER_SIZE)
+            self.clients[socket] = _Client(socket)
+
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._drop(socket))
+
+    def _drop(self, socket: QLocalSocket) -> None:
+        # Kept until everything the client wrote before leaving was handed over.
+        client = self.clients.get(socket)
+        if client is not None and not client.pending and not socket.bytesAvailable():
+            self.clients.pop(socket)
+            socket.deleteLater()
+
+    def _read(self, socket: QLocalSocket) -> None:
+        client = self.clients.get(socket)
+        if client is None:
+            return
+
+        # Leave the rest in the socket buffer while the client is over its quota.
+        while len(client.pending) < self.MAX_PENDING and socket.canReadLine():
+            line = bytes(socket.readLine()).strip()  # type:ignore
+            if not line:
+                continue
+
+            record = self._parse(line)
+            if record is None:
+                self.rejected += 1
+                continue
+
+            client.pending.append(record)
+            client.received += 1
+
+        if len(client.pending) < self.MAX_PENDING:
+            # Qt stops reading a socket once its read buffer is full and doesn't
+            # resume on its own, resizing the buffer turns the notifications back on.
+            socket.setReadBufferSize(0)
+            socket.setReadBufferSize(self.READ_BUFFER_SIZE)
+
+        if client.pending and not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def _parse(self, line: bytes) -> Optional[dict]:
+        try:
+            text = line.decode("utf-8")
+        except UnicodeDecodeError:
+            self.log.warning("Notification record is not valid utf-8")
+            return None
+
+        if not text.startswith("{"):
+            return {"message": text}
+
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            self.log.warning(f"Notification record is not valid JSON: {e}")
+            return None
+
+        record = {key: record[key] for key in RECORD_KEYS if key in record}
+        if not isinstance(record.get("message"), str):
+            self.log.warning("Notification record without message")
+            return None
+        if record.get("level", "I") not in self.manager.levels:
+            self.log.warning(f"Unknown notification level '{record['level']}'")
+            return None
+        if record.get("duration", "S") not in self.manager.durations:
+            self.log.warning(f"Unknown notification duration '{record['duration']}'")
+            return None
+
+        return record
+
+    ## Batches.
+
+    def _flush(self) -> None:
+        # Round robin over the clients until the budget of this tick is spent.
+        deadline = time.perf_counter() + self.FLUSH_BUDGET / 1000
+        clients = [client for client in self.clients.values() if client.pending]
+        while clients and time.perf_counter() < deadline:
+            for client in clients:
+                # A failing record mustn't stall the other clients or the reads below.
+                try:
+                    self.manager.new(**client.pending.popleft())
+                except Exception:
+                    self.log.exception("Failed to raise a received notification")
+                self.received += 1
+
+            clients = [client for client in clients if client.pending]
+
+        for client in list(self.clients.values()):
+            socket = client.socket
+            if len(client.pending) < self.MAX_PENDING:
+                self._read(socket)
+            if socket.state() == QLocalSocket.UnconnectedState:  # type:ignore
+                self._drop(socket)
+
+        if not any(client.pending for client in self.clients.values()):
+            self.flush_timer.stop()
+
+
+def _drain(socket: QLocalSocket, name: str, timeout: int) -> None:
+    # Blocks until the server read what was written, that's where backpressure applies.
+    while socket.bytesToWrite() and socket.waitForBytesWritten(timeout):
+        pass
+    if socket.bytesToWrite():
+        raise TimeoutError(f"'{name}' stopped reading notifications")
+
+
+def send(name: str, records, timeout: int = 3000) -> int:
+    """
+    Writes notification records (dicts or messages) to a running app, blocking while
+    its server applies backpressure. Returns the amount of records sent.
+
+    Args:
+        name (str): Name of the local server, see server_name.
+        records (Iterable): The records to send.
+        timeout (int): Milliseconds to wait for the connection and each write.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout):
+        raise ConnectionError(
+            f"No app is listening on '{name}': {socket.errorString()}"
+        )
+
+    sent = 0
+    for record in records:
+        if not isinstance(record, dict):
+            record = {"message": str(record)}
+
+        socket.write((json.dumps(record) + "\n").encode("utf-8"))
+        sent += 1
+        if socket.bytesToWrite() > WRITE_BUFFER_SIZE:
+            _drain(socket, name, timeout)
+
+    _drain(socket, name, timeout)
+    socket.disconnectFromServer()
+    if socket.state() != QLocalSocket.UnconnectedState:  # type:ignore
+        socket.waitForDisconnected(timeout)
+    return sent
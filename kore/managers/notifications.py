@@ -1,7 +1,37 @@
+import bisect
+import itertools
 import logging
-from typing import List, Optional, Tuple
+import time
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-from ..components import NotificationWdgt
+from ..components.notification_wdgt import NotificationWdgt
+from ..diagnostics.tracing import NotificationTracer
+
+OVERFLOW_MODES = ("queue", "collapse", "expire")
+
+
+class PendingNotification(NamedTuple):
+    """A notification waiting for a free place in the stack, its widget isn't built yet."""
+
+    priority: int
+    order: int
+    created: float
+    options: dict
+    level: str = ""
+    trace_id: Optional[int] = None
+
+
+class Route(NamedTuple):
+    """What happens to the notifications of a (channel, level) pair."""
+
+    display: bool
+    history: bool
+    dnd_override: bool
+
+
+DEFAULT_ROUTE = Route(display=True, history=True, dnd_override=False)
+MUTED_ROUTE = Route(display=False, history=False, dnd_override=False)
 
 
 class NotificationManager:
@@ -15,13 +45,36 @@ class NotificationManager:
         notification_widget,
         recent_notifications_widget,
         override_by_importance: bool = False,
+        history_list_mode: bool = False,
+        history_capacity: Optional[int] = None,
+        max_visible: Optional[int] = None,
+        overflow: str = "queue",
+        stale_after: Optional[int] = None,
     ):
         """
         Initialize the Notifications class.
 
         Args:
             root: The root object containing shared resources and configurations.
+            history_list_mode: Paint the recent notifications through a list view
+                instead of a frame per entry, allows a much bigger history.
+            history_capacity: Maximum amount of entries kept in the recent notifications.
+            max_visible: Enables the stacked mode, showing up to this amount of
+                notifications at once (each one with its own timer). By default
+                notifications are shown one at a time.
+            overflow: What the stacked mode does with notifications that don't fit,
+                "queue" shows them as places free up, "collapse" folds them into a
+                single "+N more" notification (the folded ones are still added to the
+                recent notifications) and "expire" queues them but drops the ones that
+                waited longer than `stale_after`.
+            stale_after: Milliseconds a queued notification stays relevant in the
+                "expire" overflow mode.
         """
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(
+                f"Unknown overflow mode '{overflow}', expected one of {OVERFLOW_MODES}"
+            )
+
         self.root = root
         self.log = logging.getLogger(("notifications"))
         self.config = root.config
@@ -30,6 +83,8 @@ class NotificationManager:
         self.durations = durations
         self.levels = levels
         self.override_by_importance = override_by_importance
+        self.history_list_mode = history_list_mode
+        self.history_capacity = history_capacity
 
         self.notification_widget: NotificationWdgt = notification_widget
         self.recent_notifications_widget = recent_notifications_widget
@@ -42,6 +97,24 @@ class NotificationManager:
         self.recent_notifications_toggled = False
         self.setup_recent_notifications()
 
+        ## Lifecycle tracing, see kore.diagnostics.tracing.
+        self.tracer = NotificationTracer()
+
+        ## Channels.
+        self.channels: Dict[str, dict] = {}
+        self.routes: Dict[Tuple[Optional[str], str], Route] = {}
+        self.load_channels()
+
+        ## Stacked mode.
+        self.max_visible = None if max_visible is None else max(1, max_visible)
+        self.overflow = overflow
+        self.stale_after = stale_after
+        self.visible: List[Tuple[NotificationWdgt, PendingNotification]] = []
+        self.pending: List[PendingNotification] = []
+        self.summary: Optional[NotificationWdgt] = None
+        self.collapsed: List[dict] = []
+        self._order = itertools.count()
+
     def new(
         self,
         message: str = "Notification Message",
@@ -52,6 +125,7 @@ class NotificationManager:
         link: Optional[str] = None,
         override_dnd=False,
         require_close=False,
+        channel: Optional[str] = None,
     ) -> None:
         """
         Create a new notification and add it to the queue.
@@ -62,14 +136,23 @@ class NotificationManager:
             duration: The duration for which the notification should be displayed.
             timestamp: Flag to indicate if a timestamp should be added.
             link: An optional link associated with the notification.
+            channel: The channel the notification is routed through, see set_channel.
         """
+        route = self.routes.get((channel, level), DEFAULT_ROUTE)
+        if not route.display and not route.history:
+            return
 
         message = message.replace("\n", "")
-        background = self.levels[level]
         background = self.levels[level]["bg"]
 
-        self.recent_notifications.add_item(background, message)
-        if self.dnd and not override_dnd:
+        if route.history:
+            self.recent_notifications.add_item(background, message)
+        if not route.display:
+            return
+
+        trace_id = self.tracer.created(level)
+        if self.dnd and not (override_dnd or route.dnd_override):
+            self.tracer.emit(trace_id, level, "dropped_dnd")
             return
 
         duration = self.durations[duration]
@@ -80,8 +163,7 @@ class NotificationManager:
             timestamp_message = timestamp_message.replace("\n", "")
 
         self.log.debug(f"[{level}]: '{message}'")
-        notification = self.notification_widget(  # type:ignore
-            root=self.root,
+        options = dict(
             message=message,
             duration=duration,
             timestamp=timestamp,
@@ -90,10 +172,17 @@ class NotificationManager:
             timestamp_msg=timestamp_message,
             color=text_color,
         )
+        if self.max_visible is not None:
+            self.stack(new_priority, options, level, trace_id, route.history)
+            return
+
+        notification = self.notification_widget(  # type:ignore
+            root=self.root, **options
+        )
+        self.tracer.attach(notification, trace_id, level)
 
-        notification.move_up.connect(self.recent_notifications.move_up)
-        notification.closed.connect(self.recent_notifications.move_down)
         self.queue.append((notification, new_priority))
+        self.tracer.emit(trace_id, level, "queued")
         if len(self.queue) == 1:
             self.showing = notification
             notification.display()
@@ -122,10 +211,208 @@ class NotificationManager:
         except Exception as e:
             self.log.error(f"Error Processing Queue: {e}")
 
+    ## Stacked mode.
+
+    def stack(
+        self,
+        priority: int,
+        options: dict,
+        level: str = "",
+        trace_id: Optional[int] = None,
+        in_history: bool = True,
+    ) -> None:
+        """
+        Shows a notification if there is a free place in the stack, otherwise handles it
+        as an overflow.
+
+        A notification that outranks one on screen evicts the lowest ranked of them, so
+        it waits at most the fade out of the evicted notification before it's shown.
+
+        Args:
+            priority: The priority of the notification level.
+            options: The arguments of the notification widget.
+            level: The level of the notification, used by the tracer.
+            trace_id: The id given by the tracer.
+            in_history: Whether the notification was added to the recent
+                notifications, a collapsed one is added if it wasn't.
+        """
+        entry = PendingNotification(
+            priority, next(self._order), time.monotonic(), options, level, trace_id
+        )
+        if len(self.visible) < self.max_visible:  # type:ignore
+            self.tracer.emit(trace_id, level, "queued")
+            self._show(entry)
+            return
+
+        evicted = self._evict(priority)
+        if self.overflow == "collapse" and not evicted:
+            self.tracer.emit(trace_id, level, "coalesced")
+            self._collapse(options, in_history)
+            return
+
+        self.tracer.emit(trace_id, level, "queued")
+        bisect.insort(
+            self.pending, entry, key=lambda item: (-item.priority, item.order)
+        )
+
+    def _show(self, entry: PendingNotification) -> None:
+        # The widget is only built once it has a place in the stack.
+        notification = self.notification_widget(  # type:ignore
+            root=self.root, **entry.options
+        )
+        notification.closed.connect(partial(self._closed, notification))
+        self.tracer.attach(notification, entry.trace_id, entry.level)
+        self.visible.append((notification, entry))
+        notification.display()
+
+    def _evict(self, priority: int) -> bool:
+        # Fade out the lowest ranked (and oldest) notification below the given priority.
+        candidates = [
+            (entry.priority, index)
+            for index, (notification, entry) in enumerate(self.visible)
+            if entry.priority < priority and not notification.expiring
+        ]
+        if not candidates:
+            return False
+
+        notification, entry = self.visible[min(candidates)[1]]
+        self.tracer.emit(entry.trace_id, entry.level, "evicted")
+        notification.expire()
+        return True
+
+    def _collapse(self, options: dict, in_history: bool = True) -> None:
+        # The summary only shows a count, the recent notifications keep the messages.
+        if not in_history:
+            self.recent_notifications.add_item(
+                options["background"], options["message"]
+            )
+        self.collapsed.append(options)
+        message = f"+{len(self.collapsed)} more notifications"
+        if self.summary is not None:
+            self.summary.set_message(message)
+            return
+
+        self.summary = self.notification_widget(  # type:ignore
+            root=self.root,
+            **dict(
+                options,
+                message=message,
+                timestamp=False,
+                timestamp_msg=None,
+                permanent=False,
+            ),
+        )
+        self.summary.closed.connect(partial(self._closed, self.summary))
+        self.summary.OVERLAY_ORDER = 5
+        self.summary.display()
+
+    def _closed(self, notification: NotificationWdgt) -> None:
+        if notification is self.summary:
+            self.summary = None
+            self.collapsed = []
+            return
+
+        self.visible = [item for item in self.visible if item[0] is not notification]
+        self._drain()
+
+    def _drain(self) -> None:
+        # Fill the free places of the stack with the highest ranked queued notifications.
+        if self.overflow == "expire" and self.stale_after is not None:
+            deadline = time.monotonic() - self.stale_after / 1000
+            stale = [entry for entry in self.pending if entry.created < deadline]
+            if stale:
+                self.log.debug(f"{len(stale)} queued notifications expired")
+                for entry in stale:
+                    self.tracer.emit(entry.trace_id, entry.level, "expired")
+                self.pending = [
+                    entry for entry in self.pending if entry.created >= deadline
+                ]
+
+        while self.pending and len(self.visible) < self.max_visible:  # type:ignore
+            self._show(self.pending.pop(0))
+
+    ## Channels.
+
+    def load_channels(self) -> None:
+        """Reads the channels from `notifications.channels` and builds their routes."""
+        if self.config is not None and self.config.has("notifications.channels"):
+            self.channels = dict(self.config.get("notifications.channels"))
+
+        self.build_routes()
+
+    def set_channel(
+        self,
+        name: str,
+        enabled: bool = True,
+        dnd_override: bool = False,
+        min_level: Optional[str] = None,
+        history: bool = True,
+    ) -> None:
+        """
+        Creates or updates a channel and saves it in the configuration.
+
+        Args:
+            name: The name given to `new(channel=...)`.
+            enabled: A disabled channel drops its notifications right away.
+            dnd_override: Display the notifications of the channel in DND mode.
+            min_level: Notifications of a level with a lower priority are dropped.
+            history: Add the notifications of the channel to the recent notifications.
+        """
+        self.channels[name] = {
+            "enabled": enabled,
+            "dnd_override": dnd_override,
+            "min_level": min_level,
+            "history": history,
+        }
+        self.build_routes()
+
+        if self.config is not None:
+            self.config.put("notifications.channels", self.channels)
+
+    def build_routes(self) -> None:
+        """
+        Resolves every (channel, level) pair once, so routing a notification is a
+        single lookup. Notifications without a channel or of an unknown one are
+        routed like before channels existed.
+        """
+        routes = {}
+        for name, channel in self.channels.items():
+            min_level = channel.get("min_level")
+            min_priority = None
+            if min_level in self.levels:
+                min_priority = self.levels[min_level]["priority"]
+            elif min_level:
+                self.log.warning(
+                    f"Unknown min_level '{min_level}' of the channel '{name}', "
+                    f"its notifications aren't filtered by level"
+                )
+
+            for level, data in self.levels.items():
+                audible = channel.get("enabled", True) and (
+                    min_priority is None or data["priority"] >= min_priority
+                )
+                if not audible:
+                    routes[(name, level)] = MUTED_ROUTE
+                    continue
+
+                routes[(name, level)] = Route(
+                    display=True,
+                    history=channel.get("history", True),
+                    dnd_override=channel.get("dnd_override", False),
+                )
+
+        self.routes = routes
+
     def setup_recent_notifications(self) -> None:
         """Initialize the recent notifications panel."""
+        history_options = {}
+        if self.history_list_mode:
+            history_options["list_mode"] = True
+        if self.history_capacity is not None:
+            history_options["capacity"] = self.history_capacity
+
         self.recent_notifications = self.recent_notifications_widget(
-            root=self.root, dnd_state=self.dnd
+            root=self.root, dnd_state=self.dnd, **history_options
         )
         self.recent_notifications.setup()
         self.recent_notifications.dnd_changed.connect(self.toggle_dnd)
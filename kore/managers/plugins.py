@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from PySide6.QtCore import QObject, Signal
+
+from ..components.plugin_worker import import_entry
+from ..diagnostics.memory import rss_mb
+
+if TYPE_CHECKING:
+    from ..components.plugin import Plugin
+    from ..components.plugin_host import PluginProcess
+
+MANIFEST_NAME = "plugin.json"
+# Import and activation time (ms) above which a plugin is reported as slow.
+SLOW_ACTIVATION = 100
+
+
+class PluginManifest(NamedTuple):
+    """
+    The `plugin.json` of a plugin, e.g.
+
+        {
+            "name": "word-count",
+            "version": "1.0.0",
+            "entry": "main:WordCount",
+            "activation": ["settings", "command:word-count.show"],
+            "settings": {"word_count": {"enabled": {"default_value": true, ...}}}
+        }
+
+    `entry` is the module (relative to the plugin directory) and the Plugin subclass
+    to create. The activation events are "startup", "settings" (the settings page
+    opened), "command:<id>" or any name given to PluginManager.fire. `settings` is
+    settings metadata, in the format of conf_metadata.json.
+
+    With `"process": true` the plugin runs in a worker process (see PluginProcess),
+    its class is then a ProcessPlugin and `max_memory_mb` the memory it may use
+    before its worker is restarted.
+    """
+
+    name: str
+    version: str
+    entry: str
+    activation: tuple
+    settings: dict
+    path: str
+    description: str = ""
+    process: bool = False
+    max_memory_mb: Optional[float] = None
+
+    @classmethod
+    def read(cls, path: str) -> "PluginManifest":
+        """Reads the manifest of the plugin directory `path`, ValueError if invalid."""
+        with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if not isinstance(data, dict):
+            raise ValueError("the manifest isn't an object")
+        for field in ("name", "entry"):
+            if not isinstance(data.get(field), str) or not data[field]:
+                raise ValueError(f"'{field}' is missing")
+        if ":" not in data["entry"]:
+            raise ValueError("'entry' must be 'module:Class'")
+
+        activation = data.get("activation", [])
+        settings = data.get("settings", {})
+        if isinstance(activation, str):
+            activation = [activation]
+        if not isinstance(settings, dict):
+            raise ValueError("'settings' must be an object")
+
+        return cls(
+            name=data["name"],
+            version=str(data.get("version", "0.0.0")),
+            entry=data["entry"],
+            activation=tuple(activation),
+            settings=settings,
+            path=os.path.abspath(path),
+            description=data.get("description", ""),
+            process=bool(data.get("process", False)),
+            max_memory_mb=data.get("max_memory_mb"),
+        )
+
+
+class PluginManager(QObject):
+    """
+    Loads the plugins of a directory, one subdirectory with a `plugin.json` each.
+
+    discover() only reads the manifests, the code of a plugin is imported and its
+    Plugin created when one of its activation events fires for the first time (see
+    fire and run_command), so the start-up cost grows with the number of plugins and
+    not with their size. The import and activation time and the memory taken by each
+    activation are kept in `stats`, plugins slower than SLOW_ACTIVATION are logged.
+
+    The plugins running in a worker process are activated in the background, their
+    commands answer through callbacks (see PluginProcess.call).
+    """
+
+    activated = Signal(str)
+    # Name of the plugin and the error, the plugin isn't activated again.
+    failed = Signal(str, str)
+    # Name of the plugin and the record, the arguments of NotificationManager.new.
+    notification = Signal(str, dict)
+    # Name of the plugin, the event and its data, from the worker process plugins.
+    emitted = Signal(str, str, object)
+
+    def __init__(
+        self,
+        path: str,
+        window: Optional[QObject] = None,
+        isolated: Iterable[str] = (),
+    ) -> None:
+        """
+        Args:
+            path (str): Directory of the plugins.
+            window (QObject, optional): Parent of the plugins, usually the Interface.
+            isolated (Iterable[str]): Plugins to run in a worker process, whatever
+                their manifest says.
+        """
+        super().__init__(window)
+        self.log = logging.getLogger("kore.plugins")
+        self.path = path
+        self.window = window
+        self.isolated = set(isolated)
+
+        self.manifests: Dict[str, PluginManifest] = {}
+        self.events: Dict[str, List[str]] = {}
+        self.active: Dict[str, Union["Plugin", "PluginProcess"]] = {}
+        self.errors: Dict[str, str] = {}
+        self.stats: Dict[str, dict] = {}
+
+    def discover(self) -> None:
+        """Reads the manifests of the plugin directory, no plugin code is imported."""
+        start = time.perf_counter()
+        self.manifests.clear()
+        self.events.clear()
+        if not os.path.isdir(self.path):
+            return
+
+        for entry in sorted(os.scandir(self.path), key=lambda entry: entry.name):
+            if not os.path.isfile(os.path.join(entry.path, MANIFEST_NAME)):
+                continue
+
+            try:
+                manifest = PluginManifest.read(entry.path)
+            except (OSError, ValueError) as e:
+                self.log.warning(f"Invalid plugin manifest in '{entry.path}': {e}")
+                continue
+
+            if manifest.name in self.manifests:
+                self.log.warning(f"Duplicated plugin '{manifest.name}' ignored")
+                continue
+
+            self.manifests[manifest.name] = manifest
+            for event in manifest.activation:
+                self.events.setdefault(event, []).append(manifest.name)
+
+        duration = (time.perf_counter() - start) * 1000
+        self.log.debug(f"{len(self.manifests)} plugins found ({duration:.1f}ms)")
+
+    def fire(self, event: str) -> List[Union["Plugin", "PluginProcess"]]:
+        """
+        Activates the plugins waiting for an event, returns the active plugins of the
+        event (the ones that failed to activate are left out).
+        """
+        plugins = []
+        for name in self.events.get(event, []):
+            plugin = self.activate(name, event)
+            if plugin is not None:
+                plugins.append(plugin)
+        return plugins
+
+    def publish(self, event: str, data=None) -> None:
+        """Fires an event, then hands its data to the plugins that subscribed to it."""
+        self.fire(event)
+        for plugin in list(self.active.values()):
+            plugin.publish(event, data)
+
+    def run_command(self, command: str, *args, **kwargs):
+        """
+        Activates the plugins of a command, then calls its handler. The commands of
+        the worker process plugins return the id of the call, the keyword arguments
+        of PluginProcess.call give the result.
+        """
+        for plugin in self.fire(f"command:{command}") + list(self.active.values()):
+            handler = plugin.commands.get(command)
+            if handler is not None:
+                return handler(*args, **kwargs)
+
+        self.log.error(f"No plugin handles the command '{command}'")
+        return None
+
+    def activate(
+        self, name: str, event: str = ""
+    ) -> Optional[Union["Plugin", "PluginProcess"]]:
+        """Imports and creates a plugin if it isn't active yet, None if it failed."""
+        if name in self.active:
+            return self.active[name]
+        if name in self.errors:
+            return None
+
+        manifest = self.manifests[name]
+        if manifest.process or name in self.isolated:
+            return self._spawn(manifest, event)
+
+        tracing = tracemalloc.is_tracing()
+        memory_before = tracemalloc.get_traced_memory()[0] if tracing else rss_mb()
+        start = time.perf_counter()
+        try:
+            plugin_class = import_entry(manifest.name, manifest.path, manifest.entry)
+            imported = time.perf_counter()
+            plugin = plugin_class(self.window)
+            plugin.manifest = manifest
+            plugin.activate()
+        except Exception as e:
+            self.log.exception(f"Failed to activate the plugin '{name}'")
+            self.errors[name] = f"{type(e).__name__}: {e}"
+            self.failed.emit(name, self.errors[name])
+            return None
+        end = time.perf_counter()
+
+        memory_after = tracemalloc.get_traced_memory()[0] if tracing else rss_mb()
+        memory = None
+        if memory_before is not None and memory_after is not None:
+            memory = memory_after - memory_before
+            memory = round(memory / 2**20 if tracing else memory, 3)
+
+        self.active[name] = plugin
+        self.stats[name] = {
+            "event": event,
+            "import_ms": round((imported - start) * 1000, 2),
+            "activate_ms": round((end - imported) * 1000, 2),
+            "memory_mb": memory,
+            # The RSS delta is coarse, tracemalloc counts the Python allocations only.
+            "memory_source": "tracemalloc" if tracing else "rss",
+        }
+
+        total = (end - start) * 1000
+        message = f"Plugin '{name}' activated by '{event}' ({total:.1f}ms)"
+        if total > SLOW_ACTIVATION:
+            self.log.warning(f"Slow plugin activation: {message}")
+        else:
+            self.log.debug(message)
+        self.activated.emit(name)
+        return plugin
+
+    def settings_metadata(self) -> dict:
+        """Returns the settings metadata contributed by the manifests, by category."""
+        metadata: dict = {}
+        for manifest in self.manifests.values():
+            for category, settings in manifest.settings.items():
+                metadata.setdefault(category, {}).update(settings)
+        return metadata
+
+    def report(self) -> List[dict]:
+        """Returns the activation stats of the active plugins, the slowest first."""
+        rows = []
+        for name, stats in self.stats.items():
+            row = {"name": name, **stats}
+            plugin = self.active.get(name)
+            if stats["memory_source"] == "process" and plugin is not None:
+                usage = plugin.usage  # type:ignore
+                row.update(memory_mb=usage["rss_mb"], cpu_percent=usage["cpu_percent"])
+                row["restarts"] = usage["restarts"]
+            rows.append(row)
+
+        return sorted(
+            rows,
+            key=lambda row: (row["import_ms"] or 0) + (row["activate_ms"] or 0),
+            reverse=True,
+        )
+
+    def deactivate_all(self) -> None:
+        """Deactivates the active plugins, the last activated first."""
+        for name, plugin in reversed(list(self.active.items())):
+            try:
+                plugin.deactivate()
+            except Exception:
+                self.log.exception(f"Failed to deactivate the plugin '{name}'")
+        self.active.clear()
+
+    def _spawn(self, manifest: PluginManifest, event: str) -> "PluginProcess":
+        # QProcess and the channel are only loaded by the apps that use them.
+        from ..components.plugin_host import PluginProcess
+
+        name = manifest.name
+        config = getattr(self.window, "config", None)
+        plugin = PluginProcess(manifest, config, self)
+        plugin.ready.connect(lambda: self._spawned(name))
+        plugin.crashed.connect(lambda reason: self._crashed(name, reason))
+        plugin.notification.connect(lambda record: self.notification.emit(name, record))
+        plugin.event.connect(lambda event, data: self.emitted.emit(name, event, data))
+
+        self.active[name] = plugin
+        self.stats[name] = {
+            "event": event,
+            # Known once the worker is ready, the memory is the one of the worker.
+            "import_ms": None,
+            "activate_ms": None,
+            "memory_mb": None,
+            "memory_source": "process",
+        }
+        plugin.start()
+        return plugin
+
+    def _spawned(self, name: str) -> None:
+        plugin: "PluginProcess" = self.active[name]  # type:ignore
+        start_ms = plugin.usage["start_ms"]
+        if self.stats[name]["activate_ms"] is None:
+            self.stats[name]["activate_ms"] = start_ms
+            self.log.debug(f"Plugin '{name}' activated in a worker ({start_ms}ms)")
+            self.activated.emit(name)
+
+    def _crashed(self, name: str, reason: str) -> None:
+        plugin = self.active.get(name)
+        if plugin is not None and plugin.state == "failed":  # type:ignore
+            del self.active[name]
+            self.errors[name] = reason
+            self.failed.emit(name, reason)
@@ -0,0 +1,172 @@
+"""
+Small QSS reader used by the Theme manager: strips the comments, splits a sheet in
+its rule blocks and normalizes their declarations, so two sheets can be compared
+block by block, and indexes the properties of a sheet by selector and state.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE = re.compile(r"\s+")
+COMBINATOR = re.compile(r"[\s>+~]+")
+# A pseudo-state (":hover", ":!checked"), not a sub-control ("::handle").
+STATE = re.compile(r"(?<!:):(?!:)(!?[\w-]+)")
+
+Block = Tuple[str, str]
+
+
+def strip_comments(text: str) -> str:
+    return COMMENT.sub("", text)
+
+
+def split_blocks(text: str) -> Tuple[List[Block], str]:
+    """
+    Splits a sheet (without comments) in its `prelude { body }` blocks.
+
+    Returns:
+        The (prelude, body) of each block, the prelude being everything since the end
+        of the previous block, and the text left after the last one.
+    """
+    blocks: List[Block] = []
+    position = 0
+    while True:
+        start = text.find("{", position)
+        if start == -1:
+            break
+
+        end = text.find("}", start)
+        if end == -1:
+            raise ValueError(f"Unclosed block '{text[position:start].strip()}'")
+
+        blocks.append((text[position:start], text[start + 1 : end]))
+        position = end + 1
+
+    return blocks, text[position:]
+
+
+def split_statements(text: str) -> List[str]:
+    """
+    Splits a text on the ";" that aren't quoted or in parentheses, like the ones of
+    `url(data:image/png;base64,...)`. Works like `text.split(";")` otherwise.
+    """
+    parts = []
+    start = depth = 0
+    quote = None
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif char == ";" and not depth:
+            parts.append(text[start:index])
+            start = index + 1
+
+    parts.append(text[start:])
+    return parts
+
+
+def declarations(body: str) -> List[Tuple[str, str]]:
+    """Returns the (property, value) pairs of a block body, whitespace normalized."""
+    pairs = []
+    for declaration in split_statements(body):
+        name, colon, value = declaration.partition(":")
+        name = name.strip()
+        if not colon or not name:
+            continue
+        pairs.append((name.lower(), WHITESPACE.sub(" ", value.strip())))
+    return pairs
+
+
+def normalize_selector(selector: str) -> str:
+    parts = [WHITESPACE.sub(" ", part.strip()) for part in selector.split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+def format_block(selector: str, pairs: List[Tuple[str, str]]) -> str:
+    body = " ".join(f"{name}: {value};" for name, value in pairs)
+    return f"{selector} {{ {body} }}"
+
+
+def split_state(selector: str) -> Tuple[str, str]:
+    """
+    Splits the pseudo-states off the subject of a selector, `"#btn:hover:!checked"`
+    gives `("#btn", "hover:!checked")`. Sub-controls are part of the selector.
+    """
+    selector = WHITESPACE.sub(" ", selector.strip())
+    head, _, subject = selector.rpartition(" ")
+    states = STATE.findall(subject)
+    subject = STATE.sub("", subject)
+    return f"{head} {subject}".strip(), ":".join(states)
+
+
+class RuleIndex:
+    """
+    Properties of a sheet by selector and state, parsed once so components can look
+    up the style of a selector instead of scanning the sheet:
+
+        rules = RuleIndex.parse(sheet)
+        rules.get("#tb_closebtn", "hover")  # {"background-color": "#eb4d4b", ...}
+
+    Selectors are looked up as written in the sheet (whitespace normalized), the
+    later declarations of a selector override the earlier ones. `subject_style`
+    looks up by the subject instead, the last compound of the selectors, so
+    "#tb_closebtn" also gets the rules of "#tb_titlebar #tb_closebtn".
+    """
+
+    def __init__(self, rules: Dict[Tuple[str, str], Dict[str, str]]) -> None:
+        self.rules = rules
+        self.selectors = {selector for selector, _ in rules}
+        self.subjects: Dict[Tuple[str, str], Dict[str, str]] = {}
+        for (selector, state), properties in rules.items():
+            subject = COMBINATOR.split(selector)[-1]
+            self.subjects.setdefault((subject, state), {}).update(properties)
+        self.subject_names = {subject for subject, _ in self.subjects}
+
+    @classmethod
+    def parse(cls, sheet: str) -> "RuleIndex":
+        rules: Dict[Tuple[str, str], Dict[str, str]] = {}
+        blocks, _ = split_blocks(strip_comments(sheet))
+        for prelude, body in blocks:
+            pairs = declarations(body)
+            for selector in prelude.split(","):
+                key = split_state(selector)
+                if key[0]:
+                    rules.setdefault(key, {}).update(pairs)
+        return cls(rules)
+
+    def __contains__(self, selector: str) -> bool:
+        return selector in self.selectors
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def get(self, selector: str, state: str = "") -> Dict[str, str]:
+        """Properties declared for a selector in a state, "" for the stateless rules."""
+        return self.rules.get((selector, state), {})
+
+    def style(self, selector: str, state: str = "") -> Dict[str, str]:
+        """Properties of a selector in a state, those of its stateless rules included."""
+        if not state:
+            return dict(self.get(selector))
+        return {**self.get(selector), **self.get(selector, state)}
+
+    def value(
+        self, selector: str, name: str, state: str = "", default: Optional[str] = None
+    ) -> Optional[str]:
+        return self.style(selector, state).get(name, default)
+
+    def subject_style(self, subject: str, state: str = "") -> Dict[str, str]:
+        """
+        Like `style`, for every selector whose subject is `subject` ("#tb_closebtn"
+        for "#tb_titlebar #tb_closebtn"), in the order they appear in the sheet.
+        """
+        style = dict(self.subjects.get((subject, ""), {}))
+        if state:
+            style.update(self.subjects.get((subject, state), {}))
+        return style
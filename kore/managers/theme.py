@@ -1,15 +1,606 @@
+import hashlib
+import json
 import logging
+import os
+import re
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple, Union
 
-from PySide6.QtCore import QObject, Signal
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+from PySide6.QtGui import QColor, QPalette
+from PySide6.QtWidgets import QApplication, QWidget
+
+from . import qss
+
+if TYPE_CHECKING:
+    from ..components.task_pool import TaskPool
+
+THEMES_PATH = "./src/gui/assets/themes"
+THEME_CACHE_PATH = "./.cache/themes"
+THEME_EXTENSION = ".qss"
+# Part of the hash of every theme, bumped when the compiled output changes.
+ENGINE_VERSION = 2
+
+IMPORT = re.compile(r"""@import\s+["']([^"']+)["']\s*;""")
+DECLARATION = re.compile(r"@([A-Za-z_][\w-]*)\s*:\s*(.+)", re.DOTALL)
+VARIABLE = re.compile(r"@([A-Za-z_][\w-]*)")
+# Variables outside of urls and strings ("url(icon@2x.png)" has none).
+REFERENCE = re.compile(r"""(url\([^)]*\)|"[^"]*"|'[^']*')|@([A-Za-z_][\w-]*)""")
+# What makes a sheet a template, a plain stylesheet is applied as written.
+TEMPLATE = re.compile(r"@import\b|@palette\b|(?:^|[;{}])\s*@[A-Za-z_][\w-]*\s*:", re.M)
+PALETTE_REF = re.compile(r"palette\(\s*([a-z-]+)\s*\)")
+COMBINATOR = re.compile(r"[\s>+~]+")
+COMPOUND = re.compile(r"^([A-Za-z_]\w*|\*)?(?:\.([A-Za-z_]\w*))?(?:#([\w-]+))?")
+
+# Roles of the @palette block, named as in the palette() of QSS.
+PALETTE_ROLES = (
+    "alternate-base",
+    "base",
+    "bright-text",
+    "button",
+    "button-text",
+    "dark",
+    "highlight",
+    "highlighted-text",
+    "light",
+    "link",
+    "link-visited",
+    "mid",
+    "midlight",
+    "shadow",
+    "text",
+    "window",
+    "window-text",
+)
+
+
+class ThemeError(ValueError):
+    """A theme that can't be compiled."""
+
+
+class CompiledTheme(NamedTuple):
+    name: str
+    # Hash of the sources and the engine version.
+    digest: str
+    sheet: str
+    # Colors of the palette roles.
+    palette: Dict[str, str]
+    # Rule blocks of the sheet, normalized so they can be compared.
+    blocks: List[str]
+    # Hash of each source file, to tell if the compiled theme is still fresh.
+    sources: Dict[str, str]
+
+    def resolved(self) -> str:
+        """
+        The sheet with the palette() references replaced by their colors, for the
+        components that read colors out of it.
+        """
+        return PALETTE_REF.sub(
+            lambda match: self.palette.get(match.group(1), match.group(0)), self.sheet
+        )
 
 
 class Theme(QObject):
+    """
+    Compiles and applies the themes of a directory. A theme is a QSS template:
+
+        @import "base.qss";
+        @bg: #09090C;
+        @accent: #AEAFD0;
+
+        @palette {
+            window: @bg;
+            button: @accent;
+        }
+
+        QPushButton { background-color: @accent; border: 1px solid @bg; }
+
+    `@name: value;` declares a variable (they may refer to each other), `@import`
+    inlines another file of the directory and `@palette` sets the colors of QPalette
+    roles. A variable bound to a role is compiled to `palette(<role>)`, so themes that
+    only differ in their colors compile to the same sheet.
+
+    A theme is compiled once, the result is cached in `cache_path` and reused while the
+    hash of its sources is the same. Applying a theme with the sheet already in place
+    only sets the palette and re-polishes the widgets of the rules using the changed
+    roles, a different sheet is set as a whole (Qt re-polishes every widget on any
+    change of the app stylesheet) after the palette.
+
+    With watch(), the applied theme is reloaded when its sources change.
+    """
+
+    # Milliseconds without changes to the sources before a watched theme is reloaded.
+    RELOAD_DELAY = 200
+
+    # Compiled theme, emitted after it was applied.
+    applied = Signal(object)
+    # What apply did, see apply, emitted after a watched theme was reloaded.
+    reloaded = Signal(dict)
+
+    def __init__(
+        self,
+        path: str = THEMES_PATH,
+        cache_path: str = THEME_CACHE_PATH,
+        parent=None,
+    ) -> None:
+        """
+        Args:
+            path (str): Directory of the theme files.
+            cache_path (str): Directory of the compiled themes.
+        """
+        super().__init__(parent)
+        self.log = logging.getLogger("kore.theme")
+        self.path = path
+        self.cache_path = cache_path
+
+        self.compiled: Dict[str, CompiledTheme] = {}
+        self.inline: Dict[str, CompiledTheme] = {}
+        self.current: Optional[CompiledTheme] = None
+        self.base_palette: Optional[QPalette] = None
+        # Rules of the current theme, for the components reading its properties.
+        self.rules = qss.RuleIndex({})
+        self._indexes: Dict[str, qss.RuleIndex] = {}
+
+        self.watcher: Optional[QFileSystemWatcher] = None
+        # Digests of the applied themes without sources, warned about once.
+        self._unwatched: set = set()
+        self.tasks: Optional["TaskPool"] = None
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(self.RELOAD_DELAY)
+        self.reload_timer.timeout.connect(self._reload)
+
+    def has(self, name: str) -> bool:
+        """Whether there's a theme file with that name."""
+        return "{" not in name and os.path.isfile(self._file(name))
+
+    def load(self, name: str) -> CompiledTheme:
+        """Returns a compiled theme, compiling it only if its sources changed."""
+        theme = self.compiled.get(name) or self._read_cache(name)
+        if theme is not None and _fresh(theme):
+            self.compiled[name] = theme
+            return theme
+
+        theme = self.compile(name)
+        self.compiled[name] = theme
+        self._write_cache(theme)
+        return theme
+
+    def compile(self, name: str) -> CompiledTheme:
+        """Compiles a theme file, without looking at the cache."""
+        path = os.path.normpath(self._file(name))
+        try:
+            text = _read(path)
+        except OSError as e:
+            raise ThemeError(f"Can't read the theme '{name}': {e}")
+
+        start = time.perf_counter()
+        theme = self._compile(name, text, {path: _hash(text)})
+        elapsed = (time.perf_counter() - start) * 1000
+        self.log.debug(f"Theme '{name}' compiled in {elapsed:.1f}ms")
+        return theme
+
+    def compile_sheet(self, sheet: str, name: str = "inline") -> CompiledTheme:
+        """Compiles the text of a theme, compiled once per distinct text."""
+        key = _hash(sheet)
+        theme = self.inline.get(key)
+        if theme is None or not _fresh(theme):
+            theme = self.inline[key] = self._compile(name, sheet, {})
+        return theme
+
+    def index(self, theme: CompiledTheme) -> qss.RuleIndex:
+        """
+        Returns the rules of a theme by selector and state, with the palette colors in
+        place of the palette() references. Parsed once per theme.
+        """
+        rules = self._indexes.get(theme.digest)
+        if rules is None:
+            rules = self._indexes[theme.digest] = qss.RuleIndex.parse(theme.resolved())
+        return rules
+
+    def update_theme(self, sheet: str) -> dict:
+        """Applies the text of a theme, see apply."""
+        return self.apply(self.compile_sheet(sheet))
+
+    def apply(self, theme: Union[str, CompiledTheme]) -> dict:
+        """
+        Applies a theme, doing only what differs from the current one.
+
+        Args:
+            theme (str | CompiledTheme): Name of a theme file or a compiled theme.
+
+        Returns:
+            What was done: the mode ("unchanged", "palette" or "sheet"), the changed
+            blocks and roles, the re-polished widgets and the time it took.
+        """
+        if isinstance(theme, str):
+            theme = self.load(theme)
+
+        start = time.perf_counter()
+        app: QApplication = QApplication.instance()  # type:ignore
+        previous = self.current
+        if self.base_palette is None:
+            self.base_palette = QPalette(app.palette())
+
+        old_palette = previous.palette if previous is not None else {}
+        roles = [
+            role
+            for role in set(theme.palette) | set(old_palette)
+            if theme.palette.get(role) != old_palette.get(role)
+        ]
+        # Added or modified.
+        blocks = set(theme.blocks).difference(
+            previous.blocks if previous is not None else ()
+        )
+
+        repolished = 0
+        if previous is not None and previous.sheet == theme.sheet:
+            mode = "palette" if roles else "unchanged"
+            if roles:
+                app.setPalette(self._palette(theme))
+                repolished = self._repolish(theme, roles)
+        else:
+            mode = "sheet"
+            if roles:
+                app.setPalette(self._palette(theme))
+            app.setStyleSheet(theme.sheet)
+
+        self.current = theme
+        self.rules = self.index(theme)
+        if self.watcher is not None:
+            self._watch_sources()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.log.debug(f"Theme '{theme.name}' applied ({mode}) in {elapsed:.1f}ms")
+        self.applied.emit(theme)
+        return {
+            "theme": theme.name,
+            "mode": mode,
+            "changed_blocks": len(blocks),
+            "changed_roles": sorted(roles),
+            "repolished": repolished,
+            "ms": round(elapsed, 2),
+        }
+
+    def watch(self, tasks: Optional["TaskPool"] = None) -> None:
+        """
+        Reloads the applied theme when one of its files changes, for theme authoring.
+        The changes are debounced (a burst of saves reloads once), the theme is
+        compiled on the pool and applied like any other, so only what changed is
+        re-applied. Only the themes applied by name have files to watch, a warning is
+        logged when another one is applied.
+
+        Args:
+            tasks (TaskPool, optional): Pool compiling the theme, without it the theme
+                is compiled on the GUI thread.
+        """
+        self.tasks = tasks
+        if self.watcher is None:
+            self.watcher = QFileSystemWatcher(self)
+            self.watcher.fileChanged.connect(self._source_changed)
+            self.watcher.directoryChanged.connect(self._source_changed)
+        self._watch_sources()
+
+    def unwatch(self) -> None:
+        if self.watcher is None:
+            return
+        self.reload_timer.stop()
+        self.watcher.deleteLater()
+        self.watcher = None
+
+    def _file(self, name: str) -> str:
+        if not name.endswith(THEME_EXTENSION):
+            name += THEME_EXTENSION
+        return os.path.join(self.path, name)
+
+    ## Compilation.
+
+    def _compile(self, name: str, text: str, sources: Dict[str, str]) -> CompiledTheme:
+        digest = hashlib.sha1(str(ENGINE_VERSION).encode())
+        if not TEMPLATE.search(qss.strip_comments(text)):
+            digest.update(_hash(text).encode())
+            return CompiledTheme(
+                name=name,
+                digest=digest.hexdigest(),
+                sheet=text,
+                palette={},
+                blocks=_plain_blocks(text),
+                sources=sources,
+            )
+
+        text = self._expand(text, self.path, sources, [])
+        blocks, rest = qss.split_blocks(text)
+
+        variables: Dict[str, str] = {}
+        palette_values: List[Tuple[str, str]] = []
+        rules = []
+        for prelude, body in blocks:
+            selector = _statements(prelude, variables)
+            if selector == "@palette":
+                palette_values.extend(qss.declarations(body))
+            elif selector:
+                rules.append((qss.normalize_selector(selector), body))
+            else:
+                raise ThemeError(f"Block without a selector: '{body.strip()}'")
+
+        trailing = _statements(rest + ";", variables)
+        if trailing:
+            raise ThemeError(f"Unexpected '{trailing}'")
+
+        palette: Dict[str, str] = {}
+        tokens: Dict[str, str] = {}
+        for role, value in palette_values:
+            if role not in PALETTE_ROLES:
+                raise ThemeError(f"Unknown palette role '{role}'")
+
+            color = _resolve(value, variables, {})
+            if not QColor.isValidColor(color):
+                raise ThemeError(f"Invalid color '{color}' for the role '{role}'")
+            palette[role] = color
+
+            # The rules refer to the role instead, the color is left to the palette.
+            bound = VARIABLE.fullmatch(value)
+            if bound:
+                tokens.setdefault(bound.group(1), f"palette({role})")
+
+        compiled_blocks = []
+        for selector, body in rules:
+            pairs = [
+                (prop, _resolve(value, variables, tokens))
+                for prop, value in qss.declarations(body)
+            ]
+            compiled_blocks.append(qss.format_block(selector, pairs))
+
+        digest.update(_hash(text).encode())
+        return CompiledTheme(
+            name=name,
+            digest=digest.hexdigest(),
+            sheet="\n".join(compiled_blocks),
+            palette=palette,
+            blocks=compiled_blocks,
+            sources=sources,
+        )
+
+    def _expand(
+        self, text: str, directory: str, sources: Dict[str, str], stack: List[str]
+    ) -> str:
+        def include(match: re.Match) -> str:
+            path = os.path.normpath(os.path.join(directory, match.group(1)))
+            if path in stack:
+                raise ThemeError(f"'{match.group(1)}' imports itself")
+            try:
+                content = _read(path)
+            except OSError as e:
+                raise ThemeError(f"Can't import '{match.group(1)}': {e}")
+
+            sources[path] = _hash(content)
+            return self._expand(content, os.path.dirname(path), sources, stack + [path])
+
+        return IMPORT.sub(include, qss.strip_comments(text))
+
+    ## Application.
+
+    def _palette(self, theme: CompiledTheme) -> QPalette:
+        palette = QPalette(self.base_palette)  # type:ignore
+        for role, color in theme.palette.items():
+            palette.setColor(_color_role(role), QColor(color))
+        return palette
+
+    def _repolish(self, theme: CompiledTheme, roles: List[str]) -> int:
+        # The palette() references are resolved when a widget is polished, only the
+        # widgets the rules using the changed roles may apply to are polished again.
+        references = tuple(f"palette({role})" for role in roles)
+        matchers = []
+        for block in theme.blocks:
+            selector, _, body = block.partition("{")
+            if any(reference in body for reference in references):
+                matchers.extend(_matcher(part) for part in selector.split(","))
+        if not matchers:
+            return 0
+
+        widgets = [
+            widget
+            for widget in QApplication.allWidgets()
+            if any(_matches(widget, *matcher) for matcher in matchers)
+        ]
+        for widget in widgets:
+            style = widget.style()
+            style.unpolish(widget)
+            style.polish(widget)
+            widget.update()
+        return len(widgets)
+
+    ## Reloading.
+
+    def _watch_sources(self) -> None:
+        watcher: QFileSystemWatcher = self.watcher  # type:ignore
+        theme = self.current
+        files = set(theme.sources) if theme is not None else set()
+        if theme is not None and not files and theme.digest not in self._unwatched:
+            self._unwatched.add(theme.digest)
+            self.log.warning(
+                f"Theme '{theme.name}' has no files to watch, only the themes applied "
+                f"by name are reloaded"
+            )
+        # Editors saving through a new file replace the watched one, the directory
+        # tells when it's back.
+        paths = files | {os.path.dirname(path) for path in files}
+
+        watched = set(watcher.files()) | set(watcher.directories())
+        if watched - paths:
+            watcher.removePaths(list(watched - paths))
+        missing = [path for path in paths - watched if os.path.exists(path)]
+        if missing:
+            watcher.addPaths(missing)
+
+    def _source_changed(self, path: str) -> None:
+        self.reload_timer.start()
+
+    def _reload(self) -> None:
+        theme = self.current
+        if theme is None or not self.has(theme.name):
+            return
+        if _fresh(theme):
+            # Another file of the directory, or saved without changes.
+            self._watch_sources()
+            return
+
+        start = time.perf_counter()
+        if self.tasks is None:
+            try:
+                compiled = _timed_compile(self, theme.name)
+            except ValueError as e:
+                self._reload_failed(theme.name, e)
+            else:
+                self._reloaded(theme.name, start, compiled)
+            return
+
+        self.tasks.submit(
+            _timed_compile,
+            self,
+            theme.name,
+            on_done=partial(self._reloaded, theme.name, start),
+            on_error=partial(self._reload_failed, theme.name),
+            key=("theme", theme.name),
+            lane="high",
+        )
+
+    def _reloaded(self, name: str, start: float, compiled: tuple) -> None:
+        theme, compile_ms = compiled
+        if self.current is None or self.current.name != name:
+            return  # Another theme was applied meanwhile.
+
+        self.compiled[name] = theme
+        self._write_cache(theme)
+        report = self.apply(theme)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.log.info(
+            f"Theme '{name}' reloaded in {elapsed:.1f}ms ({report['mode']}, "
+            f"{report['changed_blocks']} blocks and {len(report['changed_roles'])} "
+            f"roles changed, compiled in {compile_ms:.1f}ms, applied in "
+            f"{report['ms']:.1f}ms, {len(theme.blocks)} blocks)"
+        )
+        self.reloaded.emit(report)
+
+    def _reload_failed(self, name: str, error: Exception) -> None:
+        self.log.error(f"Theme '{name}' not reloaded, the current one stays: {error}")
+        if self.watcher is not None:
+            self._watch_sources()
+
+    ## Cache.
+
+    def _cache_file(self, name: str) -> str:
+        return os.path.join(self.cache_path, re.sub(r"[^\w.-]", "_", name) + ".json")
+
+    def _read_cache(self, name: str) -> Optional[CompiledTheme]:
+        try:
+            with open(self._cache_file(name), "r", encoding="utf-8") as cache_file:
+                cached = json.load(cache_file)
+            if cached.pop("version") != ENGINE_VERSION:
+                return None
+            return CompiledTheme(**cached)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def _write_cache(self, theme: CompiledTheme) -> None:
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            with open(self._cache_file(theme.name), "w", encoding="utf-8") as f:
+                json.dump({"version": ENGINE_VERSION, **theme._asdict()}, f)
+        except OSError as e:
+            self.log.warning(f"Couldn't cache the theme '{theme.name}': {e}")
+
+
+def _timed_compile(theme: Theme, name: str) -> Tuple[CompiledTheme, float]:
+    start = time.perf_counter()
+    compiled = theme.compile(name)
+    return compiled, (time.perf_counter() - start) * 1000
+
+
+def _statements(prelude: str, variables: Dict[str, str]) -> str:
+    # Declarations end with ";", what's after the last one is the selector.
+    *statements, selector = qss.split_statements(prelude)
+    for statement in statements:
+        statement = statement.strip()
+        if not statement:
+            continue
+
+        declaration = DECLARATION.fullmatch(statement)
+        if declaration is None:
+            raise ThemeError(f"Unexpected '{statement}'")
+        variables[declaration.group(1)] = declaration.group(2).strip()
+
+    return selector.strip()
+
+
+def _resolve(
+    value: str,
+    variables: Dict[str, str],
+    tokens: Dict[str, str],
+    seen: Tuple[str, ...] = (),
+) -> str:
+    def replace(match: re.Match) -> str:
+        name = match.group(2)
+        if name is None:
+            return match.group(1)
+        if name in tokens:
+            return tokens[name]
+        if name not in variables:
+            raise ThemeError(f"Unknown variable '@{name}'")
+        if name in seen:
+            raise ThemeError(f"The variable '@{name}' refers to itself")
+        return _resolve(variables[name], variables, tokens, seen + (name,))
+
+    return REFERENCE.sub(replace, value)
+
+
+def _plain_blocks(sheet: str) -> List[str]:
+    # Only compared between themes, the sheet itself is applied as written.
+    try:
+        blocks, _ = qss.split_blocks(qss.strip_comments(sheet))
+    except ValueError:
+        return []
+    return [
+        qss.format_block(qss.normalize_selector(prelude), qss.declarations(body))
+        for prelude, body in blocks
+    ]
+
+
+def _color_role(role: str) -> QPalette.ColorRole:
+    return getattr(QPalette.ColorRole, "".join(p.capitalize() for p in role.split("-")))
+
+
+def _matcher(selector: str) -> Tuple[str, bool, str]:
+    # Type, whether it's exact (".Type") and object name of the subject of a selector,
+    # the pseudo-states, sub-controls and attributes are left out.
+    subject = COMBINATOR.split(selector.strip())[-1]
+    subject = re.sub(r"\[[^\]]*\]|::?!?[\w-]+(\([^)]*\))?", "", subject)
+    match = COMPOUND.match(subject)
+    type_name, exact_name, object_name = match.groups()  # type:ignore
+    return exact_name or type_name or "", bool(exact_name), object_name or ""
+
+
+def _matches(widget: QWidget, type_name: str, exact: bool, object_name: str) -> bool:
+    if object_name and widget.objectName() != object_name:
+        return False
+    if exact:
+        return widget.metaObject().className() == type_name
+    return type_name in ("", "*") or widget.inherits(type_name)
+
+
+def _fresh(theme: CompiledTheme) -> bool:
+    try:
+        return all(
+            _hash(_read(path)) == digest for path, digest in theme.sources.items()
+        )
+    except OSError:
+        return False
+
 
-    def __init__(self) -> None:
-        super().__init__()
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
 
-        self.log = logging.getLogger("kore.config")
-        self.log.debug("Loading theme manager...")
 
-    def update_theme(self, sheet: str):
-        pass
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,66 @@
+"""
+Import time regression tests, `import kore` and the headless modules must not pull
+in the Qt widgets (nor qframelesswindow) and have to stay within a time budget.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous, a cold `import kore` takes ~20ms, with the widgets it was ~350ms.
+IMPORT_BUDGET_MS = 150
+HEADLESS_MODULES = ("kore", "kore.managers", "kore.managers.config", "kore.cli.cli")
+WIDGET_MODULES = ("PySide6.QtWidgets", "qframelesswindow", "kore.components.settings")
+
+
+def import_profile(module: str) -> dict:
+    """Imports a module in a fresh interpreter, returns the cumulative ms per module."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            profile[name.strip()] = int(cumulative) / 1000
+
+    return profile
+
+
+class ImportTimeTest(unittest.TestCase):
+    def test_headless_imports_skip_widgets(self):
+        for module in HEADLESS_MODULES:
+            profile = import_profile(module)
+            for widget_module in WIDGET_MODULES:
+                with self.subTest(module=module, widget_module=widget_module):
+                    self.assertNotIn(widget_module, profile)
+
+    def test_import_budget(self):
+        # Best of three, the first run pays for cold caches.
+        best = min(import_profile("kore")["kore"] for _ in range(3))
+        self.assertLess(best, IMPORT_BUDGET_MS)
+
+    def test_lazy_names(self):
+        import kore.managers
+
+        self.assertIn("Config", dir(kore.managers))
+        self.assertIs(kore.managers.Config, kore.managers.config.Config)
+        with self.assertRaises(AttributeError):
+            kore.managers.Missing  # type:ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+"""
+Worker process plugins: a stub plugin busy-loops, crashes and floods the channel
+while the event loop of the app has to keep running on time.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+# The theme tests need a QApplication, created here when these tests run first.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication, QTimer
+from PySide6.QtWidgets import QApplication
+
+from kore.components.plugin_host import PluginCrashed, PluginProcess
+from kore.components.plugin_worker import MAX_BATCH, MAX_IN_FLIGHT
+from kore.managers.plugins import PluginManifest
+
+STUB_PLUGIN = """
+import os
+import threading
+import time
+
+from kore.components.plugin_worker import MAX_IN_FLIGHT, ProcessPlugin
+
+
+class Stub(ProcessPlugin):
+    def activate(self):
+        self.register_command("spin", self.spin)
+        self.register_command("echo", lambda value: value)
+        self.register_command("crash", lambda: os._exit(1))
+        self.register_command("flood", self.flood)
+        self.register_command("flood_thread", self.flood_thread)
+        self.register_command("setting", self.context.config)
+        self.context.subscribe("ping", lambda data: self.context.emit("pong", data))
+
+    def spin(self, seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            pass
+        return "spun"
+
+    def flood(self, count):
+        for index in range(count):
+            self.context.emit("tick", index)
+        self.context.notify("flooded", level="W")
+        return count
+
+    def flood_thread(self, seconds):
+        def run():
+            end = time.monotonic() + seconds
+            index = 0
+            while time.monotonic() < end:
+                self.context.emit("tick", index)
+                index += 1
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+
+class Eager(ProcessPlugin):
+    # Waits on the app before it's ready: for the answer of a config read, then for
+    # the acks of more lines than the worker may have in flight.
+    def activate(self):
+        value = self.context.config("general.x")
+        for index in range(2 * MAX_IN_FLIGHT):
+            self.context.subscribe(f"event{index}", print)
+        self.register_command("activated_with", lambda: value)
+"""
+
+# Longest the event loop may go without running a 10ms timer while the plugin spins.
+MAX_STALL_MS = 100
+
+
+class FakeConfig:
+    def __init__(self, values: dict) -> None:
+        self.values = values
+
+    def get(self, keys, file_name="config", default=None):
+        return self.values.get(keys, default)
+
+    def put(self, keys, value, file_name="config"):
+        self.values[keys] = value
+
+
+def wait_until(predicate, timeout: float = 10.0) -> bool:
+    end = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < end:
+        QCoreApplication.processEvents()
+        time.sleep(0.002)
+    return predicate()
+
+
+def write_plugin(entry: str) -> str:
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, "plugin.json"), "w") as f:
+        json.dump({"name": "stub", "entry": entry, "process": True}, f)
+    with open(os.path.join(directory, "main.py"), "w") as f:
+        f.write(STUB_PLUGIN)
+    return directory
+
+
+class PluginHostTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QApplication([])
+        cls.directory = write_plugin("main:Stub")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        self.config = FakeConfig({"general.x": 42})
+        self.plugin = PluginProcess(PluginManifest.read(self.directory), self.config)
+        self.plugin.RESTART_DELAY = 10
+        self.plugin.start()
+        self.assertTrue(wait_until(lambda: self.plugin.state == "running"))
+
+    def tearDown(self):
+        # Stops on its own, before STOP_TIMEOUT would get it killed.
+        start = time.perf_counter()
+        self.plugin.deactivate()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertEqual(self.plugin.state, "stopped")
+        self.assertLess(elapsed, PluginProcess.STOP_TIMEOUT)
+
+    def call(self, *args, timeout: float = 10.0):
+        outcome = {}
+        self.plugin.run_command(
+            *args,
+            on_done=lambda value: outcome.update(value=value),
+            on_error=lambda error: outcome.update(error=error),
+        )
+        self.assertTrue(wait_until(lambda: outcome, timeout))
+        return outcome
+
+    def test_busy_plugin_keeps_loop_responsive(self):
+        ticks = []
+        timer = QTimer()
+        timer.setInterval(10)
+        timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+        timer.start()
+        outcome = self.call("spin", 1.5)
+        timer.stop()
+
+        self.assertEqual(outcome, {"value": "spun"})
+        gaps = [(after - before) * 1000 for before, after in zip(ticks, ticks[1:])]
+        self.assertGreater(len(gaps), 50)
+        self.assertLess(max(gaps), MAX_STALL_MS)
+        self.assertGreater(self.plugin.usage["cpu_s"], 0)
+        self.assertIsNotNone(self.plugin.usage["rss_mb"])
+
+    def test_crash_restarts_the_worker(self):
+        crashes = []
+        self.plugin.crashed.connect(crashes.append)
+        outcome = self.call("crash")
+
+        self.assertIsInstance(outcome["error"], PluginCrashed)
+        self.assertTrue(wait_until(lambda: self.plugin.state == "running"))
+        self.assertEqual(self.plugin.usage["restarts"], 1)
+        self.assertEqual(len(crashes), 1)
+        self.assertEqual(self.call("echo", [1, "a"]), {"value": [1, "a"]})
+
+    def test_flood_is_batched(self):
+        events, notifications = [], []
+        self.plugin.event.connect(lambda event, data: events.append(data))
+        self.plugin.notification.connect(notifications.append)
+
+        self.assertEqual(self.call("flood", 2000), {"value": 2000})
+        self.assertTrue(wait_until(lambda: notifications))
+        self.assertEqual(events, list(range(2000)))
+        self.assertEqual(notifications, [{"message": "flooded", "level": "W"}])
+        self.assertLess(self.plugin.usage["batches"], 100)
+
+    def test_flood_from_thread_is_bounded(self):
+        events, ticks, queued = [], [], []
+        self.plugin.event.connect(lambda event, data: events.append(data))
+        timer = QTimer()
+        timer.setInterval(10)
+        timer.timeout.connect(
+            lambda: (
+                ticks.append(time.perf_counter()),
+                queued.append((len(self.plugin.lines), len(self.plugin.incoming))),
+            )
+        )
+        timer.start()
+        self.assertEqual(self.call("flood_thread", 2.0), {"value": True})
+        end = time.monotonic() + 2.5
+        wait_until(lambda: time.monotonic() > end)
+        timer.stop()
+
+        gaps = [(after - before) * 1000 for before, after in zip(ticks, ticks[1:])]
+        self.assertLess(max(gaps), MAX_STALL_MS)
+        self.assertLessEqual(max(lines for lines, _ in queued), MAX_IN_FLIGHT)
+        self.assertLessEqual(max(messages for _, messages in queued), MAX_BATCH)
+        self.assertTrue(events)
+        self.assertEqual(events, sorted(events))
+        self.assertGreater(self.plugin.usage["dropped"], 0)
+
+    def test_subscriptions_and_config(self):
+        events = []
+        self.plugin.event.connect(lambda event, data: events.append((event, data)))
+        self.plugin.publish("ping", {"n": 1})
+        self.plugin.publish("ignored", None)
+
+        self.assertTrue(wait_until(lambda: events))
+        self.assertEqual(events, [("pong", {"n": 1})])
+        self.assertEqual(self.call("setting", "general.x"), {"value": 42})
+
+    def test_unknown_command_fails(self):
+        outcome = self.call("missing")
+        self.assertIn("Unknown command", str(outcome["error"]))
+        self.assertEqual(self.plugin.state, "running")
+
+
+class ActivationTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QApplication([])
+        cls.directory = write_plugin("main:Eager")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def test_activation_waits_on_the_app(self):
+        # Acks and answers go out before the worker is ready, it'd stall without them.
+        config = FakeConfig({"general.x": 42})
+        plugin = PluginProcess(PluginManifest.read(self.directory), config)
+        plugin.start()
+        try:
+            self.assertTrue(wait_until(lambda: plugin.state == "running"))
+            events = {f"event{index}" for index in range(2 * MAX_IN_FLIGHT)}
+            self.assertEqual(plugin.subscriptions, events)
+
+            outcome = {}
+            plugin.run_command(
+                "activated_with", on_done=lambda value: outcome.update(value=value)
+            )
+            self.assertTrue(wait_until(lambda: outcome))
+        finally:
+            plugin.deactivate()
+        self.assertEqual(outcome, {"value": 42})
+        self.assertEqual(plugin.usage["restarts"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
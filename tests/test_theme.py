@@ -0,0 +1,237 @@
+"""
+Theme manager: the QSS reader, the compilation of the templates (variables, imports,
+palette), plain sheets applied as written, the cache and the palette-only switches.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QPalette
+from PySide6.QtWidgets import QApplication, QLabel, QPushButton, QWidget
+
+from kore.managers import qss
+from kore.managers.theme import ENGINE_VERSION, Theme, ThemeError
+
+BASE = """
+/* Shared by both themes. */
+QWidget { background-color: @bg; }
+QPushButton { color: @text; background-color: @accent; border: 1px solid @line; }
+QLabel { color: @text; }
+"""
+
+THEME = """
+@import "base.qss";
+@bg: {bg};
+@text: {text};
+@accent: {accent};
+@line: @accent;
+
+@palette {{
+    window: @bg;
+    window-text: @text;
+    button: @accent;
+}}
+"""
+
+DARK = {"bg": "#09090c", "text": "#efeff1", "accent": "#aeafd0"}
+LIGHT = {"bg": "#fafafa", "text": "#121211", "accent": "#575868"}
+
+DATA_URL = "url(data:image/png;base64,iVBORw0KGgo=)"
+
+
+class QssTest(unittest.TestCase):
+    def test_split_statements(self):
+        self.assertEqual(qss.split_statements("a; b;c"), ["a", " b", "c"])
+        self.assertEqual(
+            qss.split_statements(f"image: {DATA_URL}; font: 'a;b'; x"),
+            [f"image: {DATA_URL}", " font: 'a;b'", " x"],
+        )
+        self.assertEqual(qss.split_statements(""), [""])
+
+    def test_declarations(self):
+        body = f" Color : red ;\n image: {DATA_URL}; broken; :x; border:  1px   solid;"
+        self.assertEqual(
+            qss.declarations(body),
+            [("color", "red"), ("image", DATA_URL), ("border", "1px solid")],
+        )
+
+    def test_rule_index(self):
+        rules = qss.RuleIndex.parse(
+            "#btn, QLabel { color: red; }\n"
+            "#btn:hover { color: blue; }\n"
+            "#bar > #btn:pressed { background-color: green; }"
+        )
+        self.assertIn("#btn", rules)
+        self.assertEqual(rules.style("#btn", "hover"), {"color": "blue"})
+        self.assertEqual(rules.get("#btn", "pressed"), {})
+        self.assertEqual(
+            rules.subject_style("#btn", "pressed"),
+            {"color": "red", "background-color": "green"},
+        )
+
+
+class ThemeTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "themes")
+        self.cache_path = os.path.join(self.directory, "cache")
+        os.makedirs(self.path)
+        self.write("base.qss", BASE)
+        self.write("dark.qss", THEME.format(**DARK))
+        self.write("light.qss", THEME.format(**LIGHT))
+        self.theme = Theme(self.path, self.cache_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name: str, text: str) -> None:
+        with open(os.path.join(self.path, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    ## Compilation.
+
+    def test_variables(self):
+        theme = self.theme.compile_sheet(
+            "@a: 2px; @b: @a solid @c; @c: red;\nQFrame { border: @b; }"
+        )
+        self.assertEqual(theme.sheet, "QFrame { border: 2px solid red; }")
+
+        for sheet, error in (
+            ("@a: 1px;\nQFrame { border: @b; }", "Unknown variable '@b'"),
+            ("@a: @a;\nQFrame { border: @a; }", "refers to itself"),
+        ):
+            with self.subTest(sheet=sheet):
+                with self.assertRaisesRegex(ThemeError, error):
+                    self.theme.compile_sheet(sheet)
+
+    def test_urls_and_strings_keep_their_text(self):
+        theme = self.theme.compile_sheet(
+            f"@c: red;\nQLabel {{ image: {DATA_URL}; color: @c; }}\n"
+            'QPushButton { image: url(icon@2x.png); font: 9pt "a@b"; }'
+        )
+        self.assertEqual(
+            theme.blocks,
+            [
+                f"QLabel {{ image: {DATA_URL}; color: red; }}",
+                'QPushButton { image: url(icon@2x.png); font: 9pt "a@b"; }',
+            ],
+        )
+
+    def test_imports(self):
+        theme = self.theme.compile("dark")
+        self.assertEqual(len(theme.blocks), 3)
+        self.assertEqual(
+            {os.path.basename(path) for path in theme.sources}, {"dark.qss", "base.qss"}
+        )
+
+        self.write("a.qss", '@import "b.qss";\nQFrame { border: none; }')
+        self.write("b.qss", '@import "a.qss";')
+        with self.assertRaisesRegex(ThemeError, "imports itself"):
+            self.theme.compile("a")
+        with self.assertRaisesRegex(ThemeError, "Can't import"):
+            self.theme.compile_sheet('@import "missing.qss";')
+
+    def test_palette_binding(self):
+        dark, light = self.theme.compile("dark"), self.theme.compile("light")
+
+        # Only the colors differ, the variables bound to roles refer to the palette.
+        self.assertEqual(dark.sheet, light.sheet)
+        self.assertNotEqual(dark.digest, light.digest)
+        self.assertIn("QWidget { background-color: palette(window); }", dark.blocks)
+        self.assertIn(
+            "QPushButton { color: palette(window-text); "
+            "background-color: palette(button); border: 1px solid palette(button); }",
+            dark.blocks,
+        )
+        self.assertEqual(
+            dark.palette,
+            {"window": "#09090c", "window-text": "#efeff1", "button": "#aeafd0"},
+        )
+        self.assertIn("background-color: #575868;", light.resolved())
+
+        for sheet, error in (
+            ("@palette { windw: red; }", "Unknown palette role"),
+            ("@palette { window: nope; }", "Invalid color"),
+        ):
+            with self.subTest(sheet=sheet):
+                with self.assertRaisesRegex(ThemeError, error):
+                    self.theme.compile_sheet(sheet)
+
+    def test_plain_sheet_passthrough(self):
+        sheet = (
+            "/* plain */\nQLabel { image: url(icon@2x.png); }\n"
+            f"QPushButton {{ border-image: {DATA_URL}; }}\n"
+        )
+        theme = self.theme.compile_sheet(sheet)
+        self.assertEqual(theme.sheet, sheet)
+        self.assertEqual(theme.palette, {})
+        self.assertEqual(len(theme.blocks), 2)
+        self.assertIs(self.theme.compile_sheet(sheet), theme)
+
+    ## Cache.
+
+    def test_cache_freshness(self):
+        compiled = self.theme.load("dark")
+        with open(os.path.join(self.cache_path, "dark.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["version"], ENGINE_VERSION)
+
+        # A new manager reads the cache while the sources are unchanged.
+        cached = Theme(self.path, self.cache_path)
+        cached.compile = None  # type:ignore
+        self.assertEqual(cached.load("dark"), compiled)
+
+        # Changing an imported file makes it stale.
+        self.write("base.qss", BASE.replace("1px", "2px"))
+        reloaded = Theme(self.path, self.cache_path).load("dark")
+        self.assertNotEqual(reloaded.digest, compiled.digest)
+        self.assertIn("2px solid", reloaded.sheet)
+
+        # So does another engine version.
+        with open(os.path.join(self.cache_path, "dark.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        data["version"] = ENGINE_VERSION - 1
+        with open(os.path.join(self.cache_path, "dark.json"), "w") as f:
+            json.dump(data, f)
+        self.assertIsNone(Theme(self.path, self.cache_path)._read_cache("dark"))
+
+    ## Application.
+
+    def test_palette_only_switch(self):
+        root = QWidget()
+        buttons = [QPushButton("button", root) for _ in range(3)]
+        QLabel("label", root)
+        root.show()
+        palette = QPalette(self.app.palette())
+        try:
+            first = self.theme.apply("dark")
+            sheet = self.app.styleSheet()
+            switch = self.theme.apply("light")
+            again = self.theme.apply("light")
+        finally:
+            self.app.setStyleSheet("")
+            self.app.setPalette(palette)
+            root.close()
+
+        self.assertEqual(first["mode"], "sheet")
+        self.assertEqual(switch["mode"], "palette")
+        self.assertEqual(switch["changed_roles"], ["button", "window", "window-text"])
+        self.assertEqual(switch["changed_blocks"], 0)
+        # The QWidget rule uses palette(window), every widget is re-polished.
+        self.assertGreaterEqual(switch["repolished"], len(buttons) + 2)
+        self.assertEqual(again["mode"], "unchanged")
+        self.assertEqual(sheet, self.theme.current.sheet)  # type:ignore
+        self.assertEqual(self.theme.rules.value("QPushButton", "color"), "#121211")
+
+
+if __name__ == "__main__":
+    unittest.main()